@@ -0,0 +1,172 @@
+from collections import namedtuple
+from datetime import timedelta
+import numpy as np
+import db
+from availability import to_day
+from booking_service import ValidationError, parse_day
+
+CHUNK_ROWS = 50000  # rows pulled per fetchmany(); memory is bounded by this, not the table size
+PERIODS = ("day", "week", "month")
+
+ReportRow = namedtuple("ReportRow", [
+    "period", "room_type", "available_nights", "sold_nights", "revenue",
+    "bookings", "cancellations", "occupancy", "adr", "revpar", "cancellation_rate",
+])
+
+STAYS_QUERY = """
+    SELECT r.roomTypeID, b.checkInDate, b.checkOutDate, b.status, b.totalAmount
+    FROM bookings b
+    JOIN rooms r ON b.roomID = r.roomID
+    WHERE b.checkInDate < %s AND b.checkOutDate > %s
+"""
+
+ROLLUP_QUERY = """
+    SELECT roomTypeID, day, roomsSold, revenue, arrivals, cancellations
+    FROM daily_rollup
+    WHERE day >= %s AND day < %s
+"""
+
+
+def ratio(numerator, denominator):
+    return numerator / denominator if denominator else 0.0
+
+def period_bounds(start, days, period):
+    # Offsets from `start` where each period begins, with its label
+    offsets, labels = [], []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if period == "day":
+            label = day.isoformat()
+        elif period == "week":
+            label = f"Week of {(day - timedelta(days=day.weekday())).isoformat()}"
+        else:
+            label = day.strftime("%Y-%m")
+        if not labels or labels[-1] != label:
+            offsets.append(offset)
+            labels.append(label)
+    return offsets, labels
+
+
+class OccupancyAccumulator:
+    # Folds chunks of (roomTypeID, checkIn, checkOut, status, totalAmount) rows into
+    # per-type per-day arrays, so memory is room types x days however many rows stream past.
+    # Sold nights and revenue are kept as +/- deltas at stay boundaries and summed at the end.
+    def __init__(self, type_ids, start, end):
+        self.type_index = {type_id: i for i, type_id in enumerate(type_ids)}
+        self.start = start
+        self.start_day = to_day(start)
+        self.days = to_day(end) - self.start_day
+        self.sold_delta = np.zeros((len(type_ids), self.days + 1), dtype=np.int64)
+        self.revenue_delta = np.zeros((len(type_ids), self.days + 1))
+        self.bookings = np.zeros((len(type_ids), self.days), dtype=np.int64)       # by check-in day
+        self.cancellations = np.zeros((len(type_ids), self.days), dtype=np.int64)  # by check-in day
+
+    def add_chunk(self, rows):
+        rows = [row for row in rows if row[0] in self.type_index]
+        if not rows:
+            return
+        count = len(rows)
+        types = np.fromiter((self.type_index[row[0]] for row in rows), np.int64, count)
+        check_in = np.fromiter((to_day(row[1]) for row in rows), np.int64, count) - self.start_day
+        check_out = np.fromiter((to_day(row[2]) for row in rows), np.int64, count) - self.start_day
+        cancelled = np.fromiter((row[3] == 'cancelled' for row in rows), bool, count)
+        amount = np.fromiter((float(row[4] or 0) for row in rows), float, count)
+
+        arriving = (check_in >= 0) & (check_in < self.days)
+        np.add.at(self.bookings, (types[arriving], check_in[arriving]), 1)
+        arriving &= cancelled
+        np.add.at(self.cancellations, (types[arriving], check_in[arriving]), 1)
+
+        # Each stay's amount is spread evenly over its nights, then clipped to the window
+        live = ~cancelled & (check_out > check_in)
+        nightly = amount[live] / (check_out[live] - check_in[live])
+        first = np.clip(check_in[live], 0, self.days)
+        last = np.clip(check_out[live], 0, self.days)
+        types = types[live]
+        np.add.at(self.sold_delta, (types, first), 1)
+        np.add.at(self.sold_delta, (types, last), -1)
+        np.add.at(self.revenue_delta, (types, first), nightly)
+        np.add.at(self.revenue_delta, (types, last), -nightly)
+
+    def add_daily(self, rows):
+        # Rows of (roomTypeID, day, roomsSold, revenue, arrivals, cancellations) from daily_rollup
+        rows = [row for row in rows if row[0] in self.type_index and 0 <= to_day(row[1]) - self.start_day < self.days]
+        if not rows:
+            return
+        count = len(rows)
+        types = np.fromiter((self.type_index[row[0]] for row in rows), np.int64, count)
+        days = np.fromiter((to_day(row[1]) for row in rows), np.int64, count) - self.start_day
+        sold = np.fromiter((row[2] for row in rows), np.int64, count)
+        revenue = np.fromiter((float(row[3]) for row in rows), float, count)
+        np.add.at(self.sold_delta, (types, days), sold)
+        np.add.at(self.sold_delta, (types, days + 1), -sold)
+        np.add.at(self.revenue_delta, (types, days), revenue)
+        np.add.at(self.revenue_delta, (types, days + 1), -revenue)
+        np.add.at(self.bookings, (types, days), np.fromiter((row[4] for row in rows), np.int64, count))
+        np.add.at(self.cancellations, (types, days), np.fromiter((row[5] for row in rows), np.int64, count))
+
+    def report(self, type_names, room_counts, period="month"):
+        # type_names and room_counts are in the order of the type_ids given to __init__;
+        # returns a ReportRow per period per room type, plus an "All" row per period
+        offsets, labels = period_bounds(self.start, self.days, period)
+        sold = np.add.reduceat(np.cumsum(self.sold_delta[:, :-1], axis=1), offsets, axis=1)
+        revenue = np.add.reduceat(np.cumsum(self.revenue_delta[:, :-1], axis=1), offsets, axis=1)
+        bookings = np.add.reduceat(self.bookings, offsets, axis=1)
+        cancellations = np.add.reduceat(self.cancellations, offsets, axis=1)
+        period_days = np.diff(offsets + [self.days])
+        available = np.outer(np.asarray(room_counts, dtype=np.int64), period_days)
+
+        # Append the all-types total as one more row of each array
+        names = list(type_names) + ["All"]
+        available, sold, revenue, bookings, cancellations = (
+            np.vstack([values, values.sum(axis=0)])
+            for values in (available, sold, revenue, bookings, cancellations))
+        rows = []
+        for p, label in enumerate(labels):
+            for t, name in enumerate(names):
+                nights, sold_nights, income = int(available[t, p]), int(sold[t, p]), float(revenue[t, p])
+                booked, cancelled = int(bookings[t, p]), int(cancellations[t, p])
+                rows.append(ReportRow(
+                    label, name, nights, sold_nights, round(income, 2), booked, cancelled,
+                    ratio(sold_nights, nights), ratio(income, sold_nights), ratio(income, nights),
+                    ratio(cancelled, booked),
+                ))
+        return rows
+
+
+def occupancy_report(start, end, period="month", from_bookings=False, chunk_rows=CHUNK_ROWS):
+    # Occupancy, ADR (revenue per sold night), RevPAR (revenue per available night) and
+    # cancellation rate (by check-in date) per room type and period over [start, end).
+    # Revenue is the booking's totalAmount, which is what its transaction charges.
+    # Reads daily_rollup (O(days) rows); from_bookings recomputes from the raw bookings.
+    start, end = parse_day(start, "start"), parse_day(end, "end")
+    if end <= start:
+        raise ValidationError("Report end date must be after the start date")
+    if period not in PERIODS:
+        raise ValidationError(f"Unknown period: {period}")
+
+    with db.cursor() as c:
+        c.execute("""
+            SELECT rt.roomTypeID, rt.typeName, COUNT(r.roomID)
+            FROM room_types rt
+            LEFT JOIN rooms r ON r.roomTypeID = rt.roomTypeID
+            GROUP BY rt.roomTypeID, rt.typeName
+            ORDER BY rt.roomTypeID
+        """)
+        room_types = c.fetchall()
+
+    accumulator = OccupancyAccumulator([row[0] for row in room_types], start, end)
+    with db.streaming_cursor() as c:
+        if from_bookings:
+            c.execute(STAYS_QUERY, (end, start))
+        else:
+            c.execute(ROLLUP_QUERY, (start, end))
+        while True:
+            rows = c.fetchmany(chunk_rows)
+            if not rows:
+                break
+            if from_bookings:
+                accumulator.add_chunk(rows)
+            else:
+                accumulator.add_daily(rows)
+    return accumulator.report([row[1] for row in room_types], [row[2] for row in room_types], period)
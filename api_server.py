@@ -0,0 +1,319 @@
+import argparse
+import json
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+import auth
+import db
+import migrations
+import query_stats
+from sharding import ShardedBookingService
+from booking_service import (BookingService, BookingError, BookingNotFoundError, NoAvailabilityError,
+                             ValidationError, parse_day)
+
+API_HOST = os.environ.get("HOTEL_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("HOTEL_API_PORT", "8080"))
+API_WORKERS = int(os.environ.get("HOTEL_API_WORKERS", "32"))  # connections served at once; one per busy terminal
+IDLE_TIMEOUT = 30          # seconds a keep-alive connection may sit idle before its worker is freed
+MAX_BODY = 64 * 1024
+PAGE_LIMIT = 200
+
+# Booking API
+# A headless JSON front end for terminals and kiosks: one process holds the only
+# connection pool and the only availability index, and every client shares them.
+#
+#   POST   /login                         {"email", "password"} -> {"token", "userID", "username", "role"}
+#   POST   /logout
+#   GET    /room-types
+#   GET    /availability?check_in=&check_out=[&room_type=]   free room per type (index hint)
+#   GET    /availability/calendar?[start=][&days=]           free rooms per type per night
+#   GET    /bookings                      own bookings; admins get every booking, paged by ?after=&after_id=&status=
+#   POST   /bookings                      {"room_type", "check_in", "check_out", "payment_method"}
+#   PUT    /bookings/<id>                 {"room_type", "check_in", "check_out"}
+#   POST   /bookings/<id>/cancel
+#   PUT    /admin/bookings/<id>/status    {"status"}
+#   DELETE /admin/bookings/<id>
+#
+# Every call but /login needs "Authorization: Bearer <token>".
+
+
+Request = namedtuple("Request", ["user", "token", "match", "query", "body"])
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+BOOKING_COLUMNS = ["bookingID", "guest", "roomType", "roomNumber", "checkInDate", "checkOutDate", "status", "totalAmount"]
+USER_BOOKING_COLUMNS = ["bookingID", "userID"] + BOOKING_COLUMNS[2:]
+
+def rows_to_dicts(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+def require(body, *fields):
+    missing = [name for name in fields if not str(body.get(name) or "").strip()]
+    if missing:
+        raise ValidationError(f"Missing {', '.join(missing)}")
+    return [str(body[name]).strip() for name in fields]
+
+
+class BookingApi:
+    # Routing and the endpoint handlers; each handler takes a Request and returns (status, payload)
+    def __init__(self, service=None, sessions=None):
+        self.service = service or BookingService()
+        self.sessions = sessions or auth.sessions
+        self.routes = [
+            ("POST", r"/login", self.login, None),
+            ("POST", r"/logout", self.logout, "any"),
+            ("GET", r"/room-types", self.room_types, "any"),
+            ("GET", r"/availability", self.availability, "any"),
+            ("GET", r"/availability/calendar", self.calendar, "any"),
+            ("GET", r"/bookings", self.list_bookings, "any"),
+            ("POST", r"/bookings", self.create_booking, "any"),
+            ("PUT", r"/bookings/(\d+)", self.update_booking, "any"),
+            ("POST", r"/bookings/(\d+)/cancel", self.cancel_booking, "any"),
+            ("PUT", r"/admin/bookings/(\d+)/status", self.set_status, "admin"),
+            ("DELETE", r"/admin/bookings/(\d+)", self.delete_booking, "admin"),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler, role) for method, pattern, handler, role in self.routes]
+
+    def dispatch(self, method, path, query, body, token):
+        # Returns (status, payload)
+        allowed = False
+        for route_method, pattern, handler, role in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            user = None
+            if role:
+                user = self.sessions.validate(token) if token else None
+                if user is None:
+                    raise ApiError(401, "Sign in first")
+                if role == "admin" and user.role != "admin":
+                    raise ApiError(403, "Admins only")
+            return handler(Request(user, token, match, query, body))
+        if allowed:
+            raise ApiError(405, "Method not allowed")
+        raise ApiError(404, "Not found")
+
+    def login(self, request):
+        email, password = require(request.body, "email", "password")
+        session = auth.start_session(email, password)
+        if session is None:
+            raise ApiError(401, "Invalid email or password")
+        token, user = session
+        return 200, {"token": token, "userID": user.user_id, "username": user.username, "role": user.role}
+
+    def logout(self, request):
+        self.sessions.revoke(request.token)
+        return 200, {}
+
+    def room_types(self, request):
+        return 200, {"roomTypes": self.service.room_types()}
+
+    def availability(self, request):
+        check_in, check_out = require(request.query, "check_in", "check_out")
+        check_in, check_out = parse_day(check_in, "check_in"), parse_day(check_out, "check_out")
+        if check_out <= check_in:
+            raise ValidationError("Check-out date must be after check-in date")
+        room_types = [request.query["room_type"]] if request.query.get("room_type") else self.service.room_types()
+        return 200, {"available": {
+            room_type: self.service.check_room_availability(room_type, check_in, check_out) is not None
+            for room_type in room_types
+        }}
+
+    def calendar(self, request):
+        start = parse_day(request.query["start"], "start") if request.query.get("start") else date.today()
+        try:
+            days = min(int(request.query.get("days") or 90), 366)
+        except ValueError:
+            raise ValidationError("days must be a number") from None
+        if days < 1:
+            raise ValidationError("days must be at least 1")
+        return 200, {"start": start, "days": days, "free": self.service.availability_calendar(start, days)}
+
+    def list_bookings(self, request):
+        if request.user.role != "admin":
+            rows = self.service.list_user_bookings(request.user.user_id)
+            return 200, {"bookings": rows_to_dicts(USER_BOOKING_COLUMNS, rows)}
+        after = None
+        if request.query.get("after"):
+            try:
+                after = (parse_day(request.query["after"], "after"), int(request.query.get("after_id") or 0))
+            except ValueError:
+                raise ValidationError("after_id must be a number") from None
+        rows = self.service.list_bookings(after=after, limit=PAGE_LIMIT, status=request.query.get("status") or None)
+        return 200, {"bookings": rows_to_dicts(BOOKING_COLUMNS, rows)}
+
+    def known_room_type(self, room_type):
+        # An unknown type is a bad request, not a fully booked one
+        if room_type not in self.service.room_types():
+            raise ValidationError(f"Unknown room type: {room_type}")
+
+    def create_booking(self, request):
+        room_type, check_in, check_out, payment_method = require(request.body, "room_type", "check_in", "check_out",
+                                                                 "payment_method")
+        self.known_room_type(room_type)
+        booked = self.service.create_booking(request.user.user_id, room_type, check_in, check_out, payment_method)
+        return 201, booked._asdict()
+
+    def update_booking(self, request):
+        room_type, check_in, check_out = require(request.body, "room_type", "check_in", "check_out")
+        self.known_room_type(room_type)
+        updated = self.service.update_booking(request.user.user_id, int(request.match.group(1)),
+                                              room_type, check_in, check_out)
+        return 200, updated._asdict()
+
+    def cancel_booking(self, request):
+        self.service.cancel_booking(request.user.user_id, int(request.match.group(1)))
+        return 200, {}
+
+    def set_status(self, request):
+        status, = require(request.body, "status")
+        self.service.set_booking_status(int(request.match.group(1)), status)
+        return 200, {}
+
+    def delete_booking(self, request):
+        self.service.delete_booking(int(request.match.group(1)))
+        return 200, {}
+
+
+def error_status(e):
+    if isinstance(e, ApiError):
+        return e.status
+    if isinstance(e, BookingNotFoundError):
+        return 404
+    if isinstance(e, NoAvailabilityError):
+        return 409
+    if isinstance(e, BookingError):
+        return 400
+    return 503
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients don't pay a TCP handshake per call
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    timeout = IDLE_TIMEOUT
+    api = None
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        header = self.headers.get("Authorization", "")
+        token = header[7:].strip() if header.startswith("Bearer ") else None
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY:
+                raise ApiError(413, "Request body too large")
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+            if not isinstance(body, dict):
+                raise ApiError(400, "Expected a JSON object")
+            status, payload = self.api.dispatch(method, url.path.rstrip("/") or "/", query, body, token)
+        except (ApiError, BookingError, db.Error) as e:
+            status, payload = error_status(e), {"error": str(e)}
+        except (ValueError, KeyError) as e:
+            status, payload = 400, {"error": f"Bad request: {e}"}
+        except Exception as e:
+            print(f"API error on {method} {self.path}: {e}")
+            status, payload = 500, {"error": "Internal error"}
+        data = json.dumps(payload, default=to_json).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_PUT(self):
+        self.handle_request("PUT")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledHTTPServer(HTTPServer):
+    # Connections are served by a fixed pool of worker threads instead of a thread per
+    # connection, so a burst of clients queues rather than piling onto the DB pool
+
+    def __init__(self, address, handler, workers=API_WORKERS):
+        super().__init__(address, handler)
+        self.workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self.workers.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.workers.shutdown(wait=False, cancel_futures=True)
+
+
+def make_server(host=API_HOST, port=API_PORT, workers=API_WORKERS, api=None):
+    handler = type("BoundApiHandler", (ApiHandler,), {"api": api or BookingApi()})
+    return PooledHTTPServer((host, port), handler, workers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Hotel booking JSON API server")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--shards", type=int, default=0,
+                        help="allocation worker processes, partitioned by room type (0: allocate in this process)")
+    args = parser.parse_args()
+
+    try:
+        migrations.migrate()
+        auth.initialize_users()
+    except db.Error as e:
+        print(f"Error initializing database: {e}")
+        raise SystemExit(2)
+    query_stats.start_exporters()
+    service = None
+    if args.shards:
+        service = ShardedBookingService(args.shards)
+        service.warm_up()
+    server = make_server(args.host, args.port, args.workers, BookingApi(service))
+    print(f"Booking API listening on http://{args.host}:{server.server_address[1]} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if service:
+            service.close()
+
+if __name__ == "__main__":
+    main()
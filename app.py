@@ -0,0 +1,41 @@
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Application Bootstrap
+# Entry point for the desktop app (python app.py). Only what the login window needs
+# is imported up front. Migrations and the admin seed run once per process on a
+# background thread while the window is on screen, then the dashboards and their
+# heavy imports (numpy for reports and pricing) are loaded there too, so they are ready by the
+# time the user has typed a password.
+
+setup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bootstrap")
+setup_future = None
+setup_lock = threading.Lock()
+
+def setup():
+    import auth
+    auth.initialize_users()
+
+PRELOAD_MODULES = ("bookingsystem", "analytics", "pricing")
+
+def preload_dashboards():
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+
+def start_setup():
+    # Idempotent; returns the Future of the one-time database setup
+    global setup_future
+    with setup_lock:
+        if setup_future is None:
+            setup_future = setup_pool.submit(setup)
+            setup_pool.submit(preload_dashboards)
+    return setup_future
+
+def main():
+    start_setup()
+    import login
+    login.main()
+
+if __name__ == "__main__":
+    main()
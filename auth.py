@@ -0,0 +1,95 @@
+import os
+import threading
+import db
+import migrations
+from sessions import SessionStore, User
+
+# Authentication
+# Users, password hashing and sessions, with no Tk dependency: the login window,
+# the dashboards and the API server all sign in through here. bcrypt is imported on
+# first use, so nothing pays for it until a password is actually checked.
+
+# bcrypt cost factor; each +1 doubles the time of a hash or check
+BCRYPT_ROUNDS = int(os.environ.get("HOTEL_BCRYPT_ROUNDS", "12"))
+
+# Database Setup
+users_initialized = False
+users_lock = threading.Lock()
+
+def initialize_users():
+    global users_initialized
+    with users_lock:
+        if not users_initialized:
+            seed_users()
+            users_initialized = True
+
+def seed_users():
+    migrations.migrate()
+    with db.cursor() as c:
+        # Create default admin user if it doesn't exist
+        c.execute("SELECT * FROM users WHERE email = %s", ("admin@gmail.com",))
+        if not c.fetchone():
+            hashed = hash_password("admin123")
+            c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+                      ("Admin", "admin@gmail.com", hashed, "admin"))
+            print("Default admin user created: email=admin@gmail.com, password=admin123")
+
+def hash_password(password, rounds=None):
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode('utf-8')
+
+def check_password(stored_password, provided_password):
+    import bcrypt
+    return bcrypt.checkpw(provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+
+def find_user(email):
+    with db.cursor() as c:
+        c.execute("SELECT userID, username, password, role FROM users WHERE email=%s", (email,))
+        row = c.fetchone()
+    return User(*row) if row else None
+
+# Signed-in users; a terminal that logs out and back in skips bcrypt until the session expires
+sessions = SessionStore(find_user)
+
+def start_session(email, password):
+    # (token, user) for valid credentials, else None
+    initialize_users()
+    session = sessions.authenticate(email, password)
+    if session:
+        return session
+    user = find_user(email)
+    if user and check_password(user.password, password):
+        return sessions.issue(user, email, password), user
+    return None
+
+def verify_login(email, password):
+    session = start_session(email, password)
+    return session[1] if session else None
+
+def end_sessions(user_id):
+    # Ends every session of the user, so their next sign-in pays bcrypt again
+    sessions.revoke_user(user_id)
+
+def change_password(user_id, new_password):
+    hashed = hash_password(new_password)
+    with db.cursor() as c:
+        c.execute("UPDATE users SET password = %s WHERE userID = %s", (hashed, user_id))
+    sessions.revoke_user(user_id)
+
+def set_user_role(user_id, role):
+    with db.cursor() as c:
+        c.execute("UPDATE users SET role = %s WHERE userID = %s", (role, user_id))
+    sessions.revoke_user(user_id)
+
+def create_user(username, email, password, role):
+    initialize_users()
+    with db.cursor() as c:
+        c.execute("SELECT * FROM users WHERE username=%s OR email=%s", (username, email))
+        if c.fetchone():
+            return False
+    
+    hashed_password = hash_password(password)
+    with db.cursor() as c:
+        c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)", 
+                 (username, email, hashed_password, role))
+    return True
@@ -0,0 +1,93 @@
+import bisect
+from datetime import datetime
+
+
+def to_day(value):
+    # Dates arrive as 'YYYY-MM-DD' strings from the entries and as date/datetime from MySQL
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%Y-%m-%d")
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+class RoomAvailabilityIndex:
+    # Per-room sorted interval lists of active (non-cancelled) bookings, grouped by room type.
+    # Stays are half-open [checkIn, checkOut) so a check-out day can be re-let the same day.
+    # A room check is a bisect plus a scan back over the stays that start within that room's
+    # longest stay (max_stay, kept exact as stays are removed); find_free_room checks the
+    # rooms of the type in order, so its cost grows with the rooms tried.
+    def __init__(self):
+        self.rooms_by_type = {}  # typeName -> [roomID, ...] in roomID order
+        self.room_type_of = {}   # roomID -> typeName
+        self.intervals = {}      # roomID -> sorted [(start, end, bookingID), ...]
+        self.max_stay = {}       # roomID -> longest stay booked in that room, bounds its backwards scan
+        self.bookings = {}       # bookingID -> (roomID, start, end)
+
+    def load(self, rooms, bookings):
+        for room_id, type_name in rooms:
+            self.add_room(room_id, type_name)
+        for booking_id, room_id, check_in, check_out in bookings:
+            self.add_booking(booking_id, room_id, check_in, check_out)
+
+    def add_room(self, room_id, type_name):
+        if room_id in self.room_type_of:
+            return
+        self.room_type_of[room_id] = type_name
+        bisect.insort(self.rooms_by_type.setdefault(type_name, []), room_id)
+        self.intervals.setdefault(room_id, [])
+
+    def add_booking(self, booking_id, room_id, check_in, check_out):
+        booking_id = int(booking_id)
+        self.remove_booking(booking_id)
+        start, end = to_day(check_in), to_day(check_out)
+        bisect.insort(self.intervals.setdefault(room_id, []), (start, end, booking_id))
+        self.max_stay[room_id] = max(self.max_stay.get(room_id, 0), end - start)
+        self.bookings[booking_id] = (room_id, start, end)
+
+    def remove_booking(self, booking_id):
+        entry = self.bookings.pop(int(booking_id), None)
+        if entry is None:
+            return
+        room_id, start, end = entry
+        items = self.intervals[room_id]
+        i = bisect.bisect_left(items, (start, end, int(booking_id)))
+        if i < len(items) and items[i] == (start, end, int(booking_id)):
+            del items[i]
+        if end - start >= self.max_stay.get(room_id, 0):
+            # The longest stay left; otherwise one long cancelled stay widens every later scan
+            self.max_stay[room_id] = max((e - s for s, e, other in items), default=0)
+
+    def is_room_free(self, room_id, check_in, check_out, exclude_booking_id=None):
+        start, end = to_day(check_in), to_day(check_out)
+        exclude = int(exclude_booking_id) if exclude_booking_id else None
+        items = self.intervals.get(room_id, [])
+        # Only stays starting before our check-out can overlap, and none starting
+        # more than max_stay days before our check-in can still be running
+        i = bisect.bisect_left(items, (end,))
+        limit = start - self.max_stay.get(room_id, 0)
+        while i > 0:
+            i -= 1
+            s, e, booking_id = items[i]
+            if s <= limit:
+                break
+            if e > start and booking_id != exclude:
+                return False
+        return True
+
+    def find_free_room(self, room_type, check_in, check_out, exclude_booking_id=None):
+        for room_id in self.rooms_by_type.get(room_type, []):
+            if self.is_room_free(room_id, check_in, check_out, exclude_booking_id):
+                return room_id
+        return None
+
+
+def free_room_counts(room_counts, sold, start_day, days):
+    # room_counts is {typeName: rooms}, sold is [(typeName, day, roomsSold), ...] as kept
+    # in daily_rollup; returns {typeName: [free rooms per day from start_day]}
+    counts = {type_name: [rooms] * days for type_name, rooms in room_counts.items()}
+    for type_name, day, rooms_sold in sold:
+        offset = to_day(day) - start_day
+        if type_name in counts and 0 <= offset < days:
+            counts[type_name][offset] = max(room_counts[type_name] - rooms_sold, 0)
+    return counts
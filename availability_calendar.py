@@ -0,0 +1,77 @@
+import calendar
+import tkinter as tk
+from datetime import date, timedelta
+
+FREE_COLOR = "#C8E6C9"
+FULL_COLOR = "#F4C7C3"
+OUTSIDE_COLOR = "#EEEEEE"
+
+
+class AvailabilityCalendar(tk.Frame):
+    # Month grid of free-room counts for one room type.
+    # set_counts() takes the result of BookingService.availability_calendar; clicking
+    # a day inside the loaded range calls on_select(date).
+    def __init__(self, master, on_select=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        self.start = None
+        self.counts = {}
+        self.room_type = None
+        self.year, self.month = date.today().year, date.today().month
+
+        header = tk.Frame(self)
+        header.grid(row=0, column=0, columnspan=7, pady=(0, 5))
+        tk.Button(header, text="<", width=3, command=lambda: self.change_month(-1)).pack(side=tk.LEFT)
+        self.month_label = tk.Label(header, width=18)
+        self.month_label.pack(side=tk.LEFT)
+        tk.Button(header, text=">", width=3, command=lambda: self.change_month(1)).pack(side=tk.LEFT)
+
+        for column, name in enumerate(calendar.day_abbr):
+            tk.Label(self, text=name[:2]).grid(row=1, column=column)
+        self.cells = []
+        for week in range(6):
+            for column in range(7):
+                cell = tk.Button(self, width=4, height=2, relief="flat")
+                cell.grid(row=week + 2, column=column, padx=1, pady=1)
+                self.cells.append(cell)
+        self.render()
+
+    def set_counts(self, start, counts):
+        self.start = start
+        self.counts = counts
+        self.render()
+
+    def show_room_type(self, room_type):
+        self.room_type = room_type
+        self.render()
+
+    def change_month(self, step):
+        self.year, self.month = divmod(self.year * 12 + self.month - 1 + step, 12)
+        self.month += 1
+        self.render()
+
+    def free_on(self, day):
+        free = self.counts.get(self.room_type)
+        if free is None or self.start is None:
+            return None
+        offset = (day - self.start).days
+        if 0 <= offset < len(free):
+            return free[offset]
+        return None
+
+    def render(self):
+        self.month_label.config(text=f"{calendar.month_name[self.month]} {self.year}")
+        days = [day for week in calendar.Calendar().monthdatescalendar(self.year, self.month) for day in week]
+        days += [days[-1] + timedelta(days=i + 1) for i in range(len(self.cells) - len(days))]
+        for cell, day in zip(self.cells, days):
+            free = self.free_on(day) if day.month == self.month else None
+            if free is None:
+                cell.config(text=str(day.day) if day.month == self.month else "", bg=OUTSIDE_COLOR,
+                            state="disabled", command="")
+            else:
+                cell.config(text=f"{day.day}\n{free} free", bg=FREE_COLOR if free else FULL_COLOR,
+                            state="normal", command=lambda day=day: self.select(day))
+
+    def select(self, day):
+        if self.on_select:
+            self.on_select(day)
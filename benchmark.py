@@ -0,0 +1,815 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+BENCH_DATABASE = "hotel_booking_bench"
+BENCH_EMAIL_DOMAIN = "bench.example"
+BENCH_PASSWORD = "benchmark-password"
+SUMMARY_KEYS = ("operation", "samples", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(name, samples, elapsed=None):
+    # elapsed: wall-clock seconds the samples were taken over, for throughput
+    ms = [s * 1000 for s in samples]
+    result = {
+        "operation": name,
+        "samples": len(ms),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3),
+    }
+    if elapsed:
+        result["ops_per_s"] = round(len(ms) / elapsed, 1)
+    return result
+
+def print_results(results):
+    for r in results:
+        extra = {k: v for k, v in r.items() if k not in SUMMARY_KEYS}
+        print(f"{r['operation']:<40} n={r['samples']:<6} mean={r['mean_ms']:>10.3f}ms "
+              f"p50={r['p50_ms']:>10.3f}ms p95={r['p95_ms']:>10.3f}ms p99={r['p99_ms']:>10.3f}ms "
+              f"max={r['max_ms']:>10.3f}ms " + " ".join(f"{k}={v}" for k, v in extra.items()))
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def use_database(args):
+    # Point the pool at the benchmark database, creating it on first use
+    import db
+
+    if args.backend == "sqlite":
+        if getattr(args, "reset", False):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(args.sqlite_path + suffix):
+                    os.remove(args.sqlite_path + suffix)
+        db.configure(pool_size=args.pool_size, backend_name="sqlite", path=args.sqlite_path)
+        return
+    import mysql.connector
+
+    server = {k: v for k, v in db.DB_CONFIG.items() if k != "database"}
+    server.update(host=args.host, port=args.port, user=args.user, password=args.password)
+    conn = mysql.connector.connect(**server)
+    try:
+        cur = conn.cursor()
+        if getattr(args, "reset", False):
+            cur.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    finally:
+        conn.close()
+    db.configure(pool_size=args.pool_size, backend_name="mysql", database=args.database, **server)
+
+# Password hashing cost (auth.check_password is what every sign-in pays)
+def bench_bcrypt(args):
+    import auth
+
+    results = []
+    for rounds in args.rounds:
+        hashes, checks = [], []
+        for _ in range(args.samples):
+            start = time.perf_counter()
+            stored = auth.hash_password(BENCH_PASSWORD, rounds=rounds)
+            hashes.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            auth.check_password(stored, BENCH_PASSWORD)
+            checks.append(time.perf_counter() - start)
+        results.append(summarize(f"bcrypt hash rounds={rounds}", hashes))
+        results.append(summarize(f"bcrypt login rounds={rounds}", checks))
+    return results
+
+# Group booking: per-room cost of add_bookings_bulk against one create_booking call per room
+def bench_bulk(args):
+    import migrations
+    from booking_service import BookingService, NoAvailabilityError
+
+    use_database(args)
+    migrations.migrate()
+    service = BookingService()
+    room_types = service.room_types()
+    created = []
+    single, bulk = [], []
+    try:
+        for i in range(args.iterations):
+            # Two disjoint far-future windows per iteration so neither path sees the other's rooms taken
+            base = date.today() + timedelta(days=400 + i * 20)
+            windows = [(base, base + timedelta(days=3)), (base + timedelta(days=10), base + timedelta(days=13))]
+            requests = [[(room_types[n % len(room_types)], str(check_in), str(check_out), "Cash")
+                         for n in range(args.rooms)] for check_in, check_out in windows]
+
+            start = time.perf_counter()
+            for request in requests[0]:
+                try:
+                    created.append(service.create_booking(args.user_id, *request).booking_id)
+                except NoAvailabilityError:
+                    pass
+            single.append((time.perf_counter() - start) / args.rooms)
+
+            start = time.perf_counter()
+            try:
+                booked = service.add_bookings_bulk(args.user_id, requests[1])
+            except NoAvailabilityError:
+                booked = []
+            bulk.append((time.perf_counter() - start) / args.rooms)
+            created.extend(result.booking_id for result in booked)
+    finally:
+        for booking_id in created:
+            service.delete_booking(booking_id)
+    return [summarize(f"create_booking per room (x{args.rooms})", single),
+            summarize(f"add_bookings_bulk per room (x{args.rooms})", bulk)]
+
+
+# Synthetic Data
+def synthetic_stays(room_count, count, start, rng):
+    # Yields (room index, check_in, nights, status), back to back per room with random gaps
+    # so nothing overlaps. Stays skew short (mostly 1-4 nights, up to 14) and gaps
+    # shrink in the summer months and around the new year, like a resort's season.
+    per_room = [count // room_count + (1 if i < count % room_count else 0) for i in range(room_count)]
+    today = date.today()
+    for room, stays in enumerate(per_room):
+        day = start + timedelta(days=rng.randrange(7))
+        for _ in range(stays):
+            busy = day.month in (6, 7, 8, 12)
+            day += timedelta(days=int(rng.expovariate(1 / (1.0 if busy else 3.0))))
+            nights = min(14, 1 + int(rng.expovariate(1 / 2.0)))
+            if day >= today:
+                status = "confirmed" if rng.random() < 0.6 else "pending"
+            else:
+                status = "cancelled" if rng.random() < 0.1 else "confirmed"
+            yield room, day, nights, status
+            day += timedelta(days=nights)
+
+def bench_seed(args):
+    import auth
+    import migrations
+    import rollup
+    import db
+
+    use_database(args)
+    migrations.migrate()
+    rng = random.Random(args.seed)
+    results = []
+
+    with db.cursor() as c:
+        c.execute("SELECT roomTypeID, basePrice FROM room_types ORDER BY roomTypeID")
+        room_types = c.fetchall()
+        c.execute("SELECT COUNT(*) FROM rooms")
+        first_number = c.fetchone()[0]
+    started = time.perf_counter()
+    with db.transaction() as c:
+        rooms = [(room_types[i % len(room_types)][0], f"B{first_number + i:05d}") for i in range(args.rooms)]
+        c.executemany("INSERT INTO rooms (roomTypeID, roomNumber) VALUES (%s, %s)", rooms)
+        c.execute("SELECT @@auto_increment_increment")
+        step = c.fetchone()[0]
+        room_ids = [c.lastrowid + i * step for i in range(args.rooms)]
+        # One hash for every synthetic user; hashing each would dominate the seed time
+        hashed = auth.hash_password(BENCH_PASSWORD)
+        c.executemany("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, 'customer')",
+                      [(f"bench{i}", f"bench{i}@{BENCH_EMAIL_DOMAIN}", hashed) for i in range(args.users)])
+        user_ids = [c.lastrowid + i * step for i in range(args.users)]
+    price_of = dict(room_types)
+    type_of = {room_id: type_id for room_id, (type_id, number) in zip(room_ids, rooms)}
+
+    stays = synthetic_stays(args.rooms, args.bookings, date.today() - timedelta(days=args.history_days), rng)
+    inserted = 0
+    while inserted < args.bookings:
+        batch = []
+        for room, check_in, nights, status in stays:
+            room_id = room_ids[room]
+            amount = nights * price_of[type_of[room_id]]
+            batch.append((rng.choice(user_ids), room_id, check_in, check_in + timedelta(days=nights), status, amount))
+            if len(batch) == args.batch:
+                break
+        if not batch:
+            break
+        with db.transaction() as c:
+            c.executemany("""
+                INSERT INTO bookings (userID, roomID, checkInDate, checkOutDate, status, totalAmount)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, batch)
+            booking_ids = [c.lastrowid + i * step for i in range(len(batch))]
+            c.executemany("""
+                INSERT INTO transactions (bookingID, amount, transactionDate, paymentMethod, status)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [(booking_id, row[5], datetime.combine(row[2], datetime.min.time()) - timedelta(days=rng.randrange(60)),
+                   rng.choice(("Cash", "GCash", "Credit Card")), row[4]) for booking_id, row in zip(booking_ids, batch)])
+        inserted += len(batch)
+        print(f"  {inserted}/{args.bookings} bookings", end="\r")
+    print()
+    results.append({"operation": "seed", "rooms": args.rooms, "users": args.users, "bookings": inserted,
+                    "seconds": round(time.perf_counter() - started, 1)})
+    started = time.perf_counter()
+    rollup.rebuild()
+    results.append({"operation": "rollup rebuild", "seconds": round(time.perf_counter() - started, 1)})
+    return results
+
+# Hot Paths
+def bench_users(limit=1000):
+    import db
+
+    with db.cursor() as c:
+        c.execute("SELECT userID, email FROM users WHERE email LIKE %s LIMIT %s", (f"%@{BENCH_EMAIL_DOMAIN}", limit))
+        users = c.fetchall()
+    if not users:
+        sys.exit("No synthetic users; run `benchmark.py seed` first")
+    return users
+
+def random_stay(rng, horizon=365):
+    check_in = date.today() + timedelta(days=1 + rng.randrange(horizon))
+    return str(check_in), str(check_in + timedelta(days=1 + rng.randrange(5)))
+
+def hot_path_operations(service, users, room_types, rng, created):
+    # name -> zero-argument callable, one call per sample
+    from booking_service import BookingError
+    import db
+    import auth
+
+    with db.cursor() as c:
+        c.execute("SELECT checkInDate, bookingID FROM bookings ORDER BY checkInDate, bookingID LIMIT 1 OFFSET %s",
+                  (rng.randrange(1000),))
+        deep_key = c.fetchone()
+        c.execute("SELECT roomID FROM rooms")
+        room_ids = [row[0] for row in c.fetchall()]
+
+    def check_availability_db():
+        with db.cursor() as c:
+            service.find_overlapping_bookings(c, rng.choice(room_ids), *random_stay(rng))
+
+    def login_uncached():
+        # Ending the user's sessions first makes the sign-in pay the full bcrypt check
+        user_id, email = rng.choice(users)
+        auth.end_sessions(user_id)
+        auth.verify_login(email, BENCH_PASSWORD)
+
+    # Sessions for a few users, so their sign-ins are served from the session cache
+    cached_users = users[:5]
+    for user_id, email in cached_users:
+        auth.verify_login(email, BENCH_PASSWORD)
+
+    def add_booking():
+        try:
+            created.append(service.create_booking(rng.choice(users)[0], rng.choice(room_types),
+                                                  *random_stay(rng), "Cash").booking_id)
+        except BookingError:
+            pass  # fully booked is a valid outcome of the path
+
+    return {
+        "check_room_availability (index)": lambda: service.check_room_availability(rng.choice(room_types), *random_stay(rng)),
+        "check_room_availability (db)": check_availability_db,
+        "add_booking": add_booking,
+        "show_bookings": lambda: service.list_user_bookings(rng.choice(users)[0]),
+        "show_all_bookings first page": lambda: service.list_bookings(),
+        "show_all_bookings deep page": lambda: service.list_bookings(after=deep_key),
+        "login (session cache)": lambda: auth.verify_login(rng.choice(cached_users)[1], BENCH_PASSWORD),
+        "login (bcrypt)": login_uncached,
+    }
+
+def bench_hotpaths(args):
+    import migrations
+    from booking_service import BookingService
+
+    use_database(args)
+    migrations.migrate()
+    rng = random.Random(args.seed)
+    service = BookingService()
+    users = bench_users()
+    room_types = service.room_types()
+    created = []
+    results = []
+    try:
+        results.append(summarize("availability index build", [timed(service.get_availability_index)]))
+        operations = hot_path_operations(service, users, room_types, rng, created)
+        for name, operation in operations.items():
+            samples = args.login_samples if name == "login (bcrypt)" else args.samples
+            started = time.perf_counter()
+            latencies = [timed(operation) for _ in range(samples)]
+            results.append(summarize(name, latencies, time.perf_counter() - started))
+
+        # Mixed read/write load from N concurrent clients sharing the process pool
+        for clients in args.clients:
+            latencies = {name: [] for name in operations}
+            lock = threading.Lock()
+            deadline = time.perf_counter() + args.duration
+            weights = [0.3, 0.1, 0.05, 0.3, 0.1, 0.1, 0.04, 0.01]
+
+            def client(seed):
+                client_rng = random.Random(seed)
+                while time.perf_counter() < deadline:
+                    name = client_rng.choices(list(operations), weights)[0]
+                    elapsed = timed(operations[name])
+                    with lock:
+                        latencies[name].append(elapsed)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=clients) as executor:
+                for future in [executor.submit(client, args.seed + i) for i in range(clients)]:
+                    future.result()
+            elapsed = time.perf_counter() - started
+            total = sum(len(samples) for samples in latencies.values())
+            results.append({"operation": f"mixed load clients={clients}", "samples": total,
+                            "ops_per_s": round(total / elapsed, 1)})
+            results.extend(summarize(f"  {name} clients={clients}", samples, elapsed)
+                           for name, samples in latencies.items() if samples)
+    finally:
+        for booking_id in created:
+            service.delete_booking(booking_id)
+    return results
+
+# Concurrent Writers
+def bench_writers(args):
+    # Every writer is its own BookingService, like separate terminals, and all of them
+    # race for the same few stays; afterwards no room may hold two overlapping bookings
+    import db
+    import migrations
+    from booking_service import BookingService, NoAvailabilityError
+
+    use_database(args)
+    migrations.migrate()
+    users = bench_users()
+    room_type = BookingService().room_types()[0]
+    base = date.today() + timedelta(days=700 + random.Random(args.seed).randrange(300))
+    windows = [(str(base + timedelta(days=i)), str(base + timedelta(days=i + 2))) for i in range(args.windows)]
+
+    created, latencies, outcomes = [], [], {"booked": 0, "no_availability": 0, "error": 0}
+    lock = threading.Lock()
+
+    def writer(seed):
+        rng = random.Random(seed)
+        service = BookingService()
+        for _ in range(args.attempts):
+            start = time.perf_counter()
+            try:
+                booking_id = service.create_booking(rng.choice(users)[0], room_type, *rng.choice(windows), "Cash").booking_id
+                outcome = "booked"
+            except NoAvailabilityError:
+                booking_id, outcome = None, "no_availability"
+            except Exception as e:
+                booking_id, outcome = None, "error"
+                print(f"Writer error: {e}")
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                outcomes[outcome] += 1
+                if booking_id:
+                    created.append(booking_id)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.writers) as executor:
+        for future in [executor.submit(writer, args.seed + i) for i in range(args.writers)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    try:
+        with db.cursor() as c:
+            placeholders = ", ".join(["%s"] * len(created)) or "NULL"
+            c.execute(f"""
+                SELECT COUNT(*)
+                FROM bookings a
+                JOIN bookings b ON a.roomID = b.roomID AND a.bookingID != b.bookingID
+                WHERE b.bookingID IN ({placeholders})
+                AND a.status != 'cancelled' AND b.status != 'cancelled'
+                AND a.checkInDate < b.checkOutDate AND b.checkInDate < a.checkOutDate
+            """, created)
+            double_bookings = c.fetchone()[0]
+    finally:
+        service = BookingService()
+        for booking_id in created:
+            service.delete_booking(booking_id)
+
+    result = summarize(f"concurrent create_booking writers={args.writers}", latencies, elapsed)
+    result.update(outcomes, double_bookings=double_bookings)
+    if double_bookings:
+        print(f"DOUBLE BOOKINGS: {double_bookings} overlapping pairs")
+    return [result]
+
+# API Load Test
+def api_call(conn, method, path, body=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    conn.request(method, path, json.dumps(body).encode() if body is not None else None, headers)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read() or b"{}")
+
+def bench_api(args):
+    # Requests per second through the JSON API from N keep-alive clients, each signed in
+    # once as its own synthetic user. Without --url the server runs in this process on
+    # the benchmark database (clients then share its GIL, so --url gives the fairer number).
+    import http.client
+    from urllib.parse import urlparse
+
+    server = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        import api_server
+        import migrations
+
+        use_database(args)
+        migrations.migrate()
+        server = api_server.make_server("127.0.0.1", 0, args.workers)
+        threading.Thread(target=server.serve_forever, name="api-bench", daemon=True).start()
+        host, port = server.server_address
+    emails = [f"bench{i}@{BENCH_EMAIL_DOMAIN}" for i in range(args.users)]
+
+    results = []
+    try:
+        for clients in args.clients:
+            latencies = {name: [] for name in ("login", "availability", "calendar", "list bookings", "create", "cancel")}
+            failures = {"errors": 0, "no_availability": 0}
+            lock = threading.Lock()
+            start_line = threading.Barrier(clients + 1, timeout=120)
+
+            def record(name, started, status):
+                with lock:
+                    latencies[name].append(time.perf_counter() - started)
+                    if status == 409:
+                        failures["no_availability"] += 1
+                    elif status >= 400:
+                        failures["errors"] += 1
+
+            def client(seed):
+                rng = random.Random(seed)
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+                started = time.perf_counter()
+                status, body = api_call(conn, "POST", "/login", {"email": rng.choice(emails), "password": BENCH_PASSWORD})
+                record("login", started, status)
+                token = body.get("token")
+                room_types = api_call(conn, "GET", "/room-types", token=token)[1].get("roomTypes", [])
+                start_line.wait()
+                deadline = time.perf_counter() + args.duration
+                while token and room_types and time.perf_counter() < deadline:
+                    check_in, check_out = random_stay(rng)
+                    name = rng.choices(["availability", "calendar", "list bookings", "create"], [0.4, 0.15, 0.25, 0.2])[0]
+                    started = time.perf_counter()
+                    if name == "availability":
+                        status, body = api_call(conn, "GET", f"/availability?check_in={check_in}&check_out={check_out}",
+                                                token=token)
+                    elif name == "calendar":
+                        status, body = api_call(conn, "GET", "/availability/calendar?days=30", token=token)
+                    elif name == "list bookings":
+                        status, body = api_call(conn, "GET", "/bookings", token=token)
+                    else:
+                        status, body = api_call(conn, "POST", "/bookings", {
+                            "room_type": rng.choice(room_types), "check_in": check_in, "check_out": check_out,
+                            "payment_method": "Cash"}, token=token)
+                    record(name, started, status)
+                    if name == "create" and status == 201:
+                        # Cancel straight away so the run doesn't fill the calendar
+                        started = time.perf_counter()
+                        status, _ = api_call(conn, "POST", f"/bookings/{body['booking_id']}/cancel", token=token)
+                        record("cancel", started, status)
+                conn.close()
+
+            threads = [threading.Thread(target=client, args=(args.seed + i,)) for i in range(clients)]
+            for thread in threads:
+                thread.start()
+            start_line.wait()
+            started = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            total = sum(len(samples) for name, samples in latencies.items() if name != "login")
+            results.append({"operation": f"api clients={clients}", "requests": total,
+                            "requests_per_s": round(total / elapsed, 1), **failures})
+            results.extend(summarize(f"  {name} clients={clients}", samples, elapsed if name != "login" else None)
+                           for name, samples in latencies.items() if samples)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+    return results
+
+# Sharded Allocation
+def ensure_shard_room_types(count, rooms_per_type):
+    # Room types "Shard 1".."Shard N" with their own rooms, so every worker owns a partition
+    import db
+    from catalog import room_type_catalog
+
+    names = [f"Shard {i + 1}" for i in range(count)]
+    with db.transaction() as c:
+        for name in names:
+            c.execute("SELECT roomTypeID FROM room_types WHERE typeName = %s", (name,))
+            if c.fetchone():
+                continue
+            c.execute("INSERT INTO room_types (typeName, basePrice) VALUES (%s, %s)", (name, 100))
+            type_id = c.lastrowid
+            c.executemany("INSERT INTO rooms (roomTypeID, roomNumber) VALUES (%s, %s)",
+                          [(type_id, f"S{type_id}-{n}") for n in range(rooms_per_type)])
+    room_type_catalog.invalidate()
+    return names
+
+def bench_shards(args):
+    # Allocation throughput with the engine split over 1, 2, 4, 8 worker processes.
+    # Each client books random far-future stays in random shard room types. On SQLite
+    # every writer shares one file lock, so expect the scaling to show on MySQL only.
+    import migrations
+    from booking_service import BookingService, NoAvailabilityError
+    from sharding import ShardedBookingService
+
+    use_database(args)
+    migrations.migrate()
+    users = bench_users()
+    room_types = ensure_shard_room_types(args.room_types, args.rooms_per_type)
+    results, created = [], []
+    try:
+        for workers in args.workers:
+            service = ShardedBookingService(workers)
+            try:
+                service.warm_up()
+                latencies, outcomes = [], {"booked": 0, "no_availability": 0}
+                lock = threading.Lock()
+
+                def client(seed):
+                    rng = random.Random(seed)
+                    for _ in range(args.attempts):
+                        room_type = rng.choice(room_types)
+                        check_in, check_out = random_stay(rng, horizon=args.horizon)
+                        start = time.perf_counter()
+                        try:
+                            booking_id = service.create_booking(rng.choice(users)[0], room_type, check_in, check_out,
+                                                                "Cash").booking_id
+                            outcome = "booked"
+                        except NoAvailabilityError:
+                            booking_id, outcome = None, "no_availability"
+                        with lock:
+                            latencies.append(time.perf_counter() - start)
+                            outcomes[outcome] += 1
+                            if booking_id:
+                                created.append(booking_id)
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.clients) as executor:
+                    for future in [executor.submit(client, args.seed + workers * 1000 + i) for i in range(args.clients)]:
+                        future.result()
+                result = summarize(f"sharded create_booking workers={workers}", latencies,
+                                   time.perf_counter() - started)
+                result.update(outcomes)
+                results.append(result)
+            finally:
+                service.close()
+    finally:
+        service = BookingService()
+        for booking_id in created:
+            service.delete_booking(booking_id)
+    if results:
+        base = results[0]["ops_per_s"]
+        for result in results:
+            result["speedup"] = round(result["ops_per_s"] / base, 2)
+    return results
+
+# Pricing
+BENCH_RULES = [
+    ("weekend", None, None, None, "4,5", None, None, "1.2"),
+    ("season", None, "07-01", "09-01", None, None, None, "1.3"),
+    ("occupancy", None, None, None, None, None, "0.7", "1.15"),
+    ("occupancy", None, None, None, None, None, "0.9", "1.4"),
+    ("length_of_stay", None, None, None, None, 7, None, "0.9"),
+]
+
+def bench_rules():
+    # A fixed rule set, so the benchmark never writes to pricing_rules
+    from pricing import Rule
+    from decimal import Decimal
+
+    year = date.today().year
+    rules = []
+    for rule_id, (kind, type_id, start, end, weekdays, min_nights, min_occupancy, multiplier) in enumerate(BENCH_RULES, 1):
+        start = date.fromisoformat(f"{year}-{start}") if start else None
+        end = date.fromisoformat(f"{year}-{end}") if end else None
+        rules.append(Rule(rule_id, kind, type_id, start, end, weekdays, min_nights,
+                          Decimal(min_occupancy) if min_occupancy else None, Decimal(multiplier)))
+    return rules
+
+def bench_pricing(args):
+    # Quotes from the compiled rate calendar against evaluating the rules night by night,
+    # which reads the stay's occupancy from daily_rollup on every quote
+    import migrations
+    import numpy as np
+    import pricing
+    from availability import to_day
+
+    use_database(args)
+    migrations.migrate()
+    rng = random.Random(args.seed)
+    rules = bench_rules()
+    engine = pricing.PricingEngine(rule_loader=lambda: rules)
+    room_types = [room_type for room_type in engine.catalog.room_types() if room_type.base_price is not None]
+    counts = pricing.load_room_counts()
+    stays = [(rng.choice(room_types),) + random_stay(rng, args.horizon) for _ in range(args.samples)]
+
+    def per_night(room_type, check_in, check_out):
+        first, last = to_day(check_in), to_day(check_out)
+        days = np.arange(first, last)
+        sold = np.zeros(last - first)
+        for type_id, day, rooms_sold in pricing.load_rooms_sold(first, last, room_type.room_type_id):
+            sold[to_day(day) - first] = rooms_sold
+        rooms = counts.get(room_type.room_type_id, 0)
+        occupancy = sold / rooms if rooms else sold
+        factors = (pricing.static_factors(rules, room_type.room_type_id, days)
+                   * pricing.occupancy_factors(rules, room_type.room_type_id, days, occupancy))
+        cents = int(pricing.to_cents(room_type.base_price, factors).sum())
+        multiplier = pricing.stay_multiplier(rules, room_type.room_type_id, last - first)
+        return (pricing.Decimal(cents) * multiplier / 100).quantize(pricing.CENTS)
+
+    results = [summarize("rate calendar build", [timed(engine.rebuild)])]
+    mismatches = sum(engine.quote(room_type.type_name, check_in, check_out) != per_night(room_type, check_in, check_out)
+                     for room_type, check_in, check_out in stays)
+    for name, quote in [
+        ("quote, rules per night", lambda stay: per_night(*stay)),
+        ("quote, rate calendar", lambda stay: engine.quote(stay[0].type_name, stay[1], stay[2])),
+    ]:
+        started = time.perf_counter()
+        latencies = [timed(quote, stay) for stay in stays]
+        results.append(summarize(name, latencies, time.perf_counter() - started))
+
+    def after_write(stay):
+        # A booking on the same nights marks them dirty; the quote re-reads just that slice
+        engine.occupancy_changed(stay[0].room_type_id, stay[1], stay[2])
+        engine.quote(stay[0].type_name, stay[1], stay[2])
+
+    started = time.perf_counter()
+    latencies = [timed(after_write, stay) for stay in stays]
+    results.append(summarize("quote after a booking write", latencies, time.perf_counter() - started))
+    results[-1]["mismatches"] = mismatches
+    return results
+
+# Startup
+def import_times(module):
+    # [(name, depth, self seconds, cumulative seconds)] from a fresh `python -X importtime`
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    if completed.returncode:
+        sys.exit(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return rows
+
+def bench_startup(args):
+    # Import cost of each entry point, which is most of the time before the first window
+    results = []
+    for module in args.modules:
+        totals, walls = [], []
+        for _ in range(args.samples):
+            started = time.perf_counter()
+            rows = import_times(module)
+            walls.append(time.perf_counter() - started)
+            totals.append(next(cumulative for name, depth, own, cumulative in rows if name == module and depth == 0))
+        results.append(summarize(f"import {module}", totals))
+        results.append(summarize(f"  interpreter start + import {module}", walls))
+        # What the entry point pulls in directly, slowest first, from the last run. Children
+        # are listed before their parent, one level deeper.
+        position = max(i for i, row in enumerate(rows) if row[0] == module and row[1] == 0)
+        direct = []
+        for name, depth, own, cumulative in reversed(rows[:position]):
+            if depth == 0:
+                break
+            if depth == 1:
+                direct.append((cumulative, name))
+        direct.sort()
+        for cumulative, name in reversed(direct[-args.top:]):
+            results.append({"operation": f"  {module} imports {name}", "ms": round(cumulative * 1000, 1)})
+    return results
+
+# Regression Check
+def compare_results(args):
+    with open(args.baseline) as f:
+        before = {r["operation"]: r for r in json.load(f)["results"]}
+    with open(args.current) as f:
+        after = {r["operation"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    for name, new in after.items():
+        old = before.get(name)
+        if not old or "p95_ms" not in old or "p95_ms" not in new:
+            continue
+        change = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+        flag = "  REGRESSION" if change > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<40} p95 {old['p95_ms']:>10.3f}ms -> {new['p95_ms']:>10.3f}ms ({change:+.1f}%){flag}")
+    if regressions:
+        sys.exit(1)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hotel booking benchmarks")
+    parser.add_argument("--json", help="also write the results to this file for `compare`")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    # Everything that touches the database runs against its own database, never the live one
+    database = argparse.ArgumentParser(add_help=False)
+    database.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql")
+    database.add_argument("--sqlite-path", default=BENCH_DATABASE + ".db", help="database file for --backend sqlite")
+    database.add_argument("--database", default=BENCH_DATABASE)
+    database.add_argument("--host", default="localhost")
+    database.add_argument("--port", type=int, default=3306)
+    database.add_argument("--user", default="root")
+    database.add_argument("--password", default="")
+    database.add_argument("--pool-size", type=int, default=16)
+    database.add_argument("--seed", type=int, default=42, help="random seed, so runs are repeatable")
+
+    p = sub.add_parser("bcrypt", help="login and registration latency per bcrypt cost factor")
+    p.add_argument("--rounds", type=int, nargs="+", default=[4, 8, 10, 12, 14])
+    p.add_argument("--samples", type=int, default=5)
+    p.set_defaults(func=bench_bcrypt)
+
+    p = sub.add_parser("bulk", parents=[database], help="per-room cost of group bookings against single bookings")
+    p.add_argument("--rooms", type=int, default=6, help="rooms per group; the seed data has 6")
+    p.add_argument("--iterations", type=int, default=10)
+    p.add_argument("--user-id", type=int, default=1)
+    p.set_defaults(func=bench_bulk)
+
+    p = sub.add_parser("seed", parents=[database], help="fill the benchmark database with synthetic data")
+    p.add_argument("--bookings", type=int, default=100000, help="e.g. 1000 up to 10000000")
+    p.add_argument("--rooms", type=int, default=200)
+    p.add_argument("--users", type=int, default=5000)
+    p.add_argument("--history-days", type=int, default=730, help="how far back the first stays start")
+    p.add_argument("--batch", type=int, default=5000, help="bookings per INSERT transaction")
+    p.add_argument("--reset", action="store_true", help="drop and recreate the benchmark database first")
+    p.set_defaults(func=bench_seed)
+
+    p = sub.add_parser("hotpaths", parents=[database], help="latency and throughput of the booking hot paths")
+    p.add_argument("--samples", type=int, default=200)
+    p.add_argument("--login-samples", type=int, default=10, help="samples of login (bcrypt), which pays a full bcrypt check each time")
+    p.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    p.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    p.set_defaults(func=bench_hotpaths)
+
+    p = sub.add_parser("writers", parents=[database], help="concurrent writers racing for the same rooms")
+    p.add_argument("--writers", type=int, default=8)
+    p.add_argument("--attempts", type=int, default=20, help="bookings each writer tries")
+    p.add_argument("--windows", type=int, default=3, help="distinct stays the writers compete for")
+    p.set_defaults(func=bench_writers)
+
+    p = sub.add_parser("api", parents=[database], help="requests per second through the JSON API server")
+    p.add_argument("--url", help="benchmark a running api_server.py instead of starting one in-process")
+    p.add_argument("--workers", type=int, default=32, help="server worker threads when started in-process")
+    p.add_argument("--users", type=int, default=50, help="synthetic users to sign in as; `seed` creates them")
+    p.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    p.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    p.set_defaults(func=bench_api)
+
+    p = sub.add_parser("shards", parents=[database], help="allocation throughput across sharded worker processes")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--room-types", type=int, default=8, help="partitions to spread the load over")
+    p.add_argument("--rooms-per-type", type=int, default=20)
+    p.add_argument("--clients", type=int, default=32)
+    p.add_argument("--attempts", type=int, default=25, help="bookings each client tries per worker count")
+    p.add_argument("--horizon", type=int, default=3000, help="days ahead the stays are spread over")
+    p.set_defaults(func=bench_shards)
+
+    p = sub.add_parser("pricing", parents=[database], help="stay quotes from the rate calendar against per-night rules")
+    p.add_argument("--samples", type=int, default=2000)
+    p.add_argument("--horizon", type=int, default=365, help="days ahead the stays start in")
+    p.set_defaults(func=bench_pricing)
+
+    p = sub.add_parser("startup", help="import time of the entry points, via python -X importtime")
+    p.add_argument("--modules", nargs="+", default=["app", "login", "bookingsystem", "api_server"])
+    p.add_argument("--samples", type=int, default=5)
+    p.add_argument("--top", type=int, default=8, help="direct imports to list per entry point")
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser("compare", help="compare two --json result files and flag p95 regressions")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=10, help="percent p95 increase counted as a regression")
+    p.set_defaults(func=compare_results)
+
+    args = parser.parse_args()
+    results = args.func(args)
+    if results is None:
+        return
+    for r in results:
+        if "p50_ms" in r:
+            print_results([r])
+        else:
+            print(" ".join(f"{k}={v}" for k, v in r.items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"command": args.command, "timestamp": datetime.now().isoformat(timespec="seconds"),
+                       "args": {k: v for k, v in vars(args).items() if k not in ("func", "password")},
+                       "results": results}, f, indent=2)
+    if any(r.get("double_bookings") for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
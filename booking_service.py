@@ -0,0 +1,492 @@
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+import db
+import rollup
+from availability import RoomAvailabilityIndex, free_room_counts, to_day
+from catalog import room_type_catalog
+from change_feed import record_event, record_events, record_booking_event
+
+RETRYABLE_ERRNOS = (1213, 1205)  # ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT
+MAX_TRANSACTION_ATTEMPTS = 3
+STATUSES = ("pending", "confirmed", "cancelled")
+CALENDAR_DAYS = 90
+
+BookingResult = namedtuple("BookingResult", ["booking_id", "room_id", "total_amount"])
+
+USER_BOOKINGS_QUERY = """
+    SELECT b.bookingID, b.userID, rt.typeName, r.roomNumber,
+           b.checkInDate, b.checkOutDate, b.status, b.totalAmount
+    FROM bookings b
+    JOIN rooms r ON b.roomID = r.roomID
+    JOIN room_types rt ON r.roomTypeID = rt.roomTypeID
+    WHERE b.userID = %s
+"""
+
+ADMIN_BOOKINGS_QUERY = """
+    SELECT b.bookingID, u.username, rt.typeName, r.roomNumber,
+           b.checkInDate, b.checkOutDate, b.status, b.totalAmount
+    FROM bookings b
+    JOIN rooms r ON b.roomID = r.roomID
+    JOIN room_types rt ON r.roomTypeID = rt.roomTypeID
+    JOIN users u ON b.userID = u.userID
+"""
+
+
+class BookingError(Exception):
+    pass
+
+class ValidationError(BookingError):
+    pass
+
+class NoAvailabilityError(BookingError):
+    def __init__(self, message="No rooms available for selected dates"):
+        super().__init__(message)
+
+class BookingNotFoundError(BookingError):
+    def __init__(self, message="Booking not found"):
+        super().__init__(message)
+
+
+def validate_stay(check_in, check_out):
+    try:
+        check_in_date = datetime.strptime(check_in, "%Y-%m-%d")
+        check_out_date = datetime.strptime(check_out, "%Y-%m-%d")
+    except ValueError:
+        raise ValidationError("Invalid date format. Use YYYY-MM-DD") from None
+    if check_out_date <= check_in_date:
+        raise ValidationError("Check-out date must be after check-in date")
+    if check_in_date < datetime.now():
+        raise ValidationError("Check-in date cannot be in the past")
+
+def parse_day(value, field):
+    # Report and export filters: 'YYYY-MM-DD' or a date
+    try:
+        return date.fromordinal(to_day(value))
+    except ValueError:
+        raise ValidationError(f"Invalid {field} date. Use YYYY-MM-DD") from None
+
+
+class BookingService:
+    # Booking operations with no Tk dependency: every method takes plain values,
+    # returns data and raises BookingError subclasses (or db.Error)
+    def __init__(self, catalog=room_type_catalog, pricing=None):
+        self.catalog = catalog
+        self.pricing = pricing
+        self.availability_index = None
+        self.index_lock = threading.RLock()
+
+    # Room Availability Index
+    def get_availability_index(self):
+        with self.index_lock:
+            if self.availability_index is None:
+                index = RoomAvailabilityIndex()
+                with db.cursor() as c:
+                    c.execute("""
+                        SELECT r.roomID, rt.typeName
+                        FROM rooms r
+                        JOIN room_types rt ON r.roomTypeID = rt.roomTypeID
+                        ORDER BY r.roomID
+                    """)
+                    rooms = c.fetchall()
+                    c.execute("""
+                        SELECT bookingID, roomID, checkInDate, checkOutDate
+                        FROM bookings
+                        WHERE status != 'cancelled'
+                    """)
+                    index.load(rooms, c.fetchall())
+                self.availability_index = index
+            return self.availability_index
+
+    def index_booking(self, booking_id, room_id, check_in, check_out):
+        with self.index_lock:
+            self.get_availability_index().add_booking(booking_id, room_id, check_in, check_out)
+
+    def unindex_booking(self, booking_id):
+        with self.index_lock:
+            self.get_availability_index().remove_booking(booking_id)
+
+    def refresh_indexed_booking(self, booking_id):
+        # Re-read one booking after a write whose outcome we don't know locally (e.g. status changes)
+        with db.cursor() as c:
+            c.execute("SELECT roomID, checkInDate, checkOutDate, status FROM bookings WHERE bookingID = %s", (booking_id,))
+            row = c.fetchone()
+        if row and row[3] != 'cancelled':
+            self.index_booking(booking_id, row[0], row[1], row[2])
+        else:
+            self.unindex_booking(booking_id)
+
+    def check_room_availability(self, room_type, check_in, check_out, exclude_booking_id=None):
+        with self.index_lock:
+            return self.get_availability_index().find_free_room(room_type, check_in, check_out, exclude_booking_id)
+
+    def availability_calendar(self, start=None, days=CALENDAR_DAYS):
+        # Free rooms per room type per night from `start`, read from daily_rollup so the
+        # cost is O(days x room types) however many bookings there are.
+        # Returns {typeName: [free rooms on start, start + 1 day, ...]}.
+        start = start or date.today()
+        end = date.fromordinal(to_day(start) + days)
+        with db.cursor() as c:
+            c.execute("""
+                SELECT rt.typeName, COUNT(r.roomID)
+                FROM room_types rt
+                LEFT JOIN rooms r ON r.roomTypeID = rt.roomTypeID
+                GROUP BY rt.roomTypeID, rt.typeName
+            """)
+            room_counts = dict(c.fetchall())
+            c.execute("""
+                SELECT rt.typeName, d.day, d.roomsSold
+                FROM daily_rollup d
+                JOIN room_types rt ON d.roomTypeID = rt.roomTypeID
+                WHERE d.day >= %s AND d.day < %s
+            """, (start, end))
+            sold = c.fetchall()
+        return free_room_counts(room_counts, sold, to_day(start), days)
+
+    # Pricing
+    def room_types(self):
+        return self.catalog.names()
+
+    def get_pricing_engine(self):
+        if self.pricing is None:
+            # numpy loads with the first quote, not at startup
+            from pricing import pricing_engine
+            self.pricing = pricing_engine
+        return self.pricing
+
+    def calculate_total_amount(self, room_type, check_in, check_out):
+        return self.get_pricing_engine().quote(room_type, check_in, check_out)
+
+    def occupancy_changed(self, *states):
+        # After a write commits: states are (roomTypeID, checkIn, checkOut, ...) before and after, or None
+        if self.pricing is None:
+            return
+        for state in states:
+            if state:
+                self.pricing.occupancy_changed(state[0], state[1], state[2])
+
+    # Booking Allocation
+    def run_in_transaction(self, work):
+        for attempt in range(MAX_TRANSACTION_ATTEMPTS):
+            try:
+                # READ COMMITTED so the checks made under the room-type lock see rows committed by other terminals
+                with db.transaction(isolation_level='READ COMMITTED') as c:
+                    return work(c)
+            except db.Error as e:
+                if getattr(e, "errno", None) not in RETRYABLE_ERRNOS or attempt == MAX_TRANSACTION_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.05 * 2 ** attempt + random.uniform(0, 0.05))
+
+    def resolve_room_type(self, room_type):
+        # Called before a transaction starts: a catalog reload inside one would take a
+        # second pooled connection while the transaction holds the first
+        catalog_entry = self.catalog.get(room_type)
+        if catalog_entry is None:
+            raise ValidationError(f"Unknown room type: {room_type}")
+        return catalog_entry
+
+    def lock_room_type(self, c, room_type_id):
+        # Locking every room row of the type serializes allocations per room type across terminals
+        c.execute("""
+            SELECT roomID
+            FROM rooms
+            WHERE roomTypeID = %s
+            ORDER BY roomID
+            FOR UPDATE
+        """, (room_type_id,))
+        return [row[0] for row in c.fetchall()]
+
+    def find_overlapping_bookings(self, c, room_id, check_in, check_out, exclude_booking_id=None):
+        query = """
+            SELECT bookingID, checkInDate, checkOutDate
+            FROM bookings
+            WHERE roomID = %s AND status != 'cancelled'
+            AND %s < checkOutDate AND %s > checkInDate
+        """
+        params = [room_id, check_in, check_out]
+        if exclude_booking_id:
+            query += " AND bookingID != %s"
+            params.append(exclude_booking_id)
+        c.execute(query, params)
+        return c.fetchall()
+
+    def allocate_room(self, c, catalog_entry, check_in, check_out, exclude_booking_id=None):
+        # Must run inside run_in_transaction, with the index already built (building it here
+        # would take a second pooled connection while the transaction holds one). The index
+        # only orders the candidates; the per-room check under the room-type lock is what decides.
+        room_ids = self.lock_room_type(c, catalog_entry.room_type_id)
+        with self.index_lock:
+            index = self.get_availability_index()
+            room_ids.sort(key=lambda room_id: not index.is_room_free(room_id, check_in, check_out, exclude_booking_id))
+        for room_id in room_ids:
+            overlapping = self.find_overlapping_bookings(c, room_id, check_in, check_out, exclude_booking_id)
+            if not overlapping:
+                return room_id
+            # Another terminal booked this room; teach the index about it
+            for booking_id, booked_in, booked_out in overlapping:
+                self.index_booking(booking_id, room_id, booked_in, booked_out)
+        return None
+
+    def allocate_rooms_bulk(self, c, stays):
+        # One lock and one range query for every room type in the group, then a pass
+        # over a scratch index built from those rows; stays is [(catalog entry, check_in, check_out), ...]
+        type_ids = {catalog_entry.room_type_id: catalog_entry.type_name for catalog_entry, check_in, check_out in stays}
+        placeholders = ", ".join(["%s"] * len(type_ids))
+        c.execute(f"""
+            SELECT roomID, roomTypeID
+            FROM rooms
+            WHERE roomTypeID IN ({placeholders})
+            ORDER BY roomID
+            FOR UPDATE
+        """, sorted(type_ids))
+        rooms = [(room_id, type_ids[type_id]) for room_id, type_id in c.fetchall()]
+        if not rooms:
+            return None
+
+        first_in = min(to_day(check_in) for catalog_entry, check_in, check_out in stays)
+        last_out = max(to_day(check_out) for catalog_entry, check_in, check_out in stays)
+        c.execute(f"""
+            SELECT bookingID, roomID, checkInDate, checkOutDate
+            FROM bookings
+            WHERE roomID IN ({", ".join(["%s"] * len(rooms))})
+            AND status != 'cancelled' AND checkInDate < %s AND checkOutDate > %s
+        """, [room_id for room_id, room_type in rooms] + [date.fromordinal(last_out), date.fromordinal(first_in)])
+        scratch = RoomAvailabilityIndex()
+        scratch.load(rooms, c.fetchall())
+
+        room_ids = []
+        for position, (catalog_entry, check_in, check_out) in enumerate(stays):
+            room_id = scratch.find_free_room(catalog_entry.type_name, check_in, check_out)
+            if room_id is None:
+                return None
+            # Hold the room for the rest of the group under a placeholder ID
+            scratch.add_booking(-1 - position, room_id, check_in, check_out)
+            room_ids.append(room_id)
+        return room_ids
+
+    # Create, Update, Cancel
+    def create_booking(self, user_id, room_type, check_in, check_out, payment_method):
+        if not all([room_type, check_in, check_out, payment_method]):
+            raise ValidationError("Please fill in all fields")
+        validate_stay(check_in, check_out)
+        catalog_entry = self.resolve_room_type(room_type)
+        total_amount = self.calculate_total_amount(room_type, check_in, check_out)
+
+        def work(c):
+            room_id = self.allocate_room(c, catalog_entry, check_in, check_out)
+            if room_id is None:
+                return None
+            c.execute("""
+                INSERT INTO bookings (userID, roomID, checkInDate, checkOutDate, status, totalAmount)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (user_id, room_id, check_in, check_out, 'pending', total_amount))
+            booking_id = c.lastrowid
+            c.execute("""
+                INSERT INTO transactions (bookingID, amount, transactionDate, paymentMethod, status)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (booking_id, total_amount, datetime.now(), payment_method, 'pending'))
+            record_event(c, user_id, booking_id, 'created')
+            rollup.apply_change(c, None, (catalog_entry.room_type_id, check_in, check_out, 'pending', total_amount))
+            return BookingResult(booking_id, room_id, total_amount)
+
+        self.get_availability_index()
+        booked = self.run_in_transaction(work)
+        if booked is None:
+            raise NoAvailabilityError()
+        self.index_booking(booked.booking_id, booked.room_id, check_in, check_out)
+        self.occupancy_changed((catalog_entry.room_type_id, check_in, check_out))
+        return booked
+
+    def add_bookings_bulk(self, user_id, requests):
+        # Group booking: requests is [(room_type, check_in, check_out, payment_method), ...].
+        # Every room is allocated and written in one transaction, or none is.
+        # Returns a BookingResult per request, in request order.
+        if not requests:
+            return []
+        for room_type, check_in, check_out, payment_method in requests:
+            if not all([room_type, check_in, check_out, payment_method]):
+                raise ValidationError("Please fill in all fields")
+            validate_stay(check_in, check_out)
+        stays = [(self.resolve_room_type(room_type), check_in, check_out)
+                 for room_type, check_in, check_out, payment_method in requests]
+        amounts = [self.calculate_total_amount(room_type, check_in, check_out)
+                   for room_type, check_in, check_out, payment_method in requests]
+
+        def work(c):
+            room_ids = self.allocate_rooms_bulk(c, stays)
+            if room_ids is None:
+                return None
+            now = datetime.now()
+            c.executemany("""
+                INSERT INTO bookings (userID, roomID, checkInDate, checkOutDate, status, totalAmount)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, [(user_id, room_id, check_in, check_out, 'pending', amount)
+                  for room_id, (room_type, check_in, check_out, payment_method), amount in zip(room_ids, requests, amounts)])
+            # A multi-row INSERT reserves consecutive auto-increment values; lastrowid is the first
+            c.execute("SELECT @@auto_increment_increment")
+            step = c.fetchone()[0]
+            booking_ids = [c.lastrowid + i * step for i in range(len(requests))]
+            c.executemany("""
+                INSERT INTO transactions (bookingID, amount, transactionDate, paymentMethod, status)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [(booking_id, amount, now, request[3], 'pending')
+                  for booking_id, request, amount in zip(booking_ids, requests, amounts)])
+            record_events(c, user_id, booking_ids, 'created')
+            rollup.apply_changes(c, [
+                (None, (catalog_entry.room_type_id, check_in, check_out, 'pending', amount))
+                for (catalog_entry, check_in, check_out), amount in zip(stays, amounts)
+            ])
+            return [BookingResult(*booked) for booked in zip(booking_ids, room_ids, amounts)]
+
+        booked = self.run_in_transaction(work)
+        if booked is None:
+            raise NoAvailabilityError()
+        for result, request in zip(booked, requests):
+            self.index_booking(result.booking_id, result.room_id, request[1], request[2])
+        self.occupancy_changed(*[(catalog_entry.room_type_id, check_in, check_out)
+                                 for catalog_entry, check_in, check_out in stays])
+        return booked
+
+    def update_booking(self, user_id, booking_id, room_type, check_in, check_out):
+        if not all([room_type, check_in, check_out]):
+            raise ValidationError("Please fill in all fields")
+        validate_stay(check_in, check_out)
+        catalog_entry = self.resolve_room_type(room_type)
+        total_amount = self.calculate_total_amount(room_type, check_in, check_out)
+        states = []
+
+        def work(c):
+            before = rollup.booking_state(c, booking_id)
+            if before is None or before[5] != user_id:
+                raise BookingNotFoundError()
+            room_id = self.allocate_room(c, catalog_entry, check_in, check_out, exclude_booking_id=booking_id)
+            if room_id is None:
+                raise NoAvailabilityError()
+            c.execute("""
+                UPDATE bookings
+                SET roomID = %s, checkInDate = %s, checkOutDate = %s, totalAmount = %s, status = 'pending'
+                WHERE bookingID = %s AND userID = %s
+            """, (room_id, check_in, check_out, total_amount, booking_id, user_id))
+            record_event(c, user_id, booking_id, 'updated')
+            after = (catalog_entry.room_type_id, check_in, check_out, 'pending', total_amount)
+            rollup.apply_change(c, before, after)
+            states[:] = [before, after]
+            return BookingResult(booking_id, room_id, total_amount)
+
+        self.get_availability_index()
+        updated = self.run_in_transaction(work)
+        self.index_booking(booking_id, updated.room_id, check_in, check_out)
+        self.occupancy_changed(*states)
+        return updated
+
+    def cancel_booking(self, user_id, booking_id):
+        with db.transaction() as c:
+            before = rollup.booking_state(c, booking_id)
+            if before is None or before[5] != user_id:
+                raise BookingNotFoundError()
+            c.execute("UPDATE bookings SET status = 'cancelled' WHERE bookingID = %s AND userID = %s",
+                     (booking_id, user_id))
+            record_event(c, user_id, booking_id, 'cancelled')
+            rollup.apply_change(c, before, before[:3] + ('cancelled',) + before[4:])
+        self.unindex_booking(booking_id)
+        self.occupancy_changed(before)
+
+    # Admin Actions
+    def set_booking_status(self, booking_id, status):
+        if status not in STATUSES:
+            raise ValidationError(f"Unknown status: {status}")
+        with db.transaction() as c:
+            before = rollup.booking_state(c, booking_id)
+            if before is None:
+                raise BookingNotFoundError()
+            c.execute("UPDATE bookings SET status = %s WHERE bookingID = %s", (status, booking_id))
+            c.execute("UPDATE transactions SET status = %s WHERE bookingID = %s", (status, booking_id))
+            record_booking_event(c, booking_id, status)
+            rollup.apply_change(c, before, before[:3] + (status,) + before[4:])
+        self.refresh_indexed_booking(booking_id)
+        self.occupancy_changed(before)
+
+    def delete_booking(self, booking_id):
+        with db.transaction() as c:
+            before = rollup.booking_state(c, booking_id)
+            if before is None:
+                raise BookingNotFoundError()
+            record_booking_event(c, booking_id, 'deleted')
+            c.execute("DELETE FROM transactions WHERE bookingID = %s", (booking_id,))
+            c.execute("DELETE FROM bookings WHERE bookingID = %s", (booking_id,))
+            rollup.apply_change(c, before, None)
+        self.unindex_booking(booking_id)
+        self.occupancy_changed(before)
+
+    # Listing
+    def booking_marker(self, user_id):
+        # Cheap change marker for one user's bookings: (row count, latest updatedAt)
+        with db.cursor() as c:
+            c.execute("SELECT COUNT(*), MAX(updatedAt) FROM bookings WHERE userID = %s", (user_id,))
+            return c.fetchone()
+
+    def list_user_bookings(self, user_id, updated_since=None):
+        query, params = USER_BOOKINGS_QUERY, [user_id]
+        if updated_since is not None:
+            query += " AND b.updatedAt >= %s"
+            params.append(updated_since)
+        query += " ORDER BY b.checkInDate DESC"
+        with db.cursor() as c:
+            c.execute(query, params)
+            return c.fetchall()
+
+    def list_user_booking_ids(self, user_id):
+        with db.cursor() as c:
+            c.execute("SELECT bookingID FROM bookings WHERE userID = %s", (user_id,))
+            return {row[0] for row in c.fetchall()}
+
+    # The admin lists use keyset pagination: each returns the rows that follow the
+    # sort key `after` (None for the first page), so no query reads a whole table
+    def list_customers(self, after=None, limit=200):
+        query = "SELECT userID, username, email, role FROM users"
+        params = []
+        if after:
+            query += " WHERE userID > %s"
+            params.append(after[0])
+        query += " ORDER BY userID LIMIT %s"
+        params.append(limit)
+        with db.cursor() as c:
+            c.execute(query, params)
+            return c.fetchall()
+
+    def list_bookings(self, after=None, limit=200, status=None):
+        conditions, params = [], []
+        if status:
+            conditions.append("b.status = %s")
+            params.append(status)
+        if after:
+            conditions.append("(b.checkInDate < %s OR (b.checkInDate = %s AND b.bookingID < %s))")
+            params.extend([after[0], after[0], after[1]])
+        query = ADMIN_BOOKINGS_QUERY
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY b.checkInDate DESC, b.bookingID DESC LIMIT %s"
+        params.append(limit)
+        with db.cursor() as c:
+            c.execute(query, params)
+            return c.fetchall()
+
+    def list_transactions(self, after=None, limit=200):
+        query = """
+            SELECT t.transactionID, b.bookingID, u.username, t.amount,
+                   t.transactionDate, t.paymentMethod, t.status
+            FROM transactions t
+            JOIN bookings b ON t.bookingID = b.bookingID
+            JOIN users u ON b.userID = u.userID
+        """
+        params = []
+        if after:
+            query += " WHERE (t.transactionDate < %s OR (t.transactionDate = %s AND t.transactionID < %s))"
+            params.extend([after[0], after[0], after[1]])
+        query += " ORDER BY t.transactionDate DESC, t.transactionID DESC LIMIT %s"
+        params.append(limit)
+        with db.cursor() as c:
+            c.execute(query, params)
+            return c.fetchall()
@@ -1,112 +1,42 @@
+import threading
 import tkinter as tk
-from tkinter import messagebox, ttk
-import mysql.connector
-from datetime import datetime
-import login 
-
-# Database Connection
-try:
-    conn = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="", 
-        database="hotel_booking",
-        port=3306
-    )
-    c = conn.cursor()
-except mysql.connector.Error as e:
-    print(f"Error connecting to MySQL: {e}")
-    exit()
+from datetime import date, timedelta
+from tkinter import filedialog, messagebox, ttk
+import db
+import migrations
+from availability_calendar import AvailabilityCalendar
+from booking_service import BookingService, BookingError
+from change_feed import get_change_feed
+from db_worker import DbWorker
+from export import FORMATS, ExportCancelled, export_rows
+from paged_table import PagedTreeview
+from query_stats import query_stats
+
+# The Tk screens below are thin adapters: they read widgets, hand the service call
+# to the window's DbWorker and show the outcome when it comes back on the Tk thread
+service = BookingService()
+worker = None
+
+def report_error(action):
+    def on_error(e):
+        if isinstance(e, BookingError):
+            messagebox.showerror("Error", str(e))
+        else:
+            messagebox.showerror("Error", f"{action} failed: {e}")
+    return on_error
+
+def show_busy(window, status_label):
+    def on_busy_change(busy):
+        window.config(cursor="watch" if busy else "")
+        status_label.config(text="Working..." if busy else "")
+    return on_busy_change
 
 def initialize_database():
     try:
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS room_types (
-                roomTypeID INT AUTO_INCREMENT PRIMARY KEY,
-                typeName VARCHAR(50) UNIQUE,
-                basePrice DECIMAL(10,2)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS rooms (
-                roomID INT AUTO_INCREMENT PRIMARY KEY,
-                roomTypeID INT,
-                roomNumber VARCHAR(10),
-                FOREIGN KEY (roomTypeID) REFERENCES room_types(roomTypeID)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS bookings (
-                bookingID INT AUTO_INCREMENT PRIMARY KEY,
-                userID INT,
-                roomID INT,
-                checkInDate DATE,
-                checkOutDate DATE,
-                status VARCHAR(20),
-                totalAmount DECIMAL(10,2),
-                FOREIGN KEY (roomID) REFERENCES rooms(roomID)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                transactionID INT AUTO_INCREMENT PRIMARY KEY,
-                bookingID INT,
-                amount DECIMAL(10,2),
-                transactionDate DATETIME,
-                paymentMethod VARCHAR(50),
-                status VARCHAR(20),
-                FOREIGN KEY (bookingID) REFERENCES bookings(bookingID)
-            )
-        """)
-        c.execute("""
-            INSERT IGNORE INTO room_types (typeName, basePrice) 
-            VALUES ('Single', 100.00), ('Double', 150.00), ('Suite', 250.00)
-        """)
-        c.execute("""
-            INSERT IGNORE INTO rooms (roomTypeID, roomNumber) 
-            VALUES (1, '101'), (1, '102'), (2, '201'), (2, '202'), (3, '301'), (3, '302')
-        """)
-        conn.commit()
-    except mysql.connector.Error as e:
+        migrations.migrate()
+    except db.Error as e:
         print(f"Error initializing database: {e}")
 
-def check_room_availability(room_type, check_in, check_out, exclude_booking_id=None):
-    try:
-        query = """
-            SELECT r.roomID 
-            FROM rooms r
-            JOIN room_types rt ON r.roomTypeID = rt.roomTypeID
-            WHERE rt.typeName = %s
-            AND r.roomID NOT IN (
-                SELECT b.roomID 
-                FROM bookings b 
-                WHERE b.status != 'cancelled'
-                AND (%s < b.checkOutDate AND %s > b.checkInDate)
-        """
-        params = [room_type, check_in, check_out]
-        
-        if exclude_booking_id:
-            query += " AND b.bookingID != %s"
-            params.append(exclude_booking_id)
-        
-        query += ") LIMIT 1"
-        c.execute(query, params)
-        return c.fetchone()
-    except mysql.connector.Error as e:
-        messagebox.showerror("Error", f"Database error: {e}")
-        return None
-
-def calculate_total_amount(room_type, check_in, check_out):
-    check_in_date = datetime.strptime(check_in, "%Y-%m-%d")
-    check_out_date = datetime.strptime(check_out, "%Y-%m-%d")
-    days = (check_out_date - check_in_date).days
-    
-    c.execute("SELECT basePrice FROM room_types WHERE typeName = %s", (room_type,))
-    result = c.fetchone()
-    if result:
-        return days * result[0]
-    return 0
-
 # Customer Booking Functions
 def add_booking(user_id, username):
     room_type = room_type_var.get().strip()
@@ -114,52 +44,14 @@ def add_booking(user_id, username):
     check_out = check_out_entry.get().strip()
     payment_method = payment_method_var.get().strip()
 
-    if not all([room_type, check_in, check_out, payment_method]):
-        messagebox.showerror("Error", "Please fill in all fields")
-        return
-
-    try:
-        check_in_date = datetime.strptime(check_in, "%Y-%m-%d")
-        check_out_date = datetime.strptime(check_out, "%Y-%m-%d")
-        
-        if check_out_date <= check_in_date:
-            messagebox.showerror("Error", "Check-out date must be after check-in date")
-            return
-        if check_in_date < datetime.now():
-            messagebox.showerror("Error", "Check-in date cannot be in the past")
-            return
-    except ValueError:
-        messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
-        return
-
-    available_room = check_room_availability(room_type, check_in, check_out)
-    if not available_room:
-        messagebox.showerror("Error", "No rooms available for selected dates")
-        return
-    
-    room_id = available_room[0]
-    total_amount = calculate_total_amount(room_type, check_in, check_out)
-
-    try:
-        c.execute("""
-            INSERT INTO bookings (userID, roomID, checkInDate, checkOutDate, status, totalAmount) 
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (user_id, room_id, check_in, check_out, 'pending', total_amount))
-        conn.commit()
-        
-        # Add transaction with selected payment method
-        booking_id = c.lastrowid
-        c.execute("""
-            INSERT INTO transactions (bookingID, amount, transactionDate, paymentMethod, status)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (booking_id, total_amount, datetime.now(), payment_method, 'pending'))
-        conn.commit()
-        
-        messagebox.showinfo("Success", f"Booking Added Successfully\nTotal Amount: ${total_amount:.2f}\nPayment Method: {payment_method}\nStatus: Pending (Awaiting Admin Approval)")
-        show_bookings(user_id)
+    def on_done(booked):
+        messagebox.showinfo("Success", f"Booking Added Successfully\nTotal Amount: ${booked.total_amount:.2f}\nPayment Method: {payment_method}\nStatus: Pending (Awaiting Admin Approval)")
+        refresh_bookings(user_id)
+        load_calendar()
         clear_entries()
-    except mysql.connector.Error as e:
-        messagebox.showerror("Error", f"Booking failed: {e}")
+
+    worker.submit(service.create_booking, user_id, room_type, check_in, check_out, payment_method,
+                  on_done=on_done, on_error=report_error("Booking"))
 
 def update_booking(user_id):
     selected = booking_table.selection()
@@ -172,44 +64,14 @@ def update_booking(user_id):
     check_in = check_in_entry.get().strip()
     check_out = check_out_entry.get().strip()
 
-    if not all([room_type, check_in, check_out]):
-        messagebox.showerror("Error", "Please fill in all fields")
-        return
-
-    try:
-        check_in_date = datetime.strptime(check_in, "%Y-%m-%d")
-        check_out_date = datetime.strptime(check_out, "%Y-%m-%d")
-        
-        if check_out_date <= check_in_date:
-            messagebox.showerror("Error", "Check-out date must be after check-in date")
-            return
-        if check_in_date < datetime.now():
-            messagebox.showerror("Error", "Check-in date cannot be in the past")
-            return
-    except ValueError:
-        messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
-        return
-
-    available_room = check_room_availability(room_type, check_in, check_out, exclude_booking_id=booking_id)
-    if not available_room:
-        messagebox.showerror("Error", "No rooms available for selected dates")
-        return
-
-    room_id = available_room[0]
-    total_amount = calculate_total_amount(room_type, check_in, check_out)
-
-    try:
-        c.execute("""
-            UPDATE bookings 
-            SET roomID = %s, checkInDate = %s, checkOutDate = %s, totalAmount = %s, status = 'pending'
-            WHERE bookingID = %s AND userID = %s
-        """, (room_id, check_in, check_out, total_amount, booking_id, user_id))
-        conn.commit()
-        messagebox.showinfo("Success", f"Booking Updated Successfully\nTotal Amount: ${total_amount:.2f}\nStatus: Pending (Awaiting Admin Approval)")
-        show_bookings(user_id)
+    def on_done(updated):
+        messagebox.showinfo("Success", f"Booking Updated Successfully\nTotal Amount: ${updated.total_amount:.2f}\nStatus: Pending (Awaiting Admin Approval)")
+        refresh_bookings(user_id)
+        load_calendar()
         clear_entries()
-    except mysql.connector.Error as e:
-        messagebox.showerror("Error", f"Update failed: {e}")
+
+    worker.submit(service.update_booking, user_id, booking_id, room_type, check_in, check_out,
+                  on_done=on_done, on_error=report_error("Update"))
 
 def cancel_booking(user_id):
     selected = booking_table.selection()
@@ -218,29 +80,75 @@ def cancel_booking(user_id):
         return
     
     booking_id = booking_table.item(selected[0])['values'][0]
-    c.execute("UPDATE bookings SET status = 'cancelled' WHERE bookingID = %s AND userID = %s", 
-             (booking_id, user_id))
-    conn.commit()
-    messagebox.showinfo("Success", "Booking cancelled successfully")
-    show_bookings(user_id)
-    clear_entries()
+    def on_done(result):
+        messagebox.showinfo("Success", "Booking cancelled successfully")
+        refresh_bookings(user_id)
+        load_calendar()
+        clear_entries()
+
+    worker.submit(service.cancel_booking, user_id, booking_id,
+                  on_done=on_done, on_error=report_error("Cancel"))
+
+# Booking Table Refresh
+# booking_table rows are keyed by bookingID (the Treeview iid); booking_rows holds
+# the values last shown for each and booking_marker the change marker they reflect
+booking_rows = {}
+booking_marker = None
+
+def apply_booking_rows(rows, complete=False):
+    # Insert, update and (when rows is the complete set) delete in place so the selection survives
+    reorder = False
+    for row in rows:
+        old = booking_rows.get(row[0])
+        if old is None:
+            booking_table.insert("", "end", iid=str(row[0]), values=row)
+            reorder = True
+        elif old != row:
+            booking_table.item(str(row[0]), values=row)
+            reorder = reorder or old[4] != row[4]
+        booking_rows[row[0]] = row
+    if complete:
+        remove_booking_rows(set(booking_rows) - {row[0] for row in rows})
+    if reorder:
+        ordered = sorted(booking_rows.values(), key=lambda row: (row[4], row[0]), reverse=True)
+        for position, row in enumerate(ordered):
+            booking_table.move(str(row[0]), "", position)
+
+def remove_booking_rows(booking_ids):
+    for booking_id in booking_ids:
+        booking_table.delete(str(booking_id))
+        del booking_rows[booking_id]
+
+def load_booking_changes(user_id, since_marker, known_ids):
+    # Runs on the worker; returns (marker, rows, complete, live_ids) for apply_booking_changes
+    marker = service.booking_marker(user_id)
+    if since_marker is None or since_marker[1] is None:
+        return marker, service.list_user_bookings(user_id), True, None
+    # updatedAt has one-second resolution: a change in the same second as the last
+    # refresh leaves the marker as it was, so the rows of that second are always re-read
+    rows = service.list_user_bookings(user_id, updated_since=since_marker[1])
+    live_ids = None
+    if len(known_ids | {row[0] for row in rows}) != marker[0]:
+        # Rows were deleted; only their IDs are needed to drop them
+        live_ids = service.list_user_booking_ids(user_id)
+    return marker, rows, False, live_ids
+
+def apply_booking_changes(changes):
+    global booking_marker
+    marker, rows, complete, live_ids = changes
+    apply_booking_rows(rows, complete)
+    if live_ids is not None:
+        remove_booking_rows(set(booking_rows) - live_ids)
+    booking_marker = marker
 
 def show_bookings(user_id):
-    for item in booking_table.get_children():
-        booking_table.delete(item)
-
-    c.execute("""
-        SELECT b.bookingID, b.userID, rt.typeName, r.roomNumber, 
-               b.checkInDate, b.checkOutDate, b.status, b.totalAmount 
-        FROM bookings b 
-        JOIN rooms r ON b.roomID = r.roomID 
-        JOIN room_types rt ON r.roomTypeID = rt.roomTypeID 
-        WHERE b.userID = %s
-        ORDER BY b.checkInDate DESC
-    """, (user_id,))
-    
-    for row in c.fetchall():
-        booking_table.insert("", "end", values=row)
+    worker.submit(load_booking_changes, user_id, None, set(), key="bookings",
+                  on_done=apply_booking_changes, on_error=report_error("Loading bookings"))
+
+def refresh_bookings(user_id):
+    # Quiet and keyed: a background refresh never shows the busy cursor and replaces any still queued
+    worker.submit(load_booking_changes, user_id, booking_marker, set(booking_rows), key="bookings", quiet=True,
+                  on_done=apply_booking_changes, on_error=lambda e: print(f"Refresh failed: {e}"))
 
 def clear_entries():
     check_in_entry.delete(0, tk.END)
@@ -258,18 +166,43 @@ def select_booking(event):
         check_out_entry.delete(0, tk.END)
         check_out_entry.insert(0, booking[5])  
 
+# Availability Calendar
+def load_calendar():
+    start = date.today()
+    worker.submit(service.availability_calendar, start, key="calendar", quiet=True,
+                  on_done=lambda counts: availability_view.set_counts(start, counts),
+                  on_error=lambda e: print(f"Calendar failed: {e}"))
+
+def select_calendar_day(day):
+    # First click picks check-in, the next later day picks check-out
+    check_in = check_in_entry.get().strip()
+    if check_in and not check_out_entry.get().strip() and day.isoformat() > check_in:
+        check_out_entry.insert(0, day.isoformat())
+        return
+    check_in_entry.delete(0, tk.END)
+    check_in_entry.insert(0, day.isoformat())
+    check_out_entry.delete(0, tk.END)
+
+# Changes arrive through the change feed; this slow refresh only covers a feed outage
+FALLBACK_REFRESH_MS = 60000
+
 def auto_refresh_bookings(user_id, booking_root):
-    show_bookings(user_id)
-    booking_root.after(5000, lambda: auto_refresh_bookings(user_id, booking_root)) 
+    refresh_bookings(user_id)
+    load_calendar()
+    booking_root.after(FALLBACK_REFRESH_MS, lambda: auto_refresh_bookings(user_id, booking_root))
 
 def open_booking_system(user_id, username):
     global name_entry, check_in_entry, check_out_entry, room_type_var, payment_method_var, booking_table
+    global booking_marker, worker, availability_view
 
     initialize_database()
+    booking_rows.clear()
+    booking_marker = None
 
     booking_root = tk.Tk()
     booking_root.title(f"Hotel Booking System - Welcome, {username}")
     booking_root.state('zoomed')
+    worker = DbWorker(booking_root)
 
     # Input Frame
     input_frame = tk.LabelFrame(booking_root, text="Booking", padx=10, pady=10)
@@ -283,10 +216,10 @@ def open_booking_system(user_id, username):
 
     tk.Label(input_frame, text="Room Type:").grid(row=1, column=0, pady=5, padx=10, sticky="w")
     room_type_var = tk.StringVar(value="Single")
-    c.execute("SELECT typeName FROM room_types")
-    room_types = [row[0] for row in c.fetchall()]
-    room_type_dropdown = ttk.Combobox(input_frame, textvariable=room_type_var, values=room_types)
+    room_type_dropdown = ttk.Combobox(input_frame, textvariable=room_type_var)
     room_type_dropdown.grid(row=1, column=1, pady=5, padx=10)
+    worker.submit(service.room_types, quiet=True,
+                  on_done=lambda room_types: room_type_dropdown.config(values=room_types))
 
     tk.Label(input_frame, text="Check-in (YYYY-MM-DD):").grid(row=2, column=0, pady=5, padx=10, sticky="w")
     check_in_entry = tk.Entry(input_frame, width=30)
@@ -302,6 +235,12 @@ def open_booking_system(user_id, username):
     payment_method_dropdown = ttk.Combobox(input_frame, textvariable=payment_method_var, values=payment_methods)
     payment_method_dropdown.grid(row=4, column=1, pady=5, padx=10)
 
+    # Free rooms of the selected type per day; clicking days fills the date entries
+    availability_view = AvailabilityCalendar(input_frame, on_select=select_calendar_day)
+    availability_view.grid(row=0, column=2, rowspan=6, padx=20, sticky="n")
+    availability_view.show_room_type(room_type_var.get())
+    room_type_var.trace_add("write", lambda *args: availability_view.show_room_type(room_type_var.get()))
+
     # Buttons Frame
     button_frame = tk.Frame(input_frame)
     button_frame.grid(row=5, column=0, columnspan=2, pady=10)
@@ -321,75 +260,60 @@ def open_booking_system(user_id, username):
     booking_table.pack(fill="both", expand=True, padx=20, pady=10)
     booking_table.bind('<<TreeviewSelect>>', select_booking)
 
+    # Refresh as soon as any terminal changes one of this user's bookings
+    feed = get_change_feed()
+    subscription = feed.subscribe(user_id, lambda event: worker.call_soon(refresh_bookings, user_id))
+
+    def on_destroy(event):
+        if event.widget is booking_root:
+            feed.unsubscribe(subscription)
+            worker.shutdown()
+
+    booking_root.bind("<Destroy>", on_destroy, add="+")
+
     # Logout Button with Confirmation
     def logout():
         if messagebox.askyesno("Confirm Logout", "Are you sure you want to log out?"):
             booking_root.destroy()
-            login.main() 
+            import login
+            login.main()
 
     tk.Button(booking_root, text="Logout", command=logout,
              bg="red", fg="white").pack(pady=10)
 
+    status_label = tk.Label(booking_root, text="", anchor="w")
+    status_label.pack(fill="x", padx=20)
+    worker.on_busy_change = show_busy(booking_root, status_label)
+
     show_bookings(user_id)
-    auto_refresh_bookings(user_id, booking_root)
+    load_calendar()
+    booking_root.after(FALLBACK_REFRESH_MS, lambda: auto_refresh_bookings(user_id, booking_root))
     booking_root.mainloop()
 
 # Admin Functions
-def show_customers(customer_table):
-    for item in customer_table.get_children():
-        customer_table.delete(item)
+def fetch_customers_page(after, limit):
+    return service.list_customers(after, limit)
+
+def fetch_bookings_page(after, limit):
+    return service.list_bookings(after, limit)
 
-    c.execute("SELECT userID, username, email, role FROM users")
-    for row in c.fetchall():
-        customer_table.insert("", "end", values=row)
+def fetch_reservations_page(after, limit):
+    return service.list_bookings(after, limit, status='confirmed')
+
+def fetch_transactions_page(after, limit):
+    return service.list_transactions(after, limit)
+
+def show_customers(customer_table):
+    customer_table.reload()
 
 def show_all_bookings(booking_table):
-    for item in booking_table.get_children():
-        booking_table.delete(item)
-
-    c.execute("""
-        SELECT b.bookingID, u.username, rt.typeName, r.roomNumber, 
-               b.checkInDate, b.checkOutDate, b.status, b.totalAmount 
-        FROM bookings b 
-        JOIN rooms r ON b.roomID = r.roomID 
-        JOIN room_types rt ON r.roomTypeID = rt.roomTypeID 
-        JOIN users u ON b.userID = u.userID
-        ORDER BY b.checkInDate DESC
-    """)
-    for row in c.fetchall():
-        booking_table.insert("", "end", values=row)
+    booking_table.reload()
 
 def show_reservations(reservation_table):
-    for item in reservation_table.get_children():
-        reservation_table.delete(item)
-
-    c.execute("""
-        SELECT b.bookingID, u.username, rt.typeName, r.roomNumber, 
-               b.checkInDate, b.checkOutDate, b.status, b.totalAmount 
-        FROM bookings b 
-        JOIN rooms r ON b.roomID = r.roomID 
-        JOIN room_types rt ON r.roomTypeID = rt.roomTypeID 
-        JOIN users u ON b.userID = u.userID
-        WHERE b.status = 'confirmed'
-        ORDER BY b.checkInDate DESC
-    """)
-    for row in c.fetchall():
-        reservation_table.insert("", "end", values=row)
+    reservation_table.reload()
 
 def show_transactions(transaction_table):
-    for item in transaction_table.get_children():
-        transaction_table.delete(item)
-
-    c.execute("""
-        SELECT t.transactionID, b.bookingID, u.username, t.amount, 
-               t.transactionDate, t.paymentMethod, t.status
-        FROM transactions t
-        JOIN bookings b ON t.bookingID = b.bookingID
-        JOIN users u ON b.userID = u.userID
-        ORDER BY t.transactionDate DESC
-    """)
-    for row in c.fetchall():
-        transaction_table.insert("", "end", values=row)
+    transaction_table.reload()
 
 def update_booking_status_admin(booking_table, status_var):
     selected = booking_table.selection()
@@ -400,14 +324,14 @@ def update_booking_status_admin(booking_table, status_var):
     booking_id = booking_table.item(selected[0])['values'][0]
     new_status = status_var.get().strip()
 
-    try:
-        c.execute("UPDATE bookings SET status = %s WHERE bookingID = %s", (new_status, booking_id))
-        c.execute("UPDATE transactions SET status = %s WHERE bookingID = %s", (new_status, booking_id))
-        conn.commit()
+    def on_done(result):
         messagebox.showinfo("Success", f"Booking status updated to {new_status}")
-        show_all_bookings(booking_table)
-    except mysql.connector.Error as e:
-        messagebox.showerror("Error", f"Status update failed: {e}")
+        # Update the row in place rather than reloading and losing the scroll position
+        if booking_table.exists(selected[0]):
+            booking_table.set(selected[0], "Status", new_status)
+
+    worker.submit(service.set_booking_status, booking_id, new_status,
+                  on_done=on_done, on_error=report_error("Status update"))
 
 def delete_booking_admin(booking_table):
     selected = booking_table.selection()
@@ -418,21 +342,104 @@ def delete_booking_admin(booking_table):
     booking_id = booking_table.item(selected[0])['values'][0]
     
     if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this booking?"):
-        try:
-            c.execute("DELETE FROM transactions WHERE bookingID = %s", (booking_id,))
-            c.execute("DELETE FROM bookings WHERE bookingID = %s", (booking_id,))
-            conn.commit()
+        def on_done(result):
             messagebox.showinfo("Success", "Booking deleted successfully")
-            show_all_bookings(booking_table)
-        except mysql.connector.Error as e:
-            messagebox.showerror("Error", f"Delete failed: {e}")
+            if booking_table.exists(selected[0]):
+                booking_table.delete(selected[0])
+
+        worker.submit(service.delete_booking, booking_id,
+                      on_done=on_done, on_error=report_error("Delete"))
+
+def run_report(report_table, start, end, period):
+    # numpy is only needed once somebody runs a report
+    from analytics import occupancy_report
+
+    def on_done(rows):
+        report_table.delete(*report_table.get_children())
+        for row in rows:
+            report_table.insert("", "end", values=(
+                row.period, row.room_type, row.available_nights, row.sold_nights,
+                f"{row.occupancy:.1%}", f"${row.adr:.2f}", f"${row.revpar:.2f}", f"${row.revenue:.2f}",
+                f"{row.cancellation_rate:.1%}",
+            ), tags=("total",) if row.room_type == "All" else ())
+
+    worker.submit(occupancy_report, start, end, period, key="report",
+                  on_done=on_done, on_error=report_error("Report"))
+
+export_stop = None
+
+def run_export(dataset, fmt, start, end, status, progress_bar, progress_label):
+    global export_stop
+    path = filedialog.asksaveasfilename(defaultextension=f".{fmt}", initialfile=f"{dataset}.{fmt}",
+                                        filetypes=[(fmt.upper(), f"*.{fmt}")])
+    if not path:
+        return
+    # Only one export at a time; starting another stops the previous one
+    cancel_export()
+    stop = export_stop = threading.Event()
+    progress_bar.config(value=0)
+    progress_label.config(text="Starting export...")
+
+    def show_progress(written, total):
+        if not stop.is_set():
+            progress_bar.config(maximum=max(total, 1), value=written)
+            progress_label.config(text=f"{written:,} of {total:,} rows")
+
+    def on_done(written):
+        progress_label.config(text=f"Exported {written:,} rows to {path}")
+
+    def on_error(e):
+        if isinstance(e, ExportCancelled):
+            progress_label.config(text="Export cancelled")
+            return
+        progress_label.config(text="")
+        report_error("Export")(e)
+
+    # Progress arrives on the worker thread and is handed back to Tk with call_soon
+    worker.submit(export_rows, dataset, path, fmt, start or None, end or None, status or None,
+                  lambda written, total: worker.call_soon(show_progress, written, total), stop,
+                  quiet=True, on_done=on_done, on_error=on_error)
+
+def cancel_export():
+    if export_stop is not None:
+        export_stop.set()
+
+DIAGNOSTICS_REFRESH_MS = 2000
+
+def show_diagnostics(statement_table, slow_table):
+    # Statement stats for this process, busiest first, and the most recent slow queries
+    statement_table.delete(*statement_table.get_children())
+    for stats in query_stats.snapshot():
+        sites = ", ".join(f"{site} ({count})" for site, count in stats.top_call_sites())
+        statement_table.insert("", "end", values=(
+            stats.statement, stats.calls, f"{stats.total_ms:.1f}", f"{stats.total_ms / stats.calls:.2f}",
+            f"{stats.percentile_ms(95):.1f}", f"{stats.max_ms:.1f}", stats.rows, sites,
+        ))
+    slow_table.delete(*slow_table.get_children())
+    for entry in reversed(query_stats.slow_snapshot()):
+        slow_table.insert("", "end", values=(
+            entry["time"], entry["ms"], entry["rows"], entry["site"], entry["statement"], entry["params"],
+            entry["explain"] or "",
+        ))
+
+def save_metrics():
+    path = filedialog.asksaveasfilename(defaultextension=".prom", initialfile="hotel_booking.prom",
+                                        filetypes=[("Prometheus text", "*.prom")])
+    if path:
+        try:
+            query_stats.write_prometheus(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save metrics: {e}")
 
 def open_admin_system(user_id, username):
+    global worker
+
     initialize_database()
 
     admin_root = tk.Tk()
     admin_root.title(f"Admin Dashboard - Welcome, {username}")
     admin_root.state('zoomed')
+    worker = DbWorker(admin_root)
 
     # Notebook Tab
     notebook = ttk.Notebook(admin_root)
@@ -443,7 +450,8 @@ def open_admin_system(user_id, username):
     notebook.add(customers_frame, text="Customers")
 
     customer_columns = ("ID", "Username", "Email", "Role")
-    customer_table = ttk.Treeview(customers_frame, columns=customer_columns, show="headings", height=20)
+    customer_table = PagedTreeview(customers_frame, fetch_customers_page, lambda row: (row[0],), worker=worker,
+                                   columns=customer_columns, show="headings", height=20)
     for col in customer_columns:
         customer_table.heading(col, text=col)
         customer_table.column(col, anchor="center", width=150)
@@ -473,7 +481,8 @@ def open_admin_system(user_id, username):
              bg="#FF4444", fg="white").pack(side=tk.LEFT, padx=5)
 
     booking_columns = ("ID", "Guest", "Room Type", "Room Number", "Check-in", "Check-out", "Status", "Amount")
-    booking_table = ttk.Treeview(bookings_frame, columns=booking_columns, show="headings", height=15)
+    booking_table = PagedTreeview(bookings_frame, fetch_bookings_page, lambda row: (row[4], row[0]), worker=worker,
+                                  columns=booking_columns, show="headings", height=15)
     for col in booking_columns:
         booking_table.heading(col, text=col)
         booking_table.column(col, anchor="center", width=120)
@@ -484,7 +493,8 @@ def open_admin_system(user_id, username):
     notebook.add(reservations_frame, text="Reservations")
 
     reservation_columns = ("ID", "Guest", "Room Type", "Room Number", "Check-in", "Check-out", "Status", "Amount")
-    reservation_table = ttk.Treeview(reservations_frame, columns=reservation_columns, show="headings", height=20)
+    reservation_table = PagedTreeview(reservations_frame, fetch_reservations_page, lambda row: (row[4], row[0]), worker=worker,
+                                      columns=reservation_columns, show="headings", height=20)
     for col in reservation_columns:
         reservation_table.heading(col, text=col)
         reservation_table.column(col, anchor="center", width=120)
@@ -495,25 +505,174 @@ def open_admin_system(user_id, username):
     notebook.add(transactions_frame, text="Transactions")
 
     transaction_columns = ("ID", "Booking ID", "Guest", "Amount", "Date", "Payment Method", "Status")
-    transaction_table = ttk.Treeview(transactions_frame, columns=transaction_columns, show="headings", height=20)
+    transaction_table = PagedTreeview(transactions_frame, fetch_transactions_page, lambda row: (row[4], row[0]), worker=worker,
+                                      columns=transaction_columns, show="headings", height=20)
     for col in transaction_columns:
         transaction_table.heading(col, text=col)
         transaction_table.column(col, anchor="center", width=150)
     transaction_table.pack(fill="both", expand=True, padx=20, pady=10)
 
+    # Reports Tab
+    reports_frame = ttk.Frame(notebook)
+    notebook.add(reports_frame, text="Reports")
+
+    report_form_frame = tk.LabelFrame(reports_frame, text="Occupancy Report", padx=10, pady=10)
+    report_form_frame.pack(padx=20, pady=10, fill="x")
+
+    # Default to the last twelve full months plus the current one
+    this_month = date.today().replace(day=1)
+    next_month = (this_month + timedelta(days=32)).replace(day=1)
+    tk.Label(report_form_frame, text="From (YYYY-MM-DD):").grid(row=0, column=0, pady=5, padx=10, sticky="w")
+    report_start_entry = tk.Entry(report_form_frame, width=15)
+    report_start_entry.insert(0, this_month.replace(year=this_month.year - 1).isoformat())
+    report_start_entry.grid(row=0, column=1, pady=5, padx=10)
+    tk.Label(report_form_frame, text="To (YYYY-MM-DD):").grid(row=0, column=2, pady=5, padx=10, sticky="w")
+    report_end_entry = tk.Entry(report_form_frame, width=15)
+    report_end_entry.insert(0, next_month.isoformat())
+    report_end_entry.grid(row=0, column=3, pady=5, padx=10)
+    tk.Label(report_form_frame, text="Period:").grid(row=0, column=4, pady=5, padx=10, sticky="w")
+    report_period_var = tk.StringVar(value="month")
+    report_period_dropdown = ttk.Combobox(report_form_frame, textvariable=report_period_var,
+                                          values=["day", "week", "month"], width=10)
+    report_period_dropdown.grid(row=0, column=5, pady=5, padx=10)
+
+    def load_report():
+        run_report(report_table, report_start_entry.get().strip(), report_end_entry.get().strip(),
+                   report_period_var.get())
+
+    tk.Button(report_form_frame, text="Run Report", command=load_report,
+             bg="#4682B4", fg="white").grid(row=0, column=6, pady=5, padx=10)
+
+    report_columns = ("Period", "Room Type", "Available Nights", "Sold Nights", "Occupancy",
+                      "ADR", "RevPAR", "Revenue", "Cancellation Rate")
+    report_table = ttk.Treeview(reports_frame, columns=report_columns, show="headings", height=20)
+    for col in report_columns:
+        report_table.heading(col, text=col)
+        report_table.column(col, anchor="center", width=120)
+    report_table.tag_configure("total", font=("TkDefaultFont", 9, "bold"))
+    report_table.pack(fill="both", expand=True, padx=20, pady=10)
+
+    # Export Tab
+    export_frame = ttk.Frame(notebook)
+    notebook.add(export_frame, text="Export")
+
+    export_form_frame = tk.LabelFrame(export_frame, text="Export Data", padx=10, pady=10)
+    export_form_frame.pack(padx=20, pady=10, fill="x")
+
+    tk.Label(export_form_frame, text="Dataset:").grid(row=0, column=0, pady=5, padx=10, sticky="w")
+    export_dataset_var = tk.StringVar(value="bookings")
+    ttk.Combobox(export_form_frame, textvariable=export_dataset_var,
+                 values=["bookings", "transactions"]).grid(row=0, column=1, pady=5, padx=10)
+    tk.Label(export_form_frame, text="Format:").grid(row=1, column=0, pady=5, padx=10, sticky="w")
+    export_format_var = tk.StringVar(value="csv")
+    ttk.Combobox(export_form_frame, textvariable=export_format_var,
+                 values=list(FORMATS)).grid(row=1, column=1, pady=5, padx=10)
+    tk.Label(export_form_frame, text="From (YYYY-MM-DD):").grid(row=2, column=0, pady=5, padx=10, sticky="w")
+    export_start_entry = tk.Entry(export_form_frame, width=23)
+    export_start_entry.grid(row=2, column=1, pady=5, padx=10)
+    tk.Label(export_form_frame, text="To (YYYY-MM-DD):").grid(row=3, column=0, pady=5, padx=10, sticky="w")
+    export_end_entry = tk.Entry(export_form_frame, width=23)
+    export_end_entry.grid(row=3, column=1, pady=5, padx=10)
+    tk.Label(export_form_frame, text="Status:").grid(row=4, column=0, pady=5, padx=10, sticky="w")
+    export_status_var = tk.StringVar(value="")
+    ttk.Combobox(export_form_frame, textvariable=export_status_var,
+                 values=["", "pending", "confirmed", "cancelled"]).grid(row=4, column=1, pady=5, padx=10)
+
+    export_progress = ttk.Progressbar(export_form_frame, length=300, mode="determinate")
+    export_progress.grid(row=6, column=0, columnspan=2, pady=5, padx=10, sticky="we")
+    export_progress_label = tk.Label(export_form_frame, text="", anchor="w")
+    export_progress_label.grid(row=7, column=0, columnspan=2, pady=5, padx=10, sticky="we")
+
+    export_button_frame = tk.Frame(export_form_frame)
+    export_button_frame.grid(row=5, column=0, columnspan=2, pady=10)
+    tk.Button(export_button_frame, text="Export",
+             command=lambda: run_export(export_dataset_var.get(), export_format_var.get(),
+                                        export_start_entry.get().strip(), export_end_entry.get().strip(),
+                                        export_status_var.get(), export_progress, export_progress_label),
+             bg="#4682B4", fg="white").pack(side=tk.LEFT, padx=5)
+    tk.Button(export_button_frame, text="Cancel Export", command=cancel_export,
+             bg="#FFA500", fg="white").pack(side=tk.LEFT, padx=5)
+
+    # Diagnostics Tab, hidden until Ctrl+Shift+D
+    diagnostics_frame = ttk.Frame(notebook)
+    notebook.add(diagnostics_frame, text="Diagnostics", state="hidden")
+
+    diagnostics_button_frame = tk.Frame(diagnostics_frame)
+    diagnostics_button_frame.pack(padx=20, pady=10, fill="x")
+    tk.Button(diagnostics_button_frame, text="Reset Stats", command=query_stats.reset,
+             bg="#FFA500", fg="white").pack(side=tk.LEFT, padx=5)
+    tk.Button(diagnostics_button_frame, text="Save Prometheus Metrics", command=save_metrics,
+             bg="#4682B4", fg="white").pack(side=tk.LEFT, padx=5)
+
+    statement_columns = ("Statement", "Calls", "Total ms", "Mean ms", "p95 ms", "Max ms", "Rows", "Call Sites")
+    statement_table = ttk.Treeview(diagnostics_frame, columns=statement_columns, show="headings", height=12)
+    for col in statement_columns:
+        statement_table.heading(col, text=col)
+        statement_table.column(col, anchor="center", width=90)
+    statement_table.column("Statement", anchor="w", width=500)
+    statement_table.column("Call Sites", anchor="w", width=300)
+    statement_table.pack(fill="both", expand=True, padx=20, pady=5)
+
+    tk.Label(diagnostics_frame, text="Slow Queries", anchor="w").pack(fill="x", padx=20)
+    slow_columns = ("Time", "ms", "Rows", "Call Site", "Statement", "Params", "EXPLAIN")
+    slow_table = ttk.Treeview(diagnostics_frame, columns=slow_columns, show="headings", height=8)
+    for col in slow_columns:
+        slow_table.heading(col, text=col)
+        slow_table.column(col, anchor="w", width=120)
+    slow_table.column("Statement", width=400)
+    slow_table.pack(fill="both", expand=True, padx=20, pady=5)
+
+    diagnostics_timer = None
+
+    def refresh_diagnostics():
+        # Live only while the tab is showing; one timer, however often the tab is reopened
+        nonlocal diagnostics_timer
+        if diagnostics_timer is not None:
+            admin_root.after_cancel(diagnostics_timer)
+            diagnostics_timer = None
+        if notebook.select() == str(diagnostics_frame):
+            show_diagnostics(statement_table, slow_table)
+            diagnostics_timer = admin_root.after(DIAGNOSTICS_REFRESH_MS, refresh_diagnostics)
+
+    def open_diagnostics(event=None):
+        notebook.tab(diagnostics_frame, state="normal")
+        notebook.select(diagnostics_frame)
+
+    admin_root.bind("<Control-Shift-D>", open_diagnostics)
+
     # Logout Button with Confirmation
     def logout():
         if messagebox.askyesno("Confirm Logout", "Are you sure you want to log out?"):
+            cancel_export()
+            worker.shutdown()
             admin_root.destroy()
+            import login
             login.main()
 
     tk.Button(admin_root, text="Logout", command=logout,
              bg="red", fg="white").pack(pady=10)
 
-    # Populate Tables
-    show_customers(customer_table)
-    show_all_bookings(booking_table)
-    show_reservations(reservation_table)
-    show_transactions(transaction_table)
+    status_label = tk.Label(admin_root, text="", anchor="w")
+    status_label.pack(fill="x", padx=20)
+    worker.on_busy_change = show_busy(admin_root, status_label)
+
+    # Populate each table the first time its tab is opened
+    tab_loaders = {
+        str(customers_frame): lambda: show_customers(customer_table),
+        str(bookings_frame): lambda: show_all_bookings(booking_table),
+        str(reservations_frame): lambda: show_reservations(reservation_table),
+        str(transactions_frame): lambda: show_transactions(transaction_table),
+        str(reports_frame): load_report,
+    }
+
+    def load_selected_tab(event=None):
+        loader = tab_loaders.pop(notebook.select(), None)
+        if loader:
+            loader()
+        if notebook.select() == str(diagnostics_frame):
+            refresh_diagnostics()
+
+    notebook.bind("<<NotebookTabChanged>>", load_selected_tab)
+    load_selected_tab()
 
     admin_root.mainloop()
\ No newline at end of file
@@ -0,0 +1,280 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import db
+import migrations
+import rollup
+from availability import RoomAvailabilityIndex
+from booking_service import STATUSES
+from change_feed import record_event_rows
+from pricing import pricing_engine
+
+IMPORT_CHUNK = 1000  # bookings per transaction
+DEFAULT_STATUS = "confirmed"
+DEFAULT_PAYMENT_METHOD = "Import"
+
+# Bulk Import
+# Reads CSV or JSONL reservations with these fields (header names for CSV, keys for JSONL):
+#   email or userID       the guest, who must already exist in users
+#   roomNumber or roomType a specific room, or any free room of the type
+#   checkInDate, checkOutDate  YYYY-MM-DD
+#   status (default confirmed), totalAmount (default pricing engine quote), paymentMethod
+# Rows that can't be resolved or that overlap an existing or earlier imported booking
+# are written to a reject file with the reason.
+
+Reservation = namedtuple("Reservation", [
+    "line", "record", "user_id", "room_id", "room_type", "check_in", "check_out", "status", "amount", "payment_method",
+])
+
+
+class Rejected(Exception):
+    pass
+
+
+def parse_json_line(text):
+    # (record dict, None), or ({"raw": text}, reason) for a line that is not a JSON object
+    try:
+        record = json.loads(text)
+    except ValueError as e:
+        return {"raw": text.strip()}, f"Invalid JSON: {e}"
+    if not isinstance(record, dict):
+        return {"raw": text.strip()}, "Expected a JSON object"
+    return record, None
+
+def read_records(path):
+    # Yields (line number, record dict, reason the line can't be read or None)
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for line, text in enumerate(f, 1):
+                if text.strip():
+                    yield (line, *parse_json_line(text))
+        else:
+            for line, record in enumerate(csv.DictReader(f), 2):
+                yield line, record, None
+
+
+class BookingImporter:
+    def __init__(self, chunk_size=IMPORT_CHUNK):
+        self.chunk_size = chunk_size
+        self.rooms_by_number = {}  # roomNumber -> (roomID, typeName)
+        self.room_types = {}       # typeName -> (roomTypeID, basePrice)
+        self.type_id_of_room = {}  # roomID -> roomTypeID
+        self.users_by_email = {}
+        self.user_ids = set()
+
+    def load_reference(self):
+        with db.cursor() as c:
+            c.execute("SELECT roomTypeID, typeName, basePrice FROM room_types")
+            self.room_types = {name: (type_id, base_price) for type_id, name, base_price in c.fetchall()}
+            names = {type_id: name for name, (type_id, base_price) in self.room_types.items()}
+            c.execute("SELECT roomID, roomTypeID, roomNumber FROM rooms ORDER BY roomID")
+            for room_id, type_id, number in c.fetchall():
+                self.rooms_by_number[str(number)] = (room_id, names.get(type_id))
+                self.type_id_of_room[room_id] = type_id
+            c.execute("SELECT userID, email FROM users")
+            for user_id, email in c.fetchall():
+                self.user_ids.add(user_id)
+                if email:
+                    self.users_by_email[email.lower()] = user_id
+
+    def resolve(self, line, record):
+        field = lambda name: str(record.get(name) or "").strip()
+
+        if field("userID"):
+            user_id = int(field("userID")) if field("userID").isdigit() else None
+            if user_id not in self.user_ids:
+                raise Rejected(f"Unknown userID {field('userID')}")
+        else:
+            user_id = self.users_by_email.get(field("email").lower())
+            if user_id is None:
+                raise Rejected(f"Unknown guest {field('email') or '(no email)'}")
+
+        room_id = None
+        if field("roomNumber"):
+            if field("roomNumber") not in self.rooms_by_number:
+                raise Rejected(f"Unknown room {field('roomNumber')}")
+            room_id, room_type = self.rooms_by_number[field("roomNumber")]
+        else:
+            room_type = field("roomType")
+            if room_type not in self.room_types:
+                raise Rejected(f"Unknown room type {room_type or '(none)'}")
+
+        try:
+            check_in = datetime.strptime(field("checkInDate"), "%Y-%m-%d").date()
+            check_out = datetime.strptime(field("checkOutDate"), "%Y-%m-%d").date()
+        except ValueError:
+            raise Rejected("Invalid dates, use YYYY-MM-DD") from None
+        if check_out <= check_in:
+            raise Rejected("Check-out date must be after check-in date")
+
+        status = field("status").lower() or DEFAULT_STATUS
+        if status not in STATUSES:
+            raise Rejected(f"Unknown status {status}")
+        try:
+            if field("totalAmount"):
+                amount = Decimal(field("totalAmount"))
+            else:
+                amount = pricing_engine.quote(room_type, check_in, check_out)
+        except InvalidOperation:
+            raise Rejected(f"Invalid totalAmount {field('totalAmount')}") from None
+        return Reservation(line, record, user_id, room_id, room_type, check_in, check_out, status, amount,
+                           field("paymentMethod") or DEFAULT_PAYMENT_METHOD)
+
+    def load_existing(self, reservations):
+        # Active bookings in the file's date span, in the same interval index the booking screens use
+        index = RoomAvailabilityIndex()
+        stays = [r for r in reservations if r.status != 'cancelled']
+        bookings = []
+        with db.cursor() as c:
+            c.execute("SELECT r.roomID, rt.typeName FROM rooms r JOIN room_types rt ON r.roomTypeID = rt.roomTypeID")
+            rooms = c.fetchall()
+            if stays:
+                c.execute("""
+                    SELECT bookingID, roomID, checkInDate, checkOutDate
+                    FROM bookings
+                    WHERE status != 'cancelled' AND checkInDate < %s AND checkOutDate > %s
+                """, (max(r.check_out for r in stays), min(r.check_in for r in stays)))
+                bookings = c.fetchall()
+        index.load(rooms, bookings)
+        return index
+
+    def plan(self, records):
+        # Resolve every record and sweep the stays, in file order, through the interval
+        # index. Returns (accepted reservations, [(line, record, reason), ...]).
+        reservations, rejects = [], []
+        for line, record, unreadable in records:
+            if unreadable:
+                rejects.append((line, record, unreadable))
+                continue
+            try:
+                reservations.append(self.resolve(line, record))
+            except Rejected as e:
+                rejects.append((line, record, str(e)))
+
+        index = self.load_existing(reservations)
+        accepted = []
+        for position, r in enumerate(reservations):
+            if r.status != 'cancelled':
+                room_id = r.room_id
+                if room_id is None:
+                    room_id = index.find_free_room(r.room_type, r.check_in, r.check_out)
+                elif not index.is_room_free(room_id, r.check_in, r.check_out):
+                    room_id = None
+                if room_id is None:
+                    rejects.append((r.line, r.record, "Overlaps an existing booking"))
+                    continue
+                # Later rows in the file must not overlap this one either
+                index.add_booking(-1 - position, room_id, r.check_in, r.check_out)
+                r = r._replace(room_id=room_id)
+            elif r.room_id is None:
+                # A cancelled stay holds no room, but bookings.roomID still needs one of its type
+                if not index.rooms_by_type.get(r.room_type):
+                    rejects.append((r.line, r.record, f"No rooms of type {r.room_type}"))
+                    continue
+                r = r._replace(room_id=index.rooms_by_type[r.room_type][0])
+            accepted.append(r)
+        return accepted, rejects
+
+    def conflicts_since_plan(self, c, chunk):
+        # Terminals keep booking while the import runs: under the room locks, reject
+        # anything a booking committed after plan() now overlaps
+        stays = [r for r in chunk if r.status != 'cancelled']
+        if not stays:
+            return set()
+        room_ids = sorted({r.room_id for r in stays})
+        placeholders = ", ".join(["%s"] * len(room_ids))
+        c.execute(f"SELECT roomID FROM rooms WHERE roomID IN ({placeholders}) ORDER BY roomID FOR UPDATE", room_ids)
+        c.fetchall()
+        c.execute(f"""
+            SELECT bookingID, roomID, checkInDate, checkOutDate
+            FROM bookings
+            WHERE roomID IN ({placeholders}) AND status != 'cancelled' AND checkInDate < %s AND checkOutDate > %s
+        """, room_ids + [max(r.check_out for r in stays), min(r.check_in for r in stays)])
+        index = RoomAvailabilityIndex()
+        index.load([], c.fetchall())
+        return {r.line for r in stays if not index.is_room_free(r.room_id, r.check_in, r.check_out)}
+
+    def insert_chunk(self, chunk):
+        # One transaction: multi-row INSERTs for bookings, transactions, change events and rollup.
+        # Returns the reservations rejected because of bookings made since plan().
+        with db.transaction(isolation_level='READ COMMITTED') as c:
+            late = self.conflicts_since_plan(c, chunk)
+            chunk = [r for r in chunk if r.line not in late]
+            if chunk:
+                c.executemany("""
+                    INSERT INTO bookings (userID, roomID, checkInDate, checkOutDate, status, totalAmount)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, [(r.user_id, r.room_id, r.check_in, r.check_out, r.status, r.amount) for r in chunk])
+                # A multi-row INSERT reserves consecutive auto-increment values; lastrowid is the first
+                c.execute("SELECT @@auto_increment_increment")
+                step = c.fetchone()[0]
+                booking_ids = [c.lastrowid + i * step for i in range(len(chunk))]
+                now = datetime.now()
+                c.executemany("""
+                    INSERT INTO transactions (bookingID, amount, transactionDate, paymentMethod, status)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, [(booking_id, r.amount, now, r.payment_method, r.status) for booking_id, r in zip(booking_ids, chunk)])
+                record_event_rows(c, [(r.user_id, booking_id, 'created') for booking_id, r in zip(booking_ids, chunk)])
+                rollup.apply_changes(c, [
+                    (None, (self.type_id_of_room[r.room_id], r.check_in, r.check_out, r.status, r.amount)) for r in chunk
+                ])
+        return late
+
+    def load(self, accepted, progress=None):
+        # Returns (rows inserted, [line numbers rejected at insert time])
+        inserted, late = 0, []
+        for i in range(0, len(accepted), self.chunk_size):
+            chunk = accepted[i:i + self.chunk_size]
+            chunk_late = self.insert_chunk(chunk)
+            late.extend(chunk_late)
+            inserted += len(chunk) - len(chunk_late)
+            if progress:
+                progress(inserted, len(accepted))
+        return inserted, late
+
+
+def write_rejects(path, rejects):
+    fields = []
+    for line, record, reason in rejects:
+        fields.extend(name for name in record if name not in fields)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["line", "reason"] + fields, extrasaction="ignore")
+        writer.writeheader()
+        for line, record, reason in sorted(rejects, key=lambda reject: reject[0]):
+            writer.writerow({**record, "line": line, "reason": reason})
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import reservations from CSV or JSONL")
+    parser.add_argument("path", help="reservations file (.csv, or .jsonl for one JSON object per line)")
+    parser.add_argument("--rejects", help="reject file (default: <path>.rejects.csv)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK, help="bookings per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="check the file and write rejects without inserting")
+    args = parser.parse_args()
+    rejects_path = args.rejects or os.path.splitext(args.path)[0] + ".rejects.csv"
+
+    importer = BookingImporter(args.chunk_size)
+    try:
+        migrations.migrate()
+        importer.load_reference()
+        accepted, rejects = importer.plan(read_records(args.path))
+        print(f"{len(accepted)} reservations to import, {len(rejects)} rejected")
+        if not args.dry_run:
+            inserted, late = importer.load(
+                accepted, progress=lambda done, total: print(f"  {done}/{total} imported", end="\r"))
+            by_line = {r.line: r.record for r in accepted}
+            rejects.extend((line, by_line[line], "Overlaps a booking made during the import") for line in late)
+            print(f"\nImported {inserted} bookings")
+    except db.Error as e:
+        print(f"Import error: {e}")
+        sys.exit(2)
+    if rejects:
+        write_rejects(rejects_path, rejects)
+        print(f"{len(rejects)} rejected rows written to {rejects_path}")
+
+if __name__ == "__main__":
+    main()
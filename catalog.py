@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import namedtuple
+import db
+
+CATALOG_TTL = 300  # seconds; room types change rarely, call invalidate() after editing them
+
+RoomType = namedtuple("RoomType", ["room_type_id", "type_name", "base_price"])
+
+
+def load_room_types():
+    with db.cursor() as c:
+        c.execute("SELECT roomTypeID, typeName, basePrice FROM room_types ORDER BY roomTypeID")
+        return [RoomType(*row) for row in c.fetchall()]
+
+
+class RoomTypeCatalog:
+    # Process-wide cache of room_types, shared by every window
+    def __init__(self, loader=load_room_types, ttl=CATALOG_TTL):
+        self.loader = loader
+        self.ttl = ttl
+        self.by_name = {}
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def _room_types(self):
+        with self.lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+                self.by_name = {rt.type_name: rt for rt in self.loader()}
+                self.loaded_at = time.monotonic()
+            return self.by_name
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = None
+
+    def names(self):
+        return list(self._room_types())
+
+    def room_types(self):
+        return list(self._room_types().values())
+
+    def get(self, type_name):
+        return self._room_types().get(type_name)
+
+    def base_price(self, type_name):
+        room_type = self.get(type_name)
+        return room_type.base_price if room_type else None
+
+
+room_type_catalog = RoomTypeCatalog()
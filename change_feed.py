@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import namedtuple
+import db
+
+POLL_INTERVAL = 0.2   # seconds between outbox reads; one query per process, however many windows subscribe
+POLL_BATCH = 500
+GAP_TIMEOUT = 5       # seconds to wait for a lower seq still in an open transaction before skipping it
+EVENT_RETENTION = 1   # days of booking_events kept for terminals catching up
+PRUNE_EVERY = 3600    # seconds
+
+BookingEvent = namedtuple("BookingEvent", ["seq", "user_id", "booking_id", "action"])
+
+ALL_USERS = None  # subscribe(ALL_USERS, ...) receives every event, e.g. for admin screens
+
+
+# Outbox Writes
+# Called inside the transaction that changes the booking, so an event exists exactly
+# when the change commits.
+
+def record_event(c, user_id, booking_id, action):
+    c.execute("INSERT INTO booking_events (userID, bookingID, action) VALUES (%s, %s, %s)",
+              (user_id, booking_id, action))
+
+def record_events(c, user_id, booking_ids, action):
+    record_event_rows(c, [(user_id, booking_id, action) for booking_id in booking_ids])
+
+def record_event_rows(c, rows):
+    # rows is [(userID, bookingID, action), ...]
+    c.executemany("INSERT INTO booking_events (userID, bookingID, action) VALUES (%s, %s, %s)", rows)
+
+def record_booking_event(c, booking_id, action):
+    # For admin actions, which only know the booking; run it before a DELETE
+    c.execute("""
+        INSERT INTO booking_events (userID, bookingID, action)
+        SELECT userID, bookingID, %s FROM bookings WHERE bookingID = %s
+    """, (action, booking_id))
+
+
+class LocalChangeFeed:
+    # In-process pub/sub keyed by userID. Callbacks run on the publishing thread,
+    # so Tk subscribers should hand the event to their DbWorker with call_soon().
+    # Tests can use this directly and publish() events by hand.
+    def __init__(self):
+        self.subscribers = {}
+        self.next_token = 0
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id, callback):
+        with self.lock:
+            self.next_token += 1
+            self.subscribers[self.next_token] = (user_id, callback)
+            return self.next_token
+
+    def unsubscribe(self, token):
+        with self.lock:
+            self.subscribers.pop(token, None)
+
+    def publish(self, event):
+        with self.lock:
+            callbacks = [callback for user_id, callback in self.subscribers.values()
+                         if user_id is ALL_USERS or user_id == event.user_id]
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Change feed subscriber failed: {e}")
+
+
+class OutboxChangeFeed(LocalChangeFeed):
+    # Fans booking_events rows out to local subscribers from a single poller thread.
+    # seq is an auto-increment, so a lower seq can commit after a higher one has been
+    # read; missing seqs are re-read for GAP_TIMEOUT seconds before they are given up
+    # (rolled-back transactions leave permanent gaps).
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        super().__init__()
+        self.poll_interval = poll_interval
+        self.low_water = None   # every seq <= low_water has been delivered or given up
+        self.delivered = set()  # delivered seqs above low_water
+        self.gap_since = None
+        self.step = 1
+        self.last_prune = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def subscribe(self, user_id, callback):
+        token = super().subscribe(user_id, callback)
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="change-feed", daemon=True)
+                self.thread.start()
+        return token
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.poll()
+            except db.Error as e:
+                print(f"Change feed poll failed: {e}")
+            self.stopped.wait(self.poll_interval)
+
+    def poll(self):
+        with db.cursor() as c:
+            if self.low_water is None:
+                # Start from now; windows load their current state when they open
+                c.execute("SELECT COALESCE(MAX(seq), 0), @@auto_increment_increment FROM booking_events")
+                self.low_water, self.step = c.fetchone()
+                return
+            c.execute("""
+                SELECT seq, userID, bookingID, action FROM booking_events
+                WHERE seq > %s ORDER BY seq LIMIT %s
+            """, (self.low_water, POLL_BATCH))
+            rows = c.fetchall()
+            if self.last_prune is None or time.monotonic() - self.last_prune > PRUNE_EVERY:
+                c.execute("DELETE FROM booking_events WHERE createdAt < NOW() - INTERVAL %s DAY", (EVENT_RETENTION,))
+                self.last_prune = time.monotonic()
+        for row in rows:
+            if row[0] not in self.delivered:
+                self.delivered.add(row[0])
+                self.publish(BookingEvent(*row))
+        self.advance_low_water()
+
+    def advance_low_water(self):
+        while self.low_water + self.step in self.delivered:
+            self.low_water += self.step
+            self.delivered.discard(self.low_water)
+        if not self.delivered:
+            self.gap_since = None
+            return
+        if self.gap_since is None:
+            self.gap_since = time.monotonic()
+        elif time.monotonic() - self.gap_since > GAP_TIMEOUT:
+            # The missing seq never committed; skip to the next delivered one
+            self.low_water = min(self.delivered) - self.step
+            self.gap_since = None
+            self.advance_low_water()
+
+
+change_feed = None
+change_feed_lock = threading.Lock()
+
+def get_change_feed():
+    global change_feed
+    with change_feed_lock:
+        if change_feed is None:
+            change_feed = OutboxChangeFeed()
+        return change_feed
+
+def set_change_feed(feed):
+    # Replace the process-wide feed, e.g. with a LocalChangeFeed in tests
+    global change_feed
+    with change_feed_lock:
+        change_feed = feed
@@ -0,0 +1,191 @@
+import importlib
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from query_stats import instrument
+
+# Storage backend: "mysql" (default) or "sqlite" for an embedded single-file database.
+# A backend module provides connect(config), Error, pool_exhausted() and connection_lost(error).
+BACKENDS = {"mysql": "mysql_backend", "sqlite": "sqlite_backend"}
+BACKEND = os.environ.get("HOTEL_DB_BACKEND", "mysql")
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "database": "hotel_booking",
+    "port": 3306,
+}
+SQLITE_CONFIG = {
+    "path": os.environ.get("HOTEL_SQLITE_PATH", "hotel_booking.db"),
+}
+POOL_SIZE = 5
+ACQUIRE_TIMEOUT = 10    # seconds to wait for a free connection
+PING_AFTER_IDLE = 30    # seconds a pooled connection may sit idle before it is health-checked
+
+
+_backend = None
+
+def load_backend(name):
+    global BACKEND, _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown database backend: {name}")
+    BACKEND = name
+    _backend = importlib.import_module(BACKENDS[name])
+    return _backend
+
+def get_backend():
+    # Imported on first use, so a process that switches backends with configure()
+    # never imports the driver it doesn't use
+    return _backend or load_backend(BACKEND)
+
+def __getattr__(name):
+    # db.Error is the configured backend's base exception
+    if name == "Error":
+        return get_backend().Error
+    raise AttributeError(f"module 'db' has no attribute {name!r}")
+
+def is_sqlite():
+    return BACKEND == "sqlite"
+
+def backend_config():
+    return SQLITE_CONFIG if is_sqlite() else DB_CONFIG
+
+
+class ConnectionPool:
+    # Bounded pool that opens connections lazily, on first demand
+    def __init__(self, backend, config, size=POOL_SIZE, timeout=ACQUIRE_TIMEOUT):
+        self.backend = backend
+        self.config = config
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise self.backend.pool_exhausted()
+        try:
+            conn = self._take_idle()
+            if conn is None:
+                conn = self.backend.connect(self.config)
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        try:
+            if discard:
+                self._close(conn)
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            conn.last_used = time.monotonic()
+            self._idle.put(conn)
+        except self.backend.Error:
+            self._close(conn)
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def _take_idle(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - getattr(conn, "last_used", 0) < PING_AFTER_IDLE:
+                return conn
+            try:
+                conn.ping(reconnect=True, attempts=2, delay=0)
+                return conn
+            except self.backend.Error:
+                self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except self.backend.Error:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(get_backend(), backend_config())
+    return _pool
+
+def configure(pool_size=POOL_SIZE, backend_name=None, **config):
+    # Point this process at another backend, server or database (benchmarks, tools); closes the old pool
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        if backend_name:
+            load_backend(backend_name)
+        backend_config().update(config)
+        _pool = ConnectionPool(get_backend(), backend_config(), size=pool_size)
+
+@contextmanager
+def connection():
+    pool = get_pool()
+    conn = pool.acquire()
+    discard = False
+    try:
+        yield conn
+    except pool.backend.Error as e:
+        discard = pool.backend.connection_lost(e)
+        raise
+    finally:
+        pool.release(conn, discard=discard)
+
+@contextmanager
+def cursor():
+    # Autocommit cursor for reads and single-statement writes
+    with connection() as conn:
+        cur = instrument(conn.cursor(buffered=True))
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+@contextmanager
+def streaming_cursor():
+    # Unbuffered cursor for large reads: rows stay on the server until fetchmany() pulls them
+    with connection() as conn:
+        cur = instrument(conn.cursor(buffered=False))
+        try:
+            yield cur
+        finally:
+            # Drop anything left unread so the connection can go back to the pool
+            if conn.unread_result:
+                conn.consume_results()
+            cur.close()
+
+@contextmanager
+def transaction(isolation_level=None):
+    # Cursor whose statements commit together, or not at all
+    with connection() as conn:
+        conn.start_transaction(isolation_level=isolation_level)
+        cur = instrument(conn.cursor(buffered=True))
+        try:
+            yield cur
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
@@ -0,0 +1,110 @@
+import queue
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_MS = 25
+DB_WORKERS = 4
+
+
+class Job:
+    def __init__(self, on_done, on_error, quiet):
+        self.on_done = on_done
+        self.on_error = on_error
+        self.quiet = quiet
+        self.cancelled = False
+
+    def cancel(self):
+        # A job that has not started is skipped; one already running still
+        # finishes (a write may commit), but its callbacks are not called
+        self.cancelled = True
+
+
+class DbWorker:
+    # Runs database calls on a thread pool so Tk handlers never wait on MySQL.
+    # Results come back through a queue that the Tk loop drains with after(),
+    # so on_done/on_error always run on the Tk thread.
+    def __init__(self, widget, max_workers=DB_WORKERS, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self.results = queue.Queue()
+        self.jobs_by_key = {}
+        self.pending = set()
+        self.busy = 0
+        self.on_busy_change = None  # called with True/False when user-visible work starts/stops
+        self.closed = False
+        self.widget.after(self.poll_ms, self.poll)
+
+    def submit(self, func, *args, on_done=None, on_error=None, key=None, quiet=False):
+        # key: a newer job with the same key cancels the older one (e.g. refreshes, page loads)
+        # quiet: background work that should not show the busy indicator
+        if key is not None and key in self.jobs_by_key:
+            self.jobs_by_key.pop(key).cancel()
+        job = Job(on_done, on_error, quiet)
+        if key is not None:
+            self.jobs_by_key[key] = job
+        self.pending.add(job)
+        if not quiet:
+            self.set_busy(self.busy + 1)
+        self.executor.submit(self.run, job, key, func, args)
+        return job
+
+    def call_soon(self, func, *args):
+        # Thread-safe: runs func(*args) on the Tk thread at the next poll (e.g. change feed events)
+        self.results.put((Job(lambda result: func(*args), None, True), None, None, None))
+
+    def run(self, job, key, func, args):
+        if job.cancelled:
+            self.results.put((job, key, None, None))
+            return
+        try:
+            self.results.put((job, key, func(*args), None))
+        except Exception as e:
+            self.results.put((job, key, None, e))
+
+    def poll(self):
+        if self.closed:
+            return
+        while True:
+            try:
+                job, key, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(job)
+            if key is not None and self.jobs_by_key.get(key) is job:
+                del self.jobs_by_key[key]
+            if not job.quiet:
+                self.set_busy(self.busy - 1)
+            if job.cancelled:
+                continue
+            try:
+                if error is not None:
+                    if job.on_error:
+                        job.on_error(error)
+                    else:
+                        print(f"Database error: {error}")
+                elif job.on_done:
+                    job.on_done(result)
+            except Exception as e:
+                # A failing callback must not stop the poll loop delivering everyone else's results
+                print(f"Error in database job callback: {e!r}")
+        try:
+            self.widget.after(self.poll_ms, self.poll)
+        except tk.TclError:
+            # The window is gone
+            self.shutdown()
+
+    def set_busy(self, busy):
+        was_busy = self.busy > 0
+        self.busy = busy
+        if self.on_busy_change and was_busy != (busy > 0):
+            self.on_busy_change(busy > 0)
+
+    def cancel_all(self):
+        for job in list(self.pending):
+            job.cancel()
+
+    def shutdown(self):
+        self.closed = True
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
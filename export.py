@@ -0,0 +1,136 @@
+import csv
+import importlib.util
+import os
+import db
+from booking_service import ADMIN_BOOKINGS_QUERY, STATUSES, ValidationError, parse_day
+
+EXPORT_BATCH = 5000  # rows per fetchmany(); memory stays at one batch however big the table is
+# Parquet export is optional; pyarrow is slow to import, so it is loaded on the first Parquet export
+FORMATS = ("csv", "parquet") if importlib.util.find_spec("pyarrow") else ("csv",)
+pa = pq = None
+
+# Each dataset: (query, columns, date column used by the date filter, status column)
+DATASETS = {
+    "bookings": (ADMIN_BOOKINGS_QUERY,
+                 ["bookingID", "guest", "roomType", "roomNumber", "checkInDate", "checkOutDate", "status", "totalAmount"],
+                 "b.checkInDate", "b.status"),
+    "transactions": ("""
+        SELECT t.transactionID, b.bookingID, u.username, t.amount,
+               t.transactionDate, t.paymentMethod, t.status
+        FROM transactions t
+        JOIN bookings b ON t.bookingID = b.bookingID
+        JOIN users u ON b.userID = u.userID
+    """, ["transactionID", "bookingID", "guest", "amount", "transactionDate", "paymentMethod", "status"],
+        "t.transactionDate", "t.status"),
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def load_pyarrow():
+    global pa, pq
+    if pa is None:
+        import pyarrow
+        import pyarrow.parquet
+        pa, pq = pyarrow, pyarrow.parquet
+
+def parquet_schema(dataset):
+    load_pyarrow()
+    if dataset == "bookings":
+        return pa.schema([
+            ("bookingID", pa.int64()), ("guest", pa.string()), ("roomType", pa.string()),
+            ("roomNumber", pa.string()), ("checkInDate", pa.date32()), ("checkOutDate", pa.date32()),
+            ("status", pa.string()), ("totalAmount", pa.decimal128(10, 2)),
+        ])
+    return pa.schema([
+        ("transactionID", pa.int64()), ("bookingID", pa.int64()), ("guest", pa.string()),
+        ("amount", pa.decimal128(10, 2)), ("transactionDate", pa.timestamp("s")),
+        ("paymentMethod", pa.string()), ("status", pa.string()),
+    ])
+
+def export_filters(dataset, start=None, end=None, status=None):
+    # Returns (WHERE clause, params); start is inclusive and end exclusive
+    if dataset not in DATASETS:
+        raise ValidationError(f"Unknown dataset: {dataset}")
+    query, columns, date_column, status_column = DATASETS[dataset]
+    conditions, params = [], []
+    if start:
+        conditions.append(f"{date_column} >= %s")
+        params.append(parse_day(start, "start"))
+    if end:
+        conditions.append(f"{date_column} < %s")
+        params.append(parse_day(end, "end"))
+    if status:
+        if status not in STATUSES:
+            raise ValidationError(f"Unknown status: {status}")
+        conditions.append(f"{status_column} = %s")
+        params.append(status)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def count_rows(dataset, start=None, end=None, status=None):
+    where, params = export_filters(dataset, start, end, status)
+    with db.cursor() as c:
+        c.execute(f"SELECT COUNT(*) FROM ({DATASETS[dataset][0]}{where}) AS export_rows", params)
+        return c.fetchone()[0]
+
+
+class CsvSink:
+    def __init__(self, path, dataset):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(DATASETS[dataset][1])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    # One row group per batch
+    def __init__(self, path, dataset):
+        self.schema = parquet_schema(dataset)
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def export_rows(dataset, path, fmt="csv", start=None, end=None, status=None, progress=None, stop=None):
+    # Streams the dataset to `path` through an unbuffered cursor. progress(written, total)
+    # is called after each batch from the calling thread; setting the `stop` Event
+    # cancels the export and removes the partial file. Returns the number of rows written.
+    if fmt not in FORMATS:
+        raise ValidationError("Parquet export needs pyarrow installed" if fmt == "parquet" else f"Unknown format: {fmt}")
+    where, params = export_filters(dataset, start, end, status)
+    total = count_rows(dataset, start, end, status)
+    written = 0
+    sink = None
+    try:
+        with db.streaming_cursor() as c:
+            c.execute(DATASETS[dataset][0] + where, params)
+            sink = CsvSink(path, dataset) if fmt == "csv" else ParquetSink(path, dataset)
+            while True:
+                if stop is not None and stop.is_set():
+                    raise ExportCancelled()
+                rows = c.fetchmany(EXPORT_BATCH)
+                if not rows:
+                    break
+                sink.write(rows)
+                written += len(rows)
+                if progress:
+                    progress(written, total)
+        sink.close()
+    except BaseException:
+        if sink:
+            sink.close()
+            os.remove(path)
+        raise
+    return written
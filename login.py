@@ -1,50 +1,30 @@
 import tkinter as tk
 from tkinter import messagebox
-import mysql.connector
-import bcrypt
-import bookingsystem
-
-# Database Setup
-try:
-    conn = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",  
-        database="hotel_booking",
-        port=3306
-    )
-    c = conn.cursor()
-except mysql.connector.Error as e:
-    print(f"Error connecting to MySQL: {e}")
-    exit()
-
-# Create users table if it doesn't exist
-c.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        userID INT AUTO_INCREMENT PRIMARY KEY,
-        username VARCHAR(50) UNIQUE,
-        email VARCHAR(100) UNIQUE,
-        password VARCHAR(255),
-        role VARCHAR(20) DEFAULT 'customer'
-    )
-""")
-conn.commit()
-
-# Create default admin user if it doesn't exist
-c.execute("SELECT * FROM users WHERE email = %s", ("admin@gmail.com",))
-if not c.fetchone():
-    password = "admin123".encode('utf-8')
-    hashed = bcrypt.hashpw(password, bcrypt.gensalt()).decode('utf-8')
-    c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
-              ("Admin", "admin@gmail.com", hashed, "admin"))
-    conn.commit()
-    print("Default admin user created: email=admin@gmail.com, password=admin123")
-
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def check_password(stored_password, provided_password):
-    return bcrypt.checkpw(provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+from concurrent.futures import ThreadPoolExecutor
+import app
+import auth
+import query_stats
+
+# bcrypt releases the GIL, so password work runs here instead of on the Tk main thread
+password_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="password")
+
+def run_in_background(widget, func, args, on_done, on_error):
+    # Run func on the password pool and report back on the Tk thread by polling with after()
+    future = password_pool.submit(func, *args)
+
+    def poll():
+        if not future.done():
+            widget.after(20, poll)
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            on_error(e)
+        else:
+            on_done(result)
+
+    widget.after(20, poll)
+    return future
 
 def login():
     email = email_entry.get().strip()
@@ -54,14 +34,12 @@ def login():
         messagebox.showerror("Error", "Please enter both email and password")
         return
 
-    c.execute("SELECT userID, username, password, role FROM users WHERE email=%s", (email,))
-    user = c.fetchone()
-
-    if user:
-        print(f"User found: {user}")  
-        print(f"Role: {user[3]}")    
-        if check_password(user[2], password):
+    def on_done(user):
+        if user:
+            print(f"User found: {user}")  
+            print(f"Role: {user[3]}")    
             root.destroy()
+            import bookingsystem
             if user[3] == 'admin':
                 print("Opening admin system") 
                 bookingsystem.open_admin_system(user[0], user[1])
@@ -69,9 +47,15 @@ def login():
                 print("Opening booking system") 
                 bookingsystem.open_booking_system(user[0], user[1])
         else:
+            login_btn.config(state=tk.NORMAL, text="Login")
             messagebox.showerror("Login Failed", "Invalid email or password")
-    else:
-        messagebox.showerror("Login Failed", "Invalid email or password")
+
+    def on_error(e):
+        login_btn.config(state=tk.NORMAL, text="Login")
+        messagebox.showerror("Error", f"Login failed: {e}")
+
+    login_btn.config(state=tk.DISABLED, text="Signing in...")
+    run_in_background(root, auth.verify_login, (email, password), on_done, on_error)
 
 def register():
     root.destroy()
@@ -216,24 +200,25 @@ def register_user(reg_root, reg_username_entry, reg_email_entry, reg_password_en
         messagebox.showerror("Error", "Please fill in all fields")
         return
     
-    c.execute("SELECT * FROM users WHERE username=%s OR email=%s", (username, email))
-    if c.fetchone():
-        messagebox.showerror("Error", "Username or email already exists")
-        return
-    
-    hashed_password = hash_password(password)
-    try:
-        c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)", 
-                 (username, email, hashed_password, role))
-        conn.commit()
+    def on_done(created):
+        if not created:
+            messagebox.showerror("Error", "Username or email already exists")
+            return
         messagebox.showinfo("Success", "Account Created Successfully")
         reg_root.destroy()
         main()
-    except mysql.connector.Error as e:
+
+    def on_error(e):
         messagebox.showerror("Error", f"Registration failed: {e}")
 
+    run_in_background(reg_root, auth.create_user, (username, email, password, role), on_done, on_error)
+
 def main():
-    global root, email_entry, password_entry
+    global root, email_entry, password_entry, login_btn
+
+    # Migrations and the admin seed (a bcrypt hash) run once, in the background, while the window is built
+    users_ready = app.start_setup()
+    query_stats.start_exporters()
     
     root = tk.Tk()
     root.title("Login - Hotel Booking System")
@@ -336,7 +321,15 @@ def main():
     register_btn.bind("<Enter>", on_register_enter)
     register_btn.bind("<Leave>", on_register_leave)
 
+    def check_users_ready():
+        if not users_ready.done():
+            root.after(50, check_users_ready)
+        elif users_ready.exception():
+            print(f"Error connecting to MySQL: {users_ready.exception()}")
+            messagebox.showerror("Error", f"Error connecting to MySQL: {users_ready.exception()}")
+
+    check_users_ready()
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    app.main()
\ No newline at end of file
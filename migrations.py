@@ -0,0 +1,336 @@
+import argparse
+import json
+import threading
+from datetime import date, timedelta
+import db
+import rollup
+
+# Schema Migrations
+# Each migration runs once per database; the highest applied version is kept in
+# schema_version. Never edit a released migration, append a new one instead.
+
+def ensure_column(c, table, column, definition):
+    if not column_exists(c, table, column):
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def column_exists(c, table, column):
+    if db.is_sqlite():
+        c.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == column for row in c.fetchall())
+    c.execute("""
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return c.fetchone() is not None
+
+def table_exists(c, table):
+    if db.is_sqlite():
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return c.fetchone() is not None
+    c.execute("""
+        SELECT 1 FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return c.fetchone() is not None
+
+def ensure_index(c, table, name, columns):
+    if db.is_sqlite():
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        return
+    c.execute("""
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, name))
+    if not c.fetchone():
+        c.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+
+def create_base_schema(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            userID INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) UNIQUE,
+            email VARCHAR(100) UNIQUE,
+            password VARCHAR(255),
+            role VARCHAR(20) DEFAULT 'customer'
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS room_types (
+            roomTypeID INT AUTO_INCREMENT PRIMARY KEY,
+            typeName VARCHAR(50) UNIQUE,
+            basePrice DECIMAL(10,2)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS rooms (
+            roomID INT AUTO_INCREMENT PRIMARY KEY,
+            roomTypeID INT,
+            roomNumber VARCHAR(10),
+            FOREIGN KEY (roomTypeID) REFERENCES room_types(roomTypeID)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS bookings (
+            bookingID INT AUTO_INCREMENT PRIMARY KEY,
+            userID INT,
+            roomID INT,
+            checkInDate DATE,
+            checkOutDate DATE,
+            status VARCHAR(20),
+            totalAmount DECIMAL(10,2),
+            updatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (roomID) REFERENCES rooms(roomID)
+        )
+    """)
+    # Tables created before updatedAt existed; it is the change marker for refresh_bookings
+    ensure_column(c, "bookings", "updatedAt",
+                  "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    if db.is_sqlite():
+        # SQLite has no ON UPDATE CURRENT_TIMESTAMP
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS bookings_updated_at AFTER UPDATE ON bookings
+            WHEN NEW.updatedAt = OLD.updatedAt
+            BEGIN
+                UPDATE bookings SET updatedAt = CURRENT_TIMESTAMP WHERE bookingID = NEW.bookingID;
+            END
+        """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            transactionID INT AUTO_INCREMENT PRIMARY KEY,
+            bookingID INT,
+            amount DECIMAL(10,2),
+            transactionDate DATETIME,
+            paymentMethod VARCHAR(50),
+            status VARCHAR(20),
+            FOREIGN KEY (bookingID) REFERENCES bookings(bookingID)
+        )
+    """)
+
+def seed_rooms(c):
+    # Only seed empty tables so an imported property keeps its own catalog
+    c.execute("SELECT COUNT(*) FROM room_types")
+    if c.fetchone()[0] == 0:
+        c.execute("""
+            INSERT INTO room_types (typeName, basePrice)
+            VALUES ('Single', 100.00), ('Double', 150.00), ('Suite', 250.00)
+        """)
+    c.execute("SELECT COUNT(*) FROM rooms")
+    if c.fetchone()[0] == 0:
+        c.execute("""
+            INSERT INTO rooms (roomTypeID, roomNumber)
+            VALUES (1, '101'), (1, '102'), (2, '201'), (2, '202'), (3, '301'), (3, '302')
+        """)
+
+def adopt_project_dump(c):
+    # Databases imported from cs15_project.sql keep prices on rooms, names as
+    # firstName/lastName and payments in `payments`; bring them to the columns the app reads.
+    # The dump is MySQL-only, so an SQLite database never has these tables.
+    if db.is_sqlite():
+        return
+    ensure_column(c, "room_types", "basePrice", "DECIMAL(10,2)")
+    if column_exists(c, "rooms", "price"):
+        c.execute("""
+            UPDATE room_types rt
+            SET basePrice = (SELECT MIN(r.price) FROM rooms r WHERE r.roomTypeID = rt.roomTypeID)
+            WHERE basePrice IS NULL
+        """)
+    ensure_column(c, "users", "username", "VARCHAR(50)")
+    if column_exists(c, "users", "firstName"):
+        c.execute("UPDATE users SET username = CONCAT(firstName, ' ', lastName) WHERE username IS NULL")
+    if table_exists(c, "payments"):
+        c.execute("""
+            INSERT INTO transactions (bookingID, amount, transactionDate, paymentMethod, status)
+            SELECT p.bookingID, p.amount, p.transactionDate, p.paymentMethod, p.paymentStatus
+            FROM payments p
+            WHERE NOT EXISTS (SELECT 1 FROM transactions t WHERE t.bookingID = p.bookingID)
+        """)
+
+def add_hot_query_indexes(c):
+    # check_room_availability / find_overlapping_bookings: per-room overlap test
+    ensure_index(c, "bookings", "idx_bookings_room_status_dates", "roomID, status, checkInDate, checkOutDate")
+    # show_bookings ordering and the COUNT/MAX(updatedAt) refresh marker
+    ensure_index(c, "bookings", "idx_bookings_user_checkin", "userID, checkInDate")
+    ensure_index(c, "bookings", "idx_bookings_user_updated", "userID, updatedAt")
+    # show_all_bookings / show_reservations keyset pages
+    ensure_index(c, "bookings", "idx_bookings_checkin_id", "checkInDate, bookingID")
+    ensure_index(c, "bookings", "idx_bookings_status_checkin_id", "status, checkInDate, bookingID")
+    # show_transactions keyset pages and per-booking lookups
+    ensure_index(c, "transactions", "idx_transactions_booking_date", "bookingID, transactionDate")
+    ensure_index(c, "transactions", "idx_transactions_date_id", "transactionDate, transactionID")
+
+def create_booking_events(c):
+    # Outbox read by change_feed.OutboxChangeFeed; seq orders events across terminals
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS booking_events (
+            seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+            userID INT,
+            bookingID INT,
+            action VARCHAR(20),
+            createdAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    ensure_index(c, "booking_events", "idx_booking_events_created", "createdAt")
+
+def create_daily_rollup(c):
+    # Maintained by rollup.apply_changes on every booking write; see rollup.py
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS daily_rollup (
+            day DATE NOT NULL,
+            roomTypeID INT NOT NULL,
+            roomsSold INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14,4) NOT NULL DEFAULT 0,
+            arrivals INT NOT NULL DEFAULT 0,
+            cancellations INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, roomTypeID)
+        )
+    """)
+    rollup.rebuild()
+
+def create_pricing_rules(c):
+    # Read by pricing.PricingEngine; with no rules every night costs the type's basePrice
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS pricing_rules (
+            ruleID INT AUTO_INCREMENT PRIMARY KEY,
+            kind VARCHAR(20) NOT NULL,
+            roomTypeID INT NULL,
+            startDate DATE NULL,
+            endDate DATE NULL,
+            weekdays VARCHAR(20) NULL,
+            minNights INT NULL,
+            minOccupancy DECIMAL(5,4) NULL,
+            multiplier DECIMAL(6,4) NOT NULL,
+            FOREIGN KEY (roomTypeID) REFERENCES room_types(roomTypeID)
+        )
+    """)
+
+MIGRATIONS = [
+    (1, "base schema", create_base_schema),
+    (2, "seed room types and rooms", seed_rooms),
+    (3, "adopt cs15_project.sql tables", adopt_project_dump),
+    (4, "indexes for the booking hot queries", add_hot_query_indexes),
+    (5, "booking change feed outbox", create_booking_events),
+    (6, "daily occupancy and revenue rollup", create_daily_rollup),
+    (7, "dynamic pricing rules", create_pricing_rules),
+]
+
+migrated = False
+migrate_lock = threading.Lock()
+
+def current_version(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(100),
+            appliedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    c.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return c.fetchone()[0]
+
+def migrate():
+    global migrated
+    with migrate_lock:
+        if migrated:
+            return
+        with db.cursor() as c:
+            # Serialize terminals that start at the same time
+            c.execute("SELECT GET_LOCK('hotel_booking_migrations', 30)")
+            c.fetchone()
+            try:
+                version = current_version(c)
+                for number, description, apply in MIGRATIONS:
+                    if number <= version:
+                        continue
+                    apply(c)
+                    c.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                              (number, description))
+                    print(f"Applied migration {number}: {description}")
+            finally:
+                c.execute("SELECT RELEASE_LOCK('hotel_booking_migrations')")
+                c.fetchone()
+        migrated = True
+
+# EXPLAIN Check
+def hot_queries():
+    check_in = date.today() + timedelta(days=30)
+    check_out = check_in + timedelta(days=3)
+    return {
+        "check_room_availability": ("""
+            SELECT bookingID, checkInDate, checkOutDate FROM bookings
+            WHERE roomID = %s AND status != 'cancelled' AND %s < checkOutDate AND %s > checkInDate
+        """, (1, check_in, check_out)),
+        "show_bookings": ("""
+            SELECT b.bookingID, b.userID, rt.typeName, r.roomNumber,
+                   b.checkInDate, b.checkOutDate, b.status, b.totalAmount
+            FROM bookings b
+            JOIN rooms r ON b.roomID = r.roomID
+            JOIN room_types rt ON r.roomTypeID = rt.roomTypeID
+            WHERE b.userID = %s
+        """, (1,)),
+        "refresh_marker": ("SELECT COUNT(*), MAX(updatedAt) FROM bookings WHERE userID = %s", (1,)),
+        "show_all_bookings": ("""
+            SELECT b.bookingID, b.checkInDate FROM bookings b
+            WHERE (b.checkInDate < %s OR (b.checkInDate = %s AND b.bookingID < %s))
+            ORDER BY b.checkInDate DESC, b.bookingID DESC LIMIT 200
+        """, (check_in, check_in, 1000000)),
+        "show_transactions": ("""
+            SELECT t.transactionID, t.transactionDate FROM transactions t
+            ORDER BY t.transactionDate DESC, t.transactionID DESC LIMIT 200
+        """, ()),
+    }
+
+def explain_hot_queries():
+    plans = {}
+    with db.cursor() as c:
+        for name, (query, params) in hot_queries().items():
+            c.execute("EXPLAIN " + query, params)
+            columns = [d[0] for d in c.description]
+            plans[name] = [
+                {k: str(v) for k, v in zip(columns, row) if k in ("table", "type", "key", "rows", "Extra", "detail")}
+                for row in c.fetchall()
+            ]
+    return plans
+
+def compare_plans(before, after):
+    for name in after:
+        print(name)
+        old_rows, new_rows = before.get(name, []), after[name]
+        for i, new in enumerate(new_rows):
+            old = old_rows[i] if i < len(old_rows) else {}
+            print(f"  {new.get('table')}: key {old.get('key')} -> {new.get('key')}, "
+                  f"type {old.get('type')} -> {new.get('type')}, rows {old.get('rows')} -> {new.get('rows')}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Hotel booking schema migrations")
+    parser.add_argument("command", choices=["migrate", "status", "explain"])
+    parser.add_argument("--save", help="explain: write the plans to this JSON file")
+    parser.add_argument("--compare", help="explain: compare against plans saved earlier with --save")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "migrate":
+            before = None
+            with db.cursor() as c:
+                if table_exists(c, "bookings") and table_exists(c, "transactions"):
+                    before = explain_hot_queries()
+            migrate()
+            if before:
+                compare_plans(before, explain_hot_queries())
+        elif args.command == "status":
+            with db.cursor() as c:
+                print(f"Schema version {current_version(c)} of {MIGRATIONS[-1][0]}")
+        else:
+            plans = explain_hot_queries()
+            if args.save:
+                with open(args.save, "w") as f:
+                    json.dump(plans, f, indent=2)
+            if args.compare:
+                with open(args.compare) as f:
+                    compare_plans(json.load(f), plans)
+            elif not args.save:
+                print(json.dumps(plans, indent=2))
+    except db.Error as e:
+        print(f"Migration error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import mysql.connector
+
+# MySQL/MariaDB storage backend for db.ConnectionPool
+
+Error = mysql.connector.Error
+CONNECTION_LOST_ERRNOS = (2006, 2013, 2055)  # server gone away, lost connection, lost at handshake
+
+
+def connect(config):
+    conn = mysql.connector.connect(**config)
+    conn.autocommit = True
+    return conn
+
+def pool_exhausted():
+    return mysql.connector.errors.PoolError("No database connection available")
+
+def connection_lost(error):
+    return error.errno in CONNECTION_LOST_ERRNOS
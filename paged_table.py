@@ -0,0 +1,61 @@
+from tkinter import ttk
+
+PAGE_SIZE = 200
+LOAD_AHEAD = 0.9  # fetch the next page once the view reaches this fraction of the loaded rows
+
+
+class PagedTreeview(ttk.Treeview):
+    # Treeview that pulls rows one page at a time as the user scrolls.
+    # fetch_page(after, limit) must return rows ordered by sort_key(row), starting
+    # just past the key `after` (None for the first page). Rows are keyed by row[0].
+    # With a DbWorker the fetch runs off the Tk thread and the page is added when it arrives.
+    def __init__(self, master, fetch_page, sort_key, page_size=PAGE_SIZE, worker=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.fetch_page = fetch_page
+        self.worker = worker
+        self.sort_key = sort_key
+        self.page_size = page_size
+        self.last_key = None
+        self.exhausted = True  # until the first reload()
+        self.pending = False
+        self.scrollbar = ttk.Scrollbar(master, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y", pady=10)
+        self.configure(yscrollcommand=self.on_scroll)
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= LOAD_AHEAD and not self.exhausted and not self.pending:
+            # Let Tk finish the scroll before running the query
+            self.pending = True
+            self.after_idle(self.load_next_page)
+
+    def load_next_page(self):
+        # pending stays set until the page has been added
+        if self.exhausted:
+            self.pending = False
+            return
+        self.pending = True
+        if self.worker is None:
+            self.add_page(self.fetch_page(self.last_key, self.page_size))
+            return
+        self.worker.submit(self.fetch_page, self.last_key, self.page_size, key=str(self),
+                           on_done=self.add_page, on_error=self.page_failed)
+
+    def add_page(self, rows):
+        self.pending = False
+        for row in rows:
+            if not self.exists(str(row[0])):
+                self.insert("", "end", iid=str(row[0]), values=row)
+        if rows:
+            self.last_key = self.sort_key(rows[-1])
+        self.exhausted = len(rows) < self.page_size
+
+    def page_failed(self, error):
+        # Leave pending set so scrolling doesn't retry in a tight loop; reload() starts over
+        print(f"Error loading page: {error}")
+
+    def reload(self):
+        self.delete(*self.get_children())
+        self.last_key = None
+        self.exhausted = False
+        self.load_next_page()
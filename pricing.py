@@ -0,0 +1,337 @@
+import argparse
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import numpy as np
+import db
+from availability import to_day
+from catalog import room_type_catalog
+
+HORIZON_DAYS = 365     # nights from today held in the rate calendar
+RULES_TTL = 300        # seconds; rules edited through this module invalidate at once
+OCCUPANCY_TTL = 60     # seconds before bookings made by other terminals are picked up
+CENTS = Decimal("0.01")
+KINDS = ("weekend", "season", "occupancy", "length_of_stay")
+DEFAULT_WEEKEND = "4,5"  # Friday and Saturday nights
+
+# Dynamic Pricing
+# Rules live in pricing_rules; every rule multiplies the base price of one room type
+# (or of every type when roomTypeID is NULL), optionally only between startDate and endDate:
+#   weekend         nights whose weekday (Monday = 0) is listed in weekdays
+#   season          every night in the date window
+#   occupancy       nights on which at least minOccupancy of the type's rooms are sold;
+#                   the highest matching multiplier applies
+#   length_of_stay  the whole stay when it is at least minNights long; the longest matching tier applies
+# The nightly rules are compiled into a rate calendar: one array of nightly rates in
+# cents per room type for the next HORIZON_DAYS nights, so a stay is priced with one
+# slice-sum. Booking writes mark the nights they touch, and only those slices are
+# re-read from daily_rollup and repriced; editing rules recompiles the calendar.
+
+Rule = namedtuple("Rule", [
+    "rule_id", "kind", "room_type_id", "start_date", "end_date", "weekdays", "min_nights", "min_occupancy", "multiplier",
+])
+
+
+def load_rules():
+    with db.cursor() as c:
+        c.execute("""
+            SELECT ruleID, kind, roomTypeID, startDate, endDate, weekdays, minNights, minOccupancy, multiplier
+            FROM pricing_rules
+            ORDER BY ruleID
+        """)
+        return [Rule(*row) for row in c.fetchall()]
+
+def load_room_counts():
+    with db.cursor() as c:
+        c.execute("SELECT roomTypeID, COUNT(*) FROM rooms GROUP BY roomTypeID")
+        return dict(c.fetchall())
+
+def load_rooms_sold(first_day, last_day, room_type_id=None):
+    # [(roomTypeID, day, roomsSold)] for the nights first_day <= day < last_day (ordinals)
+    query = "SELECT roomTypeID, day, roomsSold FROM daily_rollup WHERE day >= %s AND day < %s"
+    params = [date.fromordinal(first_day), date.fromordinal(last_day)]
+    if room_type_id is not None:
+        query += " AND roomTypeID = %s"
+        params.append(room_type_id)
+    with db.cursor() as c:
+        c.execute(query, params)
+        return c.fetchall()
+
+def applies_to(rule, room_type_id):
+    return rule.room_type_id is None or rule.room_type_id == room_type_id
+
+def in_window(rule, days):
+    # days is an array of ordinals
+    mask = np.ones(len(days), dtype=bool)
+    if rule.start_date is not None:
+        mask &= days >= to_day(rule.start_date)
+    if rule.end_date is not None:
+        mask &= days < to_day(rule.end_date)
+    return mask
+
+def weekdays_of(rule):
+    return [int(day) for day in (rule.weekdays or DEFAULT_WEEKEND).split(",") if day.strip()]
+
+def static_factors(rules, room_type_id, days):
+    # Product of the weekend and season multipliers for each night
+    factors = np.ones(len(days))
+    for rule in rules:
+        if not applies_to(rule, room_type_id):
+            continue
+        if rule.kind == "weekend":
+            # date.fromordinal(1) is a Monday
+            mask = in_window(rule, days) & np.isin((days - 1) % 7, weekdays_of(rule))
+        elif rule.kind == "season":
+            mask = in_window(rule, days)
+        else:
+            continue
+        factors[mask] *= float(rule.multiplier)
+    return factors
+
+def occupancy_factors(rules, room_type_id, days, occupancy):
+    factors = np.ones(len(days))
+    for rule in rules:
+        if rule.kind == "occupancy" and applies_to(rule, room_type_id):
+            mask = in_window(rule, days) & (occupancy >= float(rule.min_occupancy or 0))
+            factors[mask] = np.maximum(factors[mask], float(rule.multiplier))
+    return factors
+
+def stay_multiplier(rules, room_type_id, nights):
+    best = None
+    for rule in rules:
+        if rule.kind == "length_of_stay" and applies_to(rule, room_type_id) and nights >= (rule.min_nights or 0):
+            if best is None or (rule.min_nights or 0) >= (best.min_nights or 0):
+                best = rule
+    return Decimal(str(best.multiplier)) if best else Decimal(1)
+
+def to_cents(base_price, factors):
+    return np.rint(float(base_price) * 100 * factors).astype(np.int64)
+
+
+class PricingEngine:
+    # Process-wide rate calendar, shared by every BookingService
+    def __init__(self, catalog=room_type_catalog, horizon=HORIZON_DAYS, rule_loader=load_rules):
+        self.catalog = catalog
+        self.horizon = horizon
+        self.rule_loader = rule_loader
+        self.lock = threading.RLock()
+        self.start = None          # ordinal of the first night in the calendar
+        self.rules = []
+        self.rules_loaded_at = None
+        self.occupancy_loaded_at = None
+        self.room_counts = {}
+        self.base_prices = {}      # roomTypeID -> base price the rates were computed from
+        self.static = {}           # roomTypeID -> weekend x season multipliers per night
+        self.uplift = {}           # roomTypeID -> occupancy multiplier per night
+        self.rates = {}            # roomTypeID -> nightly rate in cents per night
+        self.dirty = {}            # roomTypeID -> (first, last) nights whose occupancy changed
+
+    def invalidate_rules(self):
+        with self.lock:
+            self.rules_loaded_at = None
+
+    def occupancy_changed(self, room_type_id, check_in, check_out):
+        # Called after a booking write commits; the slice is re-read on the next quote
+        first, last = to_day(check_in), to_day(check_out)
+        with self.lock:
+            if room_type_id in self.dirty:
+                first = min(first, self.dirty[room_type_id][0])
+                last = max(last, self.dirty[room_type_id][1])
+            self.dirty[room_type_id] = (first, last)
+
+    # Compilation
+    def rebuild(self):
+        with self.lock:
+            self.rules = self.rule_loader()
+            self.rules_loaded_at = time.monotonic()
+            self.start = date.today().toordinal()
+            days = np.arange(self.start, self.start + self.horizon)
+            self.base_prices = {}
+            self.static = {}
+            for room_type in self.catalog.room_types():
+                self.base_prices[room_type.room_type_id] = room_type.base_price
+                self.static[room_type.room_type_id] = static_factors(self.rules, room_type.room_type_id, days)
+            self.uplift = {room_type_id: np.ones(self.horizon) for room_type_id in self.static}
+            self.rates = {}
+            self.refresh_occupancy()
+
+    def refresh_occupancy(self, room_type_id=None, first=None, last=None):
+        # Re-reads rooms sold for one type's nights (or every type's whole calendar) and reprices them
+        with self.lock:
+            if room_type_id is None:
+                self.room_counts = load_room_counts()
+                self.occupancy_loaded_at = time.monotonic()
+                self.dirty = {}
+            first = max(first if first is not None else self.start, self.start)
+            last = min(last if last is not None else self.start + self.horizon, self.start + self.horizon)
+            if first >= last:
+                return
+            type_ids = [room_type_id] if room_type_id is not None else list(self.static)
+            sold = {type_id: np.zeros(last - first) for type_id in type_ids}
+            for type_id, day, rooms_sold in load_rooms_sold(first, last, room_type_id):
+                if type_id in sold:
+                    sold[type_id][to_day(day) - first] = rooms_sold
+            days = np.arange(first, last)
+            for type_id in type_ids:
+                rooms = self.room_counts.get(type_id, 0)
+                occupancy = sold[type_id] / rooms if rooms else np.zeros(last - first)
+                self.uplift[type_id][first - self.start:last - self.start] = occupancy_factors(
+                    self.rules, type_id, days, occupancy)
+                self.reprice(type_id, first, last)
+
+    def reprice(self, room_type_id, first=None, last=None):
+        lo = 0 if first is None else first - self.start
+        hi = self.horizon if last is None else last - self.start
+        if room_type_id not in self.rates:
+            self.rates[room_type_id] = np.zeros(self.horizon, dtype=np.int64)
+        factors = self.static[room_type_id][lo:hi] * self.uplift[room_type_id][lo:hi]
+        self.rates[room_type_id][lo:hi] = to_cents(self.base_prices[room_type_id], factors)
+
+    def ensure_current(self, room_type):
+        # Must hold self.lock
+        now = time.monotonic()
+        if (self.rules_loaded_at is None or now - self.rules_loaded_at > RULES_TTL
+                or self.start != date.today().toordinal() or room_type.room_type_id not in self.rates):
+            self.rebuild()
+        elif now - self.occupancy_loaded_at > OCCUPANCY_TTL:
+            self.refresh_occupancy()
+        elif self.dirty:
+            dirty, self.dirty = self.dirty, {}
+            for room_type_id, (first, last) in dirty.items():
+                if room_type_id in self.rates:
+                    self.refresh_occupancy(room_type_id, first, last)
+        if self.base_prices[room_type.room_type_id] != room_type.base_price:
+            self.base_prices[room_type.room_type_id] = room_type.base_price
+            self.reprice(room_type.room_type_id)
+
+    # Quotes
+    def stay_cents(self, room_type, first, last):
+        # Must hold self.lock; nights outside the calendar get the static rules only
+        end = self.start + self.horizon
+        lo, hi = max(first, self.start), min(last, end)
+        total = int(self.rates[room_type.room_type_id][lo - self.start:hi - self.start].sum()) if lo < hi else 0
+        outside = [np.arange(first, min(last, self.start)), np.arange(max(first, end), last)]
+        for days in outside:
+            if len(days):
+                total += int(to_cents(room_type.base_price,
+                                      static_factors(self.rules, room_type.room_type_id, days)).sum())
+        return total
+
+    def quote(self, type_name, check_in, check_out):
+        # Total for the stay as a Decimal in cents; 0 for an unknown type or one without a price
+        room_type = self.catalog.get(type_name)
+        if room_type is None or room_type.base_price is None:
+            return 0
+        first, last = to_day(check_in), to_day(check_out)
+        with self.lock:
+            self.ensure_current(room_type)
+            cents = self.stay_cents(room_type, first, last)
+            multiplier = stay_multiplier(self.rules, room_type.room_type_id, last - first)
+        return (Decimal(cents) * multiplier / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+    def nightly_rates(self, type_name, start, days):
+        # [Decimal rate for start, start + 1 day, ...]
+        room_type = self.catalog.get(type_name)
+        if room_type is None or room_type.base_price is None:
+            return []
+        first = to_day(start)
+        with self.lock:
+            self.ensure_current(room_type)
+            cents = [self.stay_cents(room_type, day, day + 1) for day in range(first, first + days)]
+        return [(Decimal(amount) / 100).quantize(CENTS) for amount in cents]
+
+
+pricing_engine = PricingEngine()
+
+
+# Rule Management
+def add_rule(kind, multiplier, room_type_id=None, start_date=None, end_date=None, weekdays=None,
+             min_nights=None, min_occupancy=None):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown rule kind: {kind}")
+    if Decimal(str(multiplier)) <= 0:
+        raise ValueError("Multiplier must be positive")
+    if weekdays and not all(day.strip().isdigit() and int(day) < 7 for day in weekdays.split(",")):
+        raise ValueError("weekdays must be numbers 0-6 separated by commas")
+    for day in (start_date, end_date):
+        if day is not None:
+            to_day(day)  # ValueError unless YYYY-MM-DD
+    with db.transaction() as c:
+        c.execute("""
+            INSERT INTO pricing_rules (kind, roomTypeID, startDate, endDate, weekdays, minNights, minOccupancy, multiplier)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (kind, room_type_id, start_date, end_date, weekdays, min_nights, min_occupancy, multiplier))
+        rule_id = c.lastrowid
+    pricing_engine.invalidate_rules()
+    return rule_id
+
+def delete_rule(rule_id):
+    with db.transaction() as c:
+        c.execute("DELETE FROM pricing_rules WHERE ruleID = %s", (rule_id,))
+        deleted = c.rowcount
+    pricing_engine.invalidate_rules()
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dynamic pricing rules and rate calendar")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show the pricing rules")
+    add = commands.add_parser("add", help="add a pricing rule")
+    add.add_argument("kind", choices=KINDS)
+    add.add_argument("multiplier", help="e.g. 1.2 for +20%%, 0.9 for a 10%% discount")
+    add.add_argument("--room-type", help="type name; every type when omitted")
+    add.add_argument("--start", help="first night the rule applies, YYYY-MM-DD")
+    add.add_argument("--end", help="night after the last one the rule applies, YYYY-MM-DD")
+    add.add_argument("--weekdays", help=f"weekend nights, Monday = 0 (default {DEFAULT_WEEKEND})")
+    add.add_argument("--min-nights", type=int, help="length_of_stay: shortest stay the tier applies to")
+    add.add_argument("--min-occupancy", help="occupancy: share of rooms sold, e.g. 0.8")
+    remove = commands.add_parser("remove", help="delete a pricing rule")
+    remove.add_argument("rule_id", type=int)
+    rates = commands.add_parser("rates", help="print nightly rates for a room type")
+    rates.add_argument("room_type")
+    rates.add_argument("--start", default=None, help="YYYY-MM-DD (default today)")
+    rates.add_argument("--days", type=int, default=14)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            names = {room_type.room_type_id: room_type.type_name for room_type in room_type_catalog.room_types()}
+            for rule in load_rules():
+                scope = names.get(rule.room_type_id, "all types") if rule.room_type_id else "all types"
+                details = [f"{name}={value}" for name, value in rule._asdict().items()
+                           if value is not None and name not in ("rule_id", "kind", "room_type_id", "multiplier")]
+                print(f"{rule.rule_id:>4}  {rule.kind:<15} x{rule.multiplier}  {scope}  {' '.join(details)}")
+        elif args.command == "add":
+            room_type_id = None
+            if args.room_type:
+                room_type = room_type_catalog.get(args.room_type)
+                if room_type is None:
+                    print(f"Unknown room type: {args.room_type}")
+                    sys.exit(1)
+                room_type_id = room_type.room_type_id
+            rule_id = add_rule(args.kind, Decimal(args.multiplier), room_type_id, args.start, args.end,
+                               args.weekdays, args.min_nights, args.min_occupancy)
+            print(f"Added rule {rule_id}")
+        elif args.command == "remove":
+            print("Deleted rule" if delete_rule(args.rule_id) else f"No rule {args.rule_id}")
+        else:
+            start = date.fromordinal(to_day(args.start)) if args.start else date.today()
+            for offset, rate in enumerate(pricing_engine.nightly_rates(args.room_type, start, args.days)):
+                day = date.fromordinal(start.toordinal() + offset)
+                print(f"{day}  {day.strftime('%a')}  {rate}")
+    except InvalidOperation:
+        print("Invalid rule: multiplier and --min-occupancy must be numbers")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Invalid rule: {e}")
+        sys.exit(1)
+    except db.Error as e:
+        print(f"Pricing error: {e}")
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import bisect
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+ENABLED = os.environ.get("HOTEL_QUERY_STATS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("HOTEL_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("HOTEL_SLOW_QUERY_LOG", "")  # file slow queries are appended to; off by default
+SLOW_QUERIES_KEPT = 200
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)  # histogram upper bounds; +Inf is implied
+CALL_SITES_KEPT = 5
+
+# Frames from these files are plumbing, not the call site worth reporting
+PLUMBING_FILES = ("query_stats.py", "db.py", "contextlib.py", "threading.py")
+
+
+def fingerprint(sql):
+    # Group statements that differ only in whitespace or the length of an IN (...) list
+    sql = " ".join(sql.split())
+    return re.sub(r"IN \((%s(, )?)+\)", "IN (...)", sql)
+
+def call_site():
+    frame = sys._getframe(2)
+    while frame and os.path.basename(frame.f_code.co_filename) in PLUMBING_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+class StatementStats:
+    def __init__(self, statement):
+        self.statement = statement
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.call_sites = Counter()
+
+    def record(self, elapsed_ms, rows, site):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += max(rows, 0)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.call_sites[site] += 1
+
+    def top_call_sites(self):
+        return self.call_sites.most_common(CALL_SITES_KEPT)
+
+    def percentile_ms(self, pct):
+        # Upper bound of the bucket holding the pct-th call
+        wanted = self.calls * pct / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS + (self.max_ms,), self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class QueryStats:
+    # Process-wide per-statement timings, row counts and call sites, plus the slow-query log.
+    # Slow SELECTs are EXPLAINed later on a background thread, on their own connection,
+    # so the caller's result set is never disturbed.
+    def __init__(self, slow_ms=SLOW_QUERY_MS, log_path=SLOW_QUERY_LOG):
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.statements = {}
+        self.slow_queries = deque(maxlen=SLOW_QUERIES_KEPT)
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.explain_queue = queue.Queue()
+        self.explain_thread = None
+
+    def record(self, sql, params, elapsed, rows):
+        elapsed_ms = elapsed * 1000
+        site = call_site()
+        key = fingerprint(sql)
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(key)
+            stats.record(elapsed_ms, rows, site)
+        if elapsed_ms >= self.slow_ms:
+            self.record_slow(sql, params, elapsed_ms, rows, site)
+
+    def record_slow(self, sql, params, elapsed_ms, rows, site):
+        entry = {"time": datetime.now().isoformat(timespec="seconds"), "ms": round(elapsed_ms, 1), "rows": rows,
+                 "site": site, "statement": " ".join(sql.split()), "params": repr(params), "explain": None}
+        with self.lock:
+            self.slow_queries.append(entry)
+            if self.explain_thread is None:
+                self.explain_thread = threading.Thread(target=self.explain_slow_queries, name="explain", daemon=True)
+                self.explain_thread.start()
+        self.explain_queue.put((entry, params))
+
+    def explain_slow_queries(self):
+        import db
+
+        while True:
+            entry, params = self.explain_queue.get()
+            if entry["statement"].upper().startswith("SELECT") and not isinstance(params, str):
+                try:
+                    with db.connection() as conn:
+                        cur = conn.cursor(buffered=True)
+                        cur.execute("EXPLAIN " + entry["statement"].replace(" FOR UPDATE", ""), params)
+                        columns = [d[0] for d in cur.description]
+                        entry["explain"] = [dict(zip(columns, map(str, row))) for row in cur.fetchall()]
+                        cur.close()
+                except Exception as e:
+                    entry["explain"] = f"EXPLAIN failed: {e}"
+            self.write_slow_log(entry)
+
+    def write_slow_log(self, entry):
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(f"{entry['time']} {entry['ms']}ms rows={entry['rows']} at {entry['site']}\n"
+                        f"  {entry['statement']}\n  params: {entry['params']}\n")
+                if entry["explain"]:
+                    f.write(f"  explain: {entry['explain']}\n")
+        except OSError as e:
+            print(f"Could not write slow query log: {e}")
+
+    def snapshot(self):
+        # Statement stats, busiest first
+        with self.lock:
+            return sorted(self.statements.values(), key=lambda stats: stats.total_ms, reverse=True)
+
+    def slow_snapshot(self):
+        with self.lock:
+            return list(self.slow_queries)
+
+    def reset(self):
+        with self.lock:
+            self.statements.clear()
+            self.slow_queries.clear()
+            self.started = time.time()
+
+    def prometheus_text(self):
+        # Prometheus text exposition format, one label set per statement fingerprint
+        lines = [
+            "# HELP hotel_db_query_duration_seconds Database statement latency.",
+            "# TYPE hotel_db_query_duration_seconds histogram",
+        ]
+        row_lines = [
+            "# HELP hotel_db_query_rows_total Rows returned or affected.",
+            "# TYPE hotel_db_query_rows_total counter",
+        ]
+        for stats in self.snapshot():
+            label = 'statement="' + stats.statement[:200].replace("\\", "\\\\").replace('"', '\\"') + '"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS, stats.buckets):
+                cumulative += count
+                lines.append(f'hotel_db_query_duration_seconds_bucket{{{label},le="{bound / 1000}"}} {cumulative}')
+            lines.append(f'hotel_db_query_duration_seconds_bucket{{{label},le="+Inf"}} {stats.calls}')
+            lines.append(f"hotel_db_query_duration_seconds_sum{{{label}}} {stats.total_ms / 1000:.6f}")
+            lines.append(f"hotel_db_query_duration_seconds_count{{{label}}} {stats.calls}")
+            row_lines.append(f"hotel_db_query_rows_total{{{label}}} {stats.rows}")
+        lines += row_lines
+        lines += [
+            "# HELP hotel_db_slow_queries Slow statements kept in the in-process log.",
+            "# TYPE hotel_db_slow_queries gauge",
+            f"hotel_db_slow_queries {len(self.slow_snapshot())}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # For node_exporter's textfile collector: write then rename so scrapes never see half a file
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+    def serve_prometheus(self, port, host="127.0.0.1"):
+        # http.server is imported here, not at startup; most processes never serve metrics
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        stats = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = stats.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+class InstrumentedCursor:
+    # Wraps a backend cursor; execute/executemany are timed and everything
+    # else is passed through. Row counts are the cursor's rowcount, so unbuffered
+    # SELECTs report 0 until their rows have been fetched.
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def execute(self, operation, params=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params)
+        finally:
+            self._stats.record(operation, params, time.perf_counter() - start, self._cursor.rowcount)
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)  # may be a generator; it is counted after running
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        finally:
+            self._stats.record(operation, f"{len(seq_params)} rows", time.perf_counter() - start,
+                               self._cursor.rowcount)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+query_stats = QueryStats()
+exporters_started = False
+
+def instrument(cursor):
+    return InstrumentedCursor(cursor, query_stats) if ENABLED else cursor
+
+def start_exporters():
+    # HOTEL_METRICS_PORT serves /metrics over HTTP; HOTEL_METRICS_FILE is rewritten every 15 s
+    global exporters_started
+    if exporters_started:
+        return
+    exporters_started = True
+    port = os.environ.get("HOTEL_METRICS_PORT")
+    if port:
+        query_stats.serve_prometheus(int(port))
+    path = os.environ.get("HOTEL_METRICS_FILE")
+    if path:
+        def write_forever():
+            while True:
+                time.sleep(15)
+                try:
+                    query_stats.write_prometheus(path)
+                except OSError as e:
+                    print(f"Could not write metrics file: {e}")
+        threading.Thread(target=write_forever, name="metrics-file", daemon=True).start()
@@ -0,0 +1,151 @@
+import argparse
+import sys
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+import db
+from query_stats import instrument
+from availability import to_day
+
+REVENUE_PLACES = Decimal("0.0001")
+CHUNK_ROWS = 50000
+INSERT_BATCH = 1000
+
+# Daily Rollup
+# daily_rollup keeps, per night and room type: rooms sold and revenue from active bookings
+# (each booking's totalAmount spread evenly over its nights), plus arrivals and cancellations
+# counted on the check-in date. Every booking write applies the difference between the
+# booking's state before and after inside its own transaction, so the table stays exact.
+
+BOOKING_STATE_QUERY = """
+    SELECT r.roomTypeID, b.checkInDate, b.checkOutDate, b.status, b.totalAmount, b.userID
+    FROM bookings b
+    JOIN rooms r ON b.roomID = r.roomID
+"""
+
+UPSERT_QUERY = """
+    INSERT INTO daily_rollup (day, roomTypeID, roomsSold, revenue, arrivals, cancellations)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        roomsSold = roomsSold + VALUES(roomsSold),
+        revenue = revenue + VALUES(revenue),
+        arrivals = arrivals + VALUES(arrivals),
+        cancellations = cancellations + VALUES(cancellations)
+"""
+
+
+def booking_state(c, booking_id):
+    # (roomTypeID, checkIn, checkOut, status, totalAmount, userID), locked for the
+    # rest of the transaction so two writers can't both subtract the same old state
+    c.execute(BOOKING_STATE_QUERY + " WHERE b.bookingID = %s FOR UPDATE", (booking_id,))
+    return c.fetchone()
+
+def contribution(state):
+    # {(day, roomTypeID): [roomsSold, revenue, arrivals, cancellations]} for one booking state
+    if state is None:
+        return {}
+    type_id, check_in, check_out, status, amount = state[:5]
+    first, last = to_day(check_in), to_day(check_out)
+    if last <= first:
+        return {}
+    rows = {(date.fromordinal(first), type_id): [0, Decimal(0), 1, int(status == 'cancelled')]}
+    if status != 'cancelled':
+        nightly = (Decimal(amount or 0) / (last - first)).quantize(REVENUE_PLACES)
+        for day in range(first, last):
+            row = rows.setdefault((date.fromordinal(day), type_id), [0, Decimal(0), 0, 0])
+            row[0] += 1
+            row[1] += nightly
+    return rows
+
+def add_contribution(totals, state, sign=1):
+    for key, values in contribution(state).items():
+        total = totals[key]
+        for i, value in enumerate(values):
+            total[i] += sign * value
+
+def new_totals():
+    return defaultdict(lambda: [0, Decimal(0), 0, 0])
+
+def apply_changes(c, changes):
+    # changes is [(state_before, state_after), ...]; None stands for "no booking".
+    # Rows are written in key order so concurrent writers lock them in the same order.
+    totals = new_totals()
+    for before, after in changes:
+        add_contribution(totals, before, -1)
+        add_contribution(totals, after)
+    rows = [(day, type_id, *values) for (day, type_id), values in sorted(totals.items()) if any(values)]
+    if rows:
+        c.executemany(UPSERT_QUERY, rows)
+
+def apply_change(c, before, after):
+    apply_changes(c, [(before, after)])
+
+
+# Rebuild and Verify
+def expected_rollup(c):
+    # Recompute the whole rollup from bookings, reading in chunks
+    totals = new_totals()
+    while True:
+        rows = c.fetchmany(CHUNK_ROWS)
+        if not rows:
+            break
+        for state in rows:
+            add_contribution(totals, state)
+    return {key: values for key, values in totals.items() if any(values)}
+
+def rebuild():
+    # Locks bookings against writers while it runs; best done outside business hours
+    with db.connection() as conn:
+        conn.start_transaction()
+        try:
+            reader = instrument(conn.cursor(buffered=False))
+            reader.execute(BOOKING_STATE_QUERY + " LOCK IN SHARE MODE")
+            totals = expected_rollup(reader)
+            reader.close()
+            writer = instrument(conn.cursor())
+            writer.execute("DELETE FROM daily_rollup")
+            rows = [(day, type_id, *values) for (day, type_id), values in sorted(totals.items())]
+            for i in range(0, len(rows), INSERT_BATCH):
+                writer.executemany(UPSERT_QUERY, rows[i:i + INSERT_BATCH])
+            writer.close()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return len(totals)
+
+def verify():
+    # Returns [(day, roomTypeID, expected, actual), ...] for every row that differs.
+    # Writes that commit while this runs can show up as spurious differences.
+    with db.streaming_cursor() as c:
+        c.execute(BOOKING_STATE_QUERY)
+        expected = expected_rollup(c)
+    with db.cursor() as c:
+        c.execute("SELECT day, roomTypeID, roomsSold, revenue, arrivals, cancellations FROM daily_rollup")
+        actual = {(row[0], row[1]): list(row[2:]) for row in c.fetchall() if any(row[2:])}
+    zero = [0, Decimal(0), 0, 0]
+    return [(day, type_id, expected.get((day, type_id), zero), actual.get((day, type_id), zero))
+            for day, type_id in sorted(set(expected) | set(actual))
+            if expected.get((day, type_id), zero) != actual.get((day, type_id), zero)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily occupancy and revenue rollup")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args()
+
+    try:
+        if args.command == "rebuild":
+            print(f"Rebuilt {rebuild()} rollup rows")
+        mismatches = verify()
+    except db.Error as e:
+        print(f"Rollup error: {e}")
+        sys.exit(2)
+    for day, type_id, expected, actual in mismatches[:20]:
+        print(f"{day} room type {type_id}: expected {expected}, found {actual}")
+    if mismatches:
+        print(f"{len(mismatches)} rollup rows differ from bookings")
+        sys.exit(1)
+    print("Rollup matches bookings")
+
+if __name__ == "__main__":
+    main()
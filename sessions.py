@@ -0,0 +1,127 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+SESSION_TTL = int(os.environ.get("HOTEL_SESSION_TTL", "900"))        # seconds a sign-in stays valid
+SESSION_RECHECK = int(os.environ.get("HOTEL_SESSION_RECHECK", "60"))  # seconds before a session re-reads its user row
+MAX_SESSIONS = int(os.environ.get("HOTEL_MAX_SESSIONS", "1000"))
+
+User = namedtuple("User", ["user_id", "username", "password", "role"])
+
+# Sessions
+# A successful bcrypt check issues a signed, expiring token ("<id>.<expiry>.<hmac>")
+# kept in a bounded LRU store. While the session lives, the same email and password
+# sign in again by comparing an HMAC of the password instead of paying bcrypt, and
+# tokens are checked without touching the database. Every SESSION_RECHECK seconds a
+# session re-reads its user row, so a password or role change made by another process
+# ends it; changes made through this process revoke at once (revoke_user).
+
+
+class Session:
+    def __init__(self, session_id, user, email, password_digest, expires):
+        self.session_id = session_id
+        self.user = user
+        self.email = email
+        self.password_digest = password_digest
+        self.expires = expires
+        self.checked_at = time.monotonic()
+
+
+class SessionStore:
+    def __init__(self, lookup, secret=None, ttl=SESSION_TTL, recheck=SESSION_RECHECK, max_sessions=MAX_SESSIONS):
+        # lookup(email) -> User or None, used for the periodic recheck
+        self.lookup = lookup
+        self.secret = secret or secrets.token_bytes(32)
+        self.ttl = ttl
+        self.recheck = recheck
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()  # session_id -> Session, least recently used first
+        self.by_email = {}
+        self.lock = threading.Lock()
+
+    def sign(self, text):
+        return hmac.new(self.secret, text.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def token_for(self, session):
+        return f"{session.session_id}.{session.expires}.{self.sign(f'{session.session_id}.{session.expires}')}"
+
+    def password_digest(self, email, password):
+        return self.sign(f"{email.lower()}\0{password}")
+
+    def issue(self, user, email, password):
+        # Returns the token for a user whose password has just passed bcrypt
+        session_id = secrets.token_urlsafe(16)
+        expires = int(time.time()) + self.ttl
+        session = Session(session_id, user, email.lower(), self.password_digest(email, password), expires)
+        with self.lock:
+            # Earlier sessions of the same user stay valid; re-entry matches the newest
+            self.sessions[session_id] = session
+            self.by_email[session.email] = session_id
+            while len(self.sessions) > self.max_sessions:
+                evicted = self.sessions.popitem(last=False)[1]
+                if self.by_email.get(evicted.email) == evicted.session_id:
+                    del self.by_email[evicted.email]
+        return self.token_for(session)
+
+    def authenticate(self, email, password):
+        # The session's (token, user) if these credentials match a live session, else None
+        with self.lock:
+            session = self.sessions.get(self.by_email.get(email.lower()))
+        if session is None or not hmac.compare_digest(session.password_digest, self.password_digest(email, password)):
+            return None
+        if not self.still_valid(session):
+            return None
+        return self.token_for(session), session.user
+
+    def validate(self, token):
+        # The user a token belongs to, or None if it is forged, expired or revoked
+        try:
+            session_id, expires, signature = token.split(".")
+        except (AttributeError, ValueError):
+            return None
+        if not hmac.compare_digest(signature, self.sign(f"{session_id}.{expires}")):
+            return None
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session is None or not self.still_valid(session):
+            return None
+        return session.user
+
+    def still_valid(self, session):
+        if time.time() >= session.expires:
+            self.drop(session)
+            return False
+        if time.monotonic() - session.checked_at >= self.recheck:
+            current = self.lookup(session.email)
+            if current is None or current.password != session.user.password or current.role != session.user.role:
+                self.drop(session)
+                return False
+            session.checked_at = time.monotonic()
+        with self.lock:
+            if session.session_id not in self.sessions:
+                return False
+            self.sessions.move_to_end(session.session_id)
+        return True
+
+    def drop(self, session):
+        with self.lock:
+            self.sessions.pop(session.session_id, None)
+            if self.by_email.get(session.email) == session.session_id:
+                del self.by_email[session.email]
+
+    def revoke(self, token):
+        session_id = str(token).split(".")[0]
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session:
+            self.drop(session)
+
+    def revoke_user(self, user_id):
+        with self.lock:
+            ended = [session for session in self.sessions.values() if session.user.user_id == user_id]
+        for session in ended:
+            self.drop(session)
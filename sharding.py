@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import db
+from booking_service import BookingService, ValidationError
+from catalog import room_type_catalog
+
+SHARD_WORKERS = int(os.environ.get("HOTEL_SHARD_WORKERS", "4"))
+WORKER_POOL_SIZE = 2  # DB connections per worker process; a worker runs one allocation at a time
+PROPERTY_ID = 1       # the schema holds a single property; partition keys carry it for when it holds more
+
+# Sharded Allocation
+# Allocation is partitioned by (property, room type). Each partition is owned by one
+# worker process, which runs its allocations one at a time against its own connection
+# pool and availability index, so allocations for different partitions run in parallel
+# and never queue on the same room rows. The row locks in BookingService still decide,
+# so terminals that write directly stay correct alongside the shards.
+
+service = None
+
+def init_worker(backend_name, config):
+    global service
+    db.configure(pool_size=WORKER_POOL_SIZE, backend_name=backend_name, **config)
+    service = BookingService()
+
+def run(method, *args):
+    return getattr(service, method)(*args)
+
+def warm_up():
+    service.get_availability_index()
+    return os.getpid()
+
+
+class ShardedBookingService(BookingService):
+    # Drop-in BookingService whose allocating calls (availability, create, update, group
+    # bookings) are routed to the worker that owns the room type; everything else runs here
+    def __init__(self, workers=SHARD_WORKERS, catalog=room_type_catalog):
+        super().__init__(catalog)
+        # spawn, not fork: the parent's pooled connections and threads must not be inherited
+        context = multiprocessing.get_context("spawn")
+        self.shards = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=init_worker,
+                                initargs=(db.BACKEND, dict(db.backend_config())))
+            for _ in range(workers)
+        ]
+
+    def partition(self, room_type):
+        catalog_entry = self.catalog.get(room_type)
+        if catalog_entry is None:
+            raise ValidationError(f"Unknown room type: {room_type}")
+        return PROPERTY_ID, catalog_entry.room_type_id
+
+    def owner(self, room_type):
+        property_id, room_type_id = self.partition(room_type)
+        return self.shards[(property_id * 31 + room_type_id) % len(self.shards)]
+
+    def submit(self, room_type, method, *args):
+        # Returns a Future, so callers can keep several partitions busy at once
+        return self.owner(room_type).submit(run, method, *args)
+
+    def warm_up(self):
+        # Start every worker and build its index before the first request pays for it
+        return [future.result() for future in [shard.submit(warm_up) for shard in self.shards]]
+
+    def check_room_availability(self, room_type, check_in, check_out, exclude_booking_id=None):
+        if self.catalog.get(room_type) is None:
+            return None
+        return self.submit(room_type, "check_room_availability", room_type, check_in, check_out,
+                           exclude_booking_id).result()
+
+    def create_booking(self, user_id, room_type, check_in, check_out, payment_method):
+        return self.submit(room_type, "create_booking", user_id, room_type, check_in, check_out,
+                           payment_method).result()
+
+    def update_booking(self, user_id, booking_id, room_type, check_in, check_out):
+        # The owner of the new room type allocates; a stay moving between types is still
+        # safe against the old owner because both lock the rows they touch
+        updated = self.submit(room_type, "update_booking", user_id, booking_id, room_type, check_in,
+                              check_out).result()
+        self.broadcast("refresh_indexed_booking", booking_id)
+        return updated
+
+    def add_bookings_bulk(self, user_id, requests):
+        # A group booking is one transaction, so it runs on the owner of its first room type
+        if not requests:
+            return []
+        return self.submit(requests[0][0], "add_bookings_bulk", user_id, requests).result()
+
+    def broadcast(self, method, *args):
+        # Index hints in the workers; fire and forget
+        for shard in self.shards:
+            shard.submit(run, method, *args)
+
+    def index_booking(self, booking_id, room_id, check_in, check_out):
+        pass
+
+    def unindex_booking(self, booking_id):
+        self.broadcast("unindex_booking", booking_id)
+
+    def refresh_indexed_booking(self, booking_id):
+        self.broadcast("refresh_indexed_booking", booking_id)
+
+    def close(self):
+        for shard in self.shards:
+            shard.shutdown(wait=True, cancel_futures=True)
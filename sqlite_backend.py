@@ -0,0 +1,148 @@
+import functools
+import re
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+
+# Embedded SQLite storage backend for db.ConnectionPool, for single-machine
+# deployments, tests and benchmarks. Connections use WAL so readers never wait for
+# the writer, and every transaction is BEGIN IMMEDIATE: one writer at a time for the
+# whole file, which gives the same no-double-booking guarantee as the per-room-type
+# FOR UPDATE locks on MySQL. The rest of the app keeps writing MySQL-flavoured SQL;
+# translate() rewrites the few constructs SQLite spells differently.
+
+Error = sqlite3.Error
+BUSY_TIMEOUT = 10  # seconds a connection waits for the write lock
+DECIMAL_PLACES = Decimal("0.0001")  # widest money column, daily_rollup.revenue
+CENTS = Decimal("0.01")
+
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: to_decimal(value.decode()))
+
+TRANSLATIONS = [
+    (re.compile(r"\b(?:BIG)?INT AUTO_INCREMENT PRIMARY KEY"), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\s+ON UPDATE CURRENT_TIMESTAMP"), ""),
+    (re.compile(r"\s+FOR UPDATE\b"), ""),
+    (re.compile(r"\s+LOCK IN SHARE MODE\b"), ""),
+    (re.compile(r"@@auto_increment_increment"), "1"),
+    (re.compile(r"\b(?:GET_LOCK|RELEASE_LOCK)\([^)]*\)"), "1"),
+    (re.compile(r"NOW\(\) - INTERVAL %s DAY"), "datetime('now', '-' || %s || ' days')"),
+    (re.compile(r"ON DUPLICATE KEY UPDATE"), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)"), r"excluded.\1"),
+    (re.compile(r"^\s*EXPLAIN\s+(?!QUERY PLAN)", re.IGNORECASE), "EXPLAIN QUERY PLAN "),
+    (re.compile(r"%s"), "?"),
+]
+
+
+def to_decimal(text):
+    # DECIMAL columns have NUMERIC affinity, so sums come back as floats; round away the
+    # binary noise and keep two places for whole-cent amounts, like MySQL's DECIMAL(10,2)
+    value = Decimal(text).quantize(DECIMAL_PLACES)
+    cents = value.quantize(CENTS)
+    return cents if cents == value else value
+
+@functools.lru_cache(maxsize=512)
+def translate(sql):
+    for pattern, replacement in TRANSLATIONS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+class SqliteCursor:
+    # The slice of the mysql.connector cursor API the app uses
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, operation, params=None):
+        sql = translate(operation)
+        self._cursor.execute(sql, params or ())
+        self.rowcount = self._cursor.rowcount
+        # sqlite3 refreshes lastrowid after every statement; MySQL only after an INSERT
+        if sql.lstrip()[:6].upper() == "INSERT":
+            self.lastrowid = self._cursor.lastrowid
+
+    def executemany(self, operation, seq_params):
+        # MySQL reports the first ID of a multi-row INSERT; callers count on that
+        seq_params = list(seq_params)
+        if not seq_params:
+            self.rowcount = 0
+            return
+        self.execute(operation, seq_params[0])
+        if len(seq_params) > 1:
+            self._cursor.executemany(translate(operation), seq_params[1:])
+            self.rowcount += self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SqliteConnection:
+    # The slice of the mysql.connector connection API that db.py uses
+    unread_result = False
+
+    def __init__(self, path):
+        # isolation_level=None: autocommit unless start_transaction() opened one
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                     detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self.autocommit = True
+
+    def cursor(self, buffered=True):
+        return SqliteCursor(self._conn.cursor())
+
+    def start_transaction(self, isolation_level=None):
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def consume_results(self):
+        pass
+
+    def ping(self, reconnect=True, attempts=1, delay=0):
+        self._conn.execute("SELECT 1")
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(config):
+    return SqliteConnection(config["path"])
+
+def pool_exhausted():
+    return sqlite3.OperationalError("No database connection available")
+
+def connection_lost(error):
+    return False
@@ -0,0 +1,20 @@
+import os
+import sys
+
+# The modules live at the top of the repository, next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("HOTEL_SLOW_QUERY_LOG", "")
+
+import pytest
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # A migrated SQLite database of its own for each test
+    import db
+    import migrations
+
+    db.configure(pool_size=5, backend_name="sqlite", path=str(tmp_path / "hotel.db"))
+    monkeypatch.setattr(migrations, "migrated", False)
+    migrations.migrate()
+    return db
@@ -0,0 +1,111 @@
+import http.client
+import json
+import threading
+from datetime import date, timedelta
+import pytest
+from api_server import BookingApi, make_server
+from booking_service import BookingService
+from catalog import RoomTypeCatalog
+from pricing import PricingEngine
+from sessions import SessionStore, User
+
+
+@pytest.fixture
+def api(database):
+    with database.cursor() as c:
+        c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+                  ("guest", "guest@example.com", "x", "customer"))
+        guest = User(c.lastrowid, "guest", "x", "customer")
+        c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+                  ("boss", "boss@example.com", "y", "admin"))
+        admin = User(c.lastrowid, "boss", "y", "admin")
+    # Sessions are issued directly, so only the /login test pays for bcrypt
+    sessions = SessionStore(lambda email: None)
+    catalog = RoomTypeCatalog()
+    server = make_server("127.0.0.1", 0, 4, BookingApi(BookingService(catalog, PricingEngine(catalog)), sessions))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    client = Client(server.server_address[1])
+    client.guest = sessions.issue(guest, "guest@example.com", "pw")
+    client.admin = sessions.issue(admin, "boss@example.com", "pw")
+    yield client
+    client.conn.close()
+    server.shutdown()
+    server.server_close()
+
+
+class Client:
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+
+    def call(self, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self.conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+
+
+def day(offset):
+    return str(date.today() + timedelta(days=offset))
+
+def booking(room_type="Single", offset=10, nights=2):
+    return {"room_type": room_type, "check_in": day(offset), "check_out": day(offset + nights), "payment_method": "Cash"}
+
+
+def test_sign_in_and_roles_are_enforced(api):
+    assert api.call("GET", "/room-types")[0] == 401
+    assert api.call("GET", "/room-types", token="forged.0.token")[0] == 401
+    assert api.call("PUT", "/admin/bookings/1/status", {"status": "confirmed"}, api.guest)[0] == 403
+    assert api.call("GET", "/nowhere", token=api.guest)[0] == 404
+    assert api.call("DELETE", "/room-types", token=api.guest)[0] == 405
+    status, body = api.call("GET", "/room-types", token=api.guest)
+    assert status == 200 and "Single" in body["roomTypes"]
+
+def test_booking_lifecycle(api):
+    status, booked = api.call("POST", "/bookings", booking(), api.guest)
+    assert status == 201
+    booking_id = booked["booking_id"]
+    status, body = api.call("GET", "/bookings", token=api.guest)
+    assert status == 200 and [row["bookingID"] for row in body["bookings"]] == [booking_id]
+    assert api.call("PUT", f"/bookings/{booking_id}", booking("Double", 12), api.guest)[0] == 200
+    assert api.call("POST", f"/bookings/{booking_id}/cancel", token=api.guest)[0] == 200
+    assert api.call("PUT", f"/admin/bookings/{booking_id}/status", {"status": "confirmed"}, api.admin)[0] == 200
+    assert api.call("DELETE", f"/admin/bookings/{booking_id}", token=api.admin)[0] == 200
+    assert api.call("DELETE", f"/admin/bookings/{booking_id}", token=api.admin)[0] == 404
+    assert api.call("PUT", f"/admin/bookings/{booking_id}/status", {"status": "confirmed"}, api.admin)[0] == 404
+    assert api.call("POST", f"/bookings/{booking_id}/cancel", token=api.guest)[0] == 404
+
+def test_bad_requests_are_400(api):
+    assert api.call("POST", "/bookings", {"room_type": "Single"}, api.guest)[0] == 400
+    assert api.call("POST", "/bookings", booking("Penthouse"), api.guest)[0] == 400
+    assert api.call("POST", "/bookings", dict(booking(), check_in="tomorrow"), api.guest)[0] == 400
+    assert api.call("POST", "/bookings", booking(offset=-5), api.guest)[0] == 400
+    assert api.call("GET", "/availability?check_in=2030-01-05&check_out=2030-01-01", token=api.guest)[0] == 400
+    assert api.call("GET", "/availability/calendar?days=0", token=api.guest)[0] == 400
+    assert api.call("GET", "/availability/calendar?days=-5", token=api.guest)[0] == 400
+    assert api.call("GET", "/availability/calendar?days=many", token=api.guest)[0] == 400
+    assert api.call("PUT", "/admin/bookings/1/status", {"status": "held"}, api.admin)[0] == 400
+
+def test_a_full_room_type_is_409(api):
+    booked = 0
+    while True:
+        status, body = api.call("POST", "/bookings", booking("Suite", 30, 1), api.guest)
+        if status != 201:
+            break
+        booked += 1
+    assert status == 409 and booked > 0
+    status, body = api.call("GET", f"/availability?check_in={day(30)}&check_out={day(31)}", token=api.guest)
+    assert status == 200 and body["available"]["Suite"] is False
+    status, body = api.call("GET", f"/availability/calendar?start={day(30)}&days=1", token=api.guest)
+    assert status == 200 and body["free"]["Suite"] == [0]
+
+def test_login(api):
+    pytest.importorskip("bcrypt")
+    import auth
+
+    auth.create_user("walker", "walker@example.com", "s3cret", "customer")
+    assert api.call("POST", "/login", {"email": "walker@example.com", "password": "wrong"})[0] == 401
+    status, body = api.call("POST", "/login", {"email": "walker@example.com", "password": "s3cret"})
+    assert status == 200 and body["role"] == "customer"
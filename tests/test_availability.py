@@ -0,0 +1,71 @@
+from availability import RoomAvailabilityIndex, free_room_counts, to_day
+
+
+def make_index(bookings):
+    index = RoomAvailabilityIndex()
+    index.load([(1, "Single"), (2, "Single"), (3, "Double")], bookings)
+    return index
+
+
+def test_check_out_day_can_be_let_again():
+    index = make_index([(10, 1, "2030-01-05", "2030-01-08")])
+    assert index.is_room_free(1, "2030-01-08", "2030-01-10")
+    assert index.is_room_free(1, "2030-01-02", "2030-01-05")
+
+def test_overlaps_at_either_end_are_caught():
+    index = make_index([(10, 1, "2030-01-05", "2030-01-08")])
+    assert not index.is_room_free(1, "2030-01-07", "2030-01-09")
+    assert not index.is_room_free(1, "2030-01-04", "2030-01-06")
+    assert not index.is_room_free(1, "2030-01-06", "2030-01-07")
+    assert not index.is_room_free(1, "2030-01-01", "2030-01-20")
+
+def test_long_stay_is_found_behind_later_short_stays():
+    # The scan walks back past the short stays until max_stay rules out older starts
+    bookings = [(10, 1, "2030-01-01", "2030-01-31")]
+    bookings += [(20 + day, 2, f"2030-01-{day:02d}", f"2030-01-{day + 1:02d}") for day in range(1, 29, 2)]
+    index = make_index(bookings)
+    assert not index.is_room_free(1, "2030-01-29", "2030-01-30")
+    assert index.is_room_free(1, "2030-01-31", "2030-02-01")
+    assert not index.is_room_free(2, "2030-01-27", "2030-01-28")
+    assert index.is_room_free(2, "2030-01-28", "2030-01-29")
+
+def test_exclude_booking_lets_a_stay_move_over_itself():
+    index = make_index([(10, 1, "2030-01-05", "2030-01-08")])
+    assert index.is_room_free(1, "2030-01-06", "2030-01-09", exclude_booking_id=10)
+    assert not index.is_room_free(1, "2030-01-06", "2030-01-09", exclude_booking_id=11)
+
+def test_find_free_room_in_room_order():
+    index = make_index([(10, 1, "2030-01-05", "2030-01-08")])
+    assert index.find_free_room("Single", "2030-01-06", "2030-01-07") == 2
+    assert index.find_free_room("Single", "2030-01-08", "2030-01-09") == 1
+    index.add_booking(11, 2, "2030-01-06", "2030-01-07")
+    assert index.find_free_room("Single", "2030-01-06", "2030-01-07") is None
+    assert index.find_free_room("Suite", "2030-01-06", "2030-01-07") is None
+
+def test_removed_and_moved_bookings_free_their_nights():
+    index = make_index([(10, 1, "2030-01-05", "2030-01-08")])
+    index.remove_booking(10)
+    assert index.is_room_free(1, "2030-01-05", "2030-01-08")
+    index.add_booking(10, 1, "2030-01-05", "2030-01-08")
+    index.add_booking(10, 2, "2030-01-05", "2030-01-08")
+    assert index.is_room_free(1, "2030-01-05", "2030-01-08")
+    assert not index.is_room_free(2, "2030-01-05", "2030-01-08")
+
+def test_free_room_counts():
+    start = to_day("2030-01-01")
+    counts = free_room_counts({"Single": 2, "Double": 1}, [("Single", "2030-01-02", 2), ("Double", "2030-01-05", 1)],
+                              start, 3)
+    assert counts == {"Single": [2, 0, 2], "Double": [1, 1, 1]}
+
+def test_removing_the_longest_stay_narrows_the_scan():
+    index = make_index([(10, 1, "2030-01-01", "2030-03-01"), (11, 1, "2030-03-05", "2030-03-07"),
+                        (12, 2, "2030-01-01", "2030-01-20")])
+    assert index.max_stay[1] == 59
+    index.remove_booking(10)
+    assert index.max_stay[1] == 2
+    assert index.max_stay[2] == 19
+    assert index.is_room_free(1, "2030-01-10", "2030-01-12")
+    assert not index.is_room_free(1, "2030-03-06", "2030-03-08")
+    index.add_booking(12, 1, "2030-01-01", "2030-01-20")
+    assert index.max_stay == {1: 19, 2: 0}
+    assert not index.is_room_free(1, "2030-01-19", "2030-01-21")
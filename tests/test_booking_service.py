@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+import pytest
+import rollup
+from booking_service import BookingService, ValidationError
+from catalog import RoomTypeCatalog
+from pricing import PricingEngine
+
+
+@pytest.fixture
+def user_id(database):
+    with database.cursor() as c:
+        c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+                  ("guest", "guest@example.com", "x", "customer"))
+        return c.lastrowid
+
+def stay(offset, nights):
+    check_in = date.today() + timedelta(days=offset)
+    return str(check_in), str(check_in + timedelta(days=nights))
+
+
+def test_writes_hold_one_connection_on_a_cold_service(database, user_id):
+    # A catalog that reloads on every lookup and a pool of one: any lookup, index build
+    # or price made inside a transaction would wait for a second connection and fail
+    catalog = RoomTypeCatalog(ttl=-1)
+    service = BookingService(catalog, PricingEngine(catalog))
+    database.configure(pool_size=1)
+    database.get_pool().timeout = 1
+    booked = service.create_booking(user_id, "Single", *stay(10, 2), "Cash")
+    service.update_booking(user_id, booked.booking_id, "Double", *stay(11, 2))
+    service.add_bookings_bulk(user_id, [("Single",) + stay(20, 1) + ("Card",), ("Suite",) + stay(20, 3) + ("Card",)])
+    assert rollup.verify() == []
+
+def test_unknown_room_types_are_validation_errors(database, user_id):
+    service = BookingService(RoomTypeCatalog())
+    with pytest.raises(ValidationError):
+        service.create_booking(user_id, "Penthouse", *stay(10, 2), "Cash")
+    with pytest.raises(ValidationError):
+        service.add_bookings_bulk(user_id, [("Single",) + stay(10, 1) + ("Card",), ("Penthouse",) + stay(10, 1) + ("Card",)])
+    booked = service.create_booking(user_id, "Single", *stay(10, 2), "Cash")
+    with pytest.raises(ValidationError):
+        service.update_booking(user_id, booked.booking_id, "Penthouse", *stay(10, 2))
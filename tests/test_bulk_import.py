@@ -0,0 +1,108 @@
+import csv
+import json
+import sys
+from datetime import date, timedelta
+import pytest
+import bulk_import
+import rollup
+from bulk_import import BookingImporter, read_records
+
+
+@pytest.fixture
+def guest(database):
+    with database.cursor() as c:
+        c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+                  ("guest", "guest@example.com", "x", "customer"))
+        return c.lastrowid
+
+def day(offset):
+    return str(date.today() + timedelta(days=offset))
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["email", "roomType", "roomNumber", "checkInDate", "checkOutDate",
+                                               "status", "totalAmount"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+def reasons(rejects):
+    return {line: reason for line, record, reason in rejects}
+
+def imported(path):
+    importer = BookingImporter(chunk_size=2)
+    importer.load_reference()
+    accepted, rejects = importer.plan(read_records(path))
+    inserted, late = importer.load(accepted)
+    return inserted, late, rejects
+
+
+def test_csv_rows_are_imported_or_rejected_with_their_line(tmp_path, database, guest):
+    path = write_csv(tmp_path / "stays.csv", [
+        {"email": "guest@example.com", "roomType": "Single", "checkInDate": day(10), "checkOutDate": day(12)},
+        {"email": "nobody@example.com", "roomType": "Single", "checkInDate": day(10), "checkOutDate": day(12)},
+        {"email": "guest@example.com", "roomType": "Penthouse", "checkInDate": day(10), "checkOutDate": day(12)},
+        {"email": "guest@example.com", "roomType": "Single", "checkInDate": "soon", "checkOutDate": day(12)},
+        {"email": "guest@example.com", "roomType": "Single", "checkInDate": day(12), "checkOutDate": day(10)},
+        {"email": "guest@example.com", "roomType": "Single", "checkInDate": day(10), "checkOutDate": day(12),
+         "status": "held"},
+        {"email": "guest@example.com", "roomType": "Single", "checkInDate": day(10), "checkOutDate": day(12),
+         "totalAmount": "lots"},
+        {"email": "guest@example.com", "roomType": "Double", "checkInDate": day(20), "checkOutDate": day(21),
+         "status": "cancelled", "totalAmount": "99.50"},
+    ])
+    inserted, late, rejects = imported(path)
+    assert inserted == 2 and late == []
+    assert reasons(rejects) == {
+        3: "Unknown guest nobody@example.com",
+        4: "Unknown room type Penthouse",
+        5: "Invalid dates, use YYYY-MM-DD",
+        6: "Check-out date must be after check-in date",
+        7: "Unknown status held",
+        8: "Invalid totalAmount lots",
+    }
+    with database.cursor() as c:
+        c.execute("SELECT status, totalAmount FROM bookings ORDER BY bookingID")
+        rows = c.fetchall()
+    assert [status for status, amount in rows] == ["confirmed", "cancelled"]
+    assert rows[1][1] == pytest.approx(99.5)
+    assert rollup.verify() == []
+
+def test_overlapping_stays_are_rejected(tmp_path, database, guest):
+    with database.cursor() as c:
+        c.execute("SELECT roomNumber FROM rooms r JOIN room_types rt ON r.roomTypeID = rt.roomTypeID "
+                  "WHERE rt.typeName = 'Suite' ORDER BY r.roomID")
+        numbers = [str(row[0]) for row in c.fetchall()]
+    stay = {"email": "guest@example.com", "checkInDate": day(5), "checkOutDate": day(8)}
+    rows = [dict(stay, roomNumber=numbers[0]), dict(stay, roomNumber=numbers[0], checkInDate=day(7))]
+    rows += [dict(stay, roomType="Suite") for _ in numbers]
+    path = write_csv(tmp_path / "stays.csv", rows)
+    inserted, late, rejects = imported(path)
+    assert inserted == len(numbers)
+    assert reasons(rejects) == {3: "Overlaps an existing booking", len(rows) + 1: "Overlaps an existing booking"}
+
+    # The same file again overlaps everything it imported the first time
+    inserted, late, rejects = imported(path)
+    assert inserted == 0 and len(rejects) == len(rows)
+    assert rollup.verify() == []
+
+def test_unreadable_jsonl_lines_are_rejected(tmp_path, database, guest):
+    path = tmp_path / "stays.jsonl"
+    stay = {"email": "guest@example.com", "roomType": "Double", "checkInDate": day(3), "checkOutDate": day(4)}
+    path.write_text("\n".join([json.dumps(stay), "{not json", "", "[1, 2]", json.dumps(dict(stay, roomType="Single"))])
+                    + "\n", encoding="utf-8")
+    inserted, late, rejects = imported(str(path))
+    assert inserted == 2
+    assert set(reasons(rejects)) == {2, 4}
+    assert reasons(rejects)[2].startswith("Invalid JSON")
+    assert reasons(rejects)[4] == "Expected a JSON object"
+
+def test_main_writes_the_reject_file(tmp_path, database, guest, monkeypatch):
+    path = tmp_path / "stays.jsonl"
+    path.write_text('{"email": "guest@example.com", "roomType": "Single", '
+                    f'"checkInDate": "{day(3)}", "checkOutDate": "{day(4)}"}}\n"oops"\n', encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["bulk_import.py", str(path)])
+    bulk_import.main()
+    with open(tmp_path / "stays.rejects.csv", newline="", encoding="utf-8") as f:
+        rejects = list(csv.DictReader(f))
+    assert [(row["line"], row["reason"], row["raw"]) for row in rejects] == [("2", "Expected a JSON object", '"oops"')]
@@ -0,0 +1,94 @@
+import change_feed
+from change_feed import ALL_USERS, BookingEvent, LocalChangeFeed, OutboxChangeFeed, record_event
+
+
+def insert_event(database, seq, user_id=1, booking_id=1, action="created", created_at=None):
+    with database.cursor() as c:
+        if created_at:
+            c.execute("INSERT INTO booking_events (seq, userID, bookingID, action, createdAt) VALUES (%s, %s, %s, %s, %s)",
+                      (seq, user_id, booking_id, action, created_at))
+        else:
+            c.execute("INSERT INTO booking_events (seq, userID, bookingID, action) VALUES (%s, %s, %s, %s)",
+                      (seq, user_id, booking_id, action))
+
+def listening(feed, user_id=ALL_USERS):
+    received = []
+    feed.subscribe(user_id, received.append)
+    return received
+
+def quiet_feed():
+    # Polled by hand: subscribing must not start the poller thread
+    feed = OutboxChangeFeed()
+    feed.thread = object()
+    return feed
+
+
+def test_local_feed_routes_events_by_user():
+    feed = LocalChangeFeed()
+    everyone, alice = listening(feed), listening(feed, 1)
+    feed.subscribe(1, lambda event: 1 / 0)
+    token = feed.subscribe(2, everyone.append)
+    feed.unsubscribe(token)
+    feed.publish(BookingEvent(1, 1, 10, "created"))
+    feed.publish(BookingEvent(2, 2, 11, "cancelled"))
+    assert [event.seq for event in everyone] == [1, 2]
+    assert [event.seq for event in alice] == [1]
+
+def test_outbox_starts_from_now_and_delivers_each_event_once(database):
+    insert_event(database, 1)
+    feed = quiet_feed()
+    received = listening(feed)
+    feed.poll()
+    assert feed.low_water == 1 and received == []
+    with database.transaction() as c:
+        record_event(c, 7, 70, "created")
+        record_event(c, 8, 80, "updated")
+    feed.poll()
+    feed.poll()
+    assert [(event.user_id, event.booking_id, event.action) for event in received] == [(7, 70, "created"), (8, 80, "updated")]
+    assert feed.low_water == 3 and not feed.delivered
+
+def test_late_commit_fills_the_gap(database):
+    insert_event(database, 1)
+    feed = quiet_feed()
+    received = listening(feed)
+    feed.poll()
+    insert_event(database, 3)
+    feed.poll()
+    # seq 2 may still be in an open transaction: hold low_water below it
+    assert [event.seq for event in received] == [3]
+    assert feed.low_water == 1 and feed.delivered == {3}
+    insert_event(database, 2)
+    feed.poll()
+    assert [event.seq for event in received] == [3, 2]
+    assert feed.low_water == 3 and not feed.delivered and feed.gap_since is None
+
+def test_gap_is_skipped_after_the_timeout(database, monkeypatch):
+    monkeypatch.setattr(change_feed, "GAP_TIMEOUT", -1)
+    insert_event(database, 1)
+    feed = quiet_feed()
+    received = listening(feed)
+    feed.poll()
+    insert_event(database, 3)
+    insert_event(database, 5)
+    feed.poll()
+    assert feed.low_water == 1 and feed.gap_since is not None
+    feed.poll()
+    assert feed.low_water == 3 and feed.delivered == {5}
+    feed.poll()
+    feed.poll()
+    assert feed.low_water == 5 and not feed.delivered
+    # A rolled-back seq that commits after all is never delivered behind low_water
+    insert_event(database, 2)
+    feed.poll()
+    assert [event.seq for event in received] == [3, 5]
+
+def test_old_events_are_pruned(database):
+    insert_event(database, 1, created_at="2000-01-01 00:00:00")
+    insert_event(database, 2)
+    feed = quiet_feed()
+    feed.poll()
+    feed.poll()
+    with database.cursor() as c:
+        c.execute("SELECT seq FROM booking_events ORDER BY seq")
+        assert [row[0] for row in c.fetchall()] == [2]
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+import pytest
+import rollup
+from booking_service import BookingNotFoundError, BookingService, NoAvailabilityError
+from catalog import RoomTypeCatalog
+from pricing import PricingEngine
+
+
+@pytest.fixture
+def service(database):
+    catalog = RoomTypeCatalog()
+    return BookingService(catalog, PricingEngine(catalog))
+
+@pytest.fixture
+def user_id(database):
+    with database.cursor() as c:
+        c.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+                  ("guest", "guest@example.com", "x", "customer"))
+        return c.lastrowid
+
+def stay(offset, nights):
+    check_in = date.today() + timedelta(days=offset)
+    return str(check_in), str(check_in + timedelta(days=nights))
+
+def rooms_sold(database, day):
+    with database.cursor() as c:
+        c.execute("SELECT COALESCE(SUM(roomsSold), 0) FROM daily_rollup WHERE day = %s", (day,))
+        return c.fetchone()[0]
+
+
+def test_rollup_follows_every_booking_write(database, service, user_id):
+    booked = service.create_booking(user_id, "Single", *stay(10, 3), "Cash")
+    assert rollup.verify() == []
+    assert rooms_sold(database, stay(10, 3)[0]) == 1
+
+    service.update_booking(user_id, booked.booking_id, "Double", *stay(12, 2))
+    assert rollup.verify() == []
+    assert rooms_sold(database, stay(10, 3)[0]) == 0
+
+    service.cancel_booking(user_id, booked.booking_id)
+    assert rollup.verify() == []
+    assert rooms_sold(database, stay(12, 2)[0]) == 0
+
+    service.set_booking_status(booked.booking_id, "confirmed")
+    assert rollup.verify() == []
+    assert rooms_sold(database, stay(12, 2)[0]) == 1
+
+    service.delete_booking(booked.booking_id)
+    assert rollup.verify() == []
+
+def test_group_bookings_and_rebuild_agree(database, service, user_id):
+    service.add_bookings_bulk(user_id, [("Single",) + stay(5, 2) + ("Card",), ("Double",) + stay(6, 4) + ("Card",)])
+    assert rollup.verify() == []
+    rollup.rebuild()
+    assert rollup.verify() == []
+
+def test_unchanged_update_and_repeated_cancel_succeed(database, service, user_id):
+    booked = service.create_booking(user_id, "Single", *stay(20, 2), "Cash")
+    service.update_booking(user_id, booked.booking_id, "Single", *stay(20, 2))
+    service.cancel_booking(user_id, booked.booking_id)
+    service.cancel_booking(user_id, booked.booking_id)
+    assert rollup.verify() == []
+
+def test_full_room_type_is_refused(database, service, user_id):
+    with database.cursor() as c:
+        c.execute("SELECT COUNT(*) FROM rooms r JOIN room_types rt ON r.roomTypeID = rt.roomTypeID "
+                  "WHERE rt.typeName = 'Suite'")
+        rooms = c.fetchone()[0]
+    for _ in range(rooms):
+        service.create_booking(user_id, "Suite", *stay(30, 1), "Cash")
+    with pytest.raises(NoAvailabilityError):
+        service.create_booking(user_id, "Suite", *stay(30, 1), "Cash")
+    assert rooms_sold(database, stay(30, 1)[0]) == rooms
+    assert rollup.verify() == []
+
+def test_writes_to_a_missing_booking_are_refused(database, service, user_id):
+    for write in (lambda: service.set_booking_status(999, "confirmed"), lambda: service.delete_booking(999),
+                  lambda: service.cancel_booking(user_id, 999)):
+        with pytest.raises(BookingNotFoundError):
+            write()
+    assert rollup.verify() == []
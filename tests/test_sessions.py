@@ -0,0 +1,84 @@
+import time
+from sessions import SessionStore, User
+
+ALICE = User(1, "alice", "hash-1", "customer")
+
+
+class Users:
+    # Stands in for auth.find_user
+    def __init__(self, *users):
+        self.by_email = {f"{user.username}@example.com": user for user in users}
+        self.lookups = 0
+
+    def __call__(self, email):
+        self.lookups += 1
+        return self.by_email.get(email)
+
+
+def signed_in(store, user=ALICE, password="secret"):
+    return store.issue(user, f"{user.username}@example.com", password)
+
+
+def test_token_and_password_sign_back_in():
+    store = SessionStore(Users(ALICE))
+    token = signed_in(store)
+    assert store.validate(token) == ALICE
+    assert store.authenticate("Alice@example.com", "secret") == (token, ALICE)
+    assert store.authenticate("alice@example.com", "wrong") is None
+
+def test_forged_and_malformed_tokens_are_refused():
+    store = SessionStore(Users(ALICE))
+    session_id, expires, signature = signed_in(store).split(".")
+    assert store.validate(f"{session_id}.{int(expires) + 3600}.{signature}") is None
+    assert store.validate(f"{session_id}.{expires}.{'0' * len(signature)}") is None
+    assert store.validate("not-a-token") is None
+    assert store.validate(None) is None
+    other = SessionStore(Users(ALICE))
+    assert other.validate(f"{session_id}.{expires}.{signature}") is None
+
+def test_sessions_expire():
+    store = SessionStore(Users(ALICE), ttl=0)
+    token = signed_in(store)
+    assert store.validate(token) is None
+    assert store.authenticate("alice@example.com", "secret") is None
+    assert not store.sessions
+
+def test_revoke_and_revoke_user():
+    store = SessionStore(Users(ALICE))
+    first, second = signed_in(store), signed_in(store)
+    store.revoke(second)
+    assert store.validate(second) is None
+    assert store.validate(first) == ALICE
+    store.revoke_user(ALICE.user_id)
+    assert store.validate(first) is None
+    assert store.authenticate("alice@example.com", "secret") is None
+
+def test_recheck_ends_sessions_of_changed_users():
+    users = Users(ALICE)
+    store = SessionStore(users, recheck=0)
+    token = signed_in(store)
+    assert store.validate(token) == ALICE
+    assert users.lookups == 1
+    users.by_email["alice@example.com"] = ALICE._replace(role="admin")
+    assert store.validate(token) is None
+
+def test_recheck_waits_for_its_interval():
+    users = Users(ALICE)
+    store = SessionStore(users, recheck=3600)
+    token = signed_in(store)
+    users.by_email.clear()
+    assert store.validate(token) == ALICE
+    assert users.lookups == 0
+    store.sessions[token.split(".")[0]].checked_at = time.monotonic() - 3600
+    assert store.validate(token) is None
+
+def test_least_recently_used_session_is_evicted():
+    bob = User(2, "bob", "hash-2", "customer")
+    carol = User(3, "carol", "hash-3", "customer")
+    store = SessionStore(Users(ALICE, bob, carol), max_sessions=2)
+    alice_token, bob_token = signed_in(store), signed_in(store, bob)
+    store.validate(alice_token)
+    carol_token = signed_in(store, carol)
+    assert store.validate(bob_token) is None
+    assert store.validate(alice_token) == ALICE
+    assert store.validate(carol_token) == carol
@@ -0,0 +1,140 @@
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+import sqlite_backend
+from sqlite_backend import connect, to_decimal, translate
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "backend.db")
+
+@pytest.fixture
+def conn(path):
+    conn = connect({"path": path})
+    c = conn.cursor()
+    c.execute("CREATE TABLE parents (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(20))")
+    c.execute("""
+        CREATE TABLE items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            parent INT REFERENCES parents(id),
+            day DATE,
+            amount DECIMAL(10,2),
+            updatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    c.execute("INSERT INTO parents (name) VALUES (%s)", ("first",))
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("mysql, sqlite", [
+    ("id INT AUTO_INCREMENT PRIMARY KEY", "id INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ("seq BIGINT AUTO_INCREMENT PRIMARY KEY", "seq INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ("t TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP", "t TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+    ("SELECT roomID FROM rooms WHERE roomTypeID = %s FOR UPDATE", "SELECT roomID FROM rooms WHERE roomTypeID = ?"),
+    ("SELECT * FROM bookings LOCK IN SHARE MODE", "SELECT * FROM bookings"),
+    ("SELECT @@auto_increment_increment", "SELECT 1"),
+    ("SELECT GET_LOCK('migrations', 30)", "SELECT 1"),
+    ("SELECT RELEASE_LOCK('migrations')", "SELECT 1"),
+    ("DELETE FROM e WHERE createdAt < NOW() - INTERVAL %s DAY", "DELETE FROM e WHERE createdAt < datetime('now', '-' || ? || ' days')"),
+    ("INSERT INTO t (k, n) VALUES (%s, %s) ON DUPLICATE KEY UPDATE n = n + VALUES(n)",
+     "INSERT INTO t (k, n) VALUES (?, ?) ON CONFLICT DO UPDATE SET n = n + excluded.n"),
+    ("EXPLAIN SELECT 1", "EXPLAIN QUERY PLAN SELECT 1"),
+    ("EXPLAIN QUERY PLAN SELECT 1", "EXPLAIN QUERY PLAN SELECT 1"),
+    ("SELECT 'FOR UPDATEs' FROM t", "SELECT 'FOR UPDATEs' FROM t"),
+])
+def test_translate(mysql, sqlite):
+    assert translate(mysql) == sqlite
+
+def test_to_decimal_keeps_cents_and_drops_float_noise():
+    assert to_decimal("150") == Decimal("150.00") and str(to_decimal("150")) == "150.00"
+    assert str(to_decimal("33.333333333")) == "33.3333"
+    assert str(to_decimal("0.30000000000000004")) == "0.30"
+
+def test_values_round_trip_as_mysql_types(conn):
+    c = conn.cursor()
+    c.execute("INSERT INTO items (parent, day, amount) VALUES (%s, %s, %s)", (1, date(2030, 1, 2), Decimal("99.50")))
+    c.execute("SELECT day, amount, updatedAt FROM items")
+    day, amount, updated_at = c.fetchone()
+    assert day == date(2030, 1, 2) and amount == Decimal("99.50") and isinstance(updated_at, datetime)
+
+def test_lastrowid_follows_inserts_only(conn):
+    c = conn.cursor()
+    c.execute("INSERT INTO items (parent) VALUES (%s)", (1,))
+    first = c.lastrowid
+    c.execute("SELECT 1")
+    assert c.lastrowid == first
+    c.executemany("INSERT INTO items (parent) VALUES (%s)", ((1,) for _ in range(3)))
+    assert c.lastrowid == first + 1 and c.rowcount == 3
+    c.executemany("INSERT INTO items (parent) VALUES (%s)", [])
+    assert c.rowcount == 0
+
+def test_upsert_and_foreign_keys(conn):
+    c = conn.cursor()
+    c.execute("CREATE TABLE totals (k INT PRIMARY KEY, n INT)")
+    for n in (2, 3):
+        c.execute("INSERT INTO totals (k, n) VALUES (%s, %s) ON DUPLICATE KEY UPDATE n = n + VALUES(n)", (1, n))
+    c.execute("SELECT n FROM totals")
+    assert c.fetchone() == (5,)
+    with pytest.raises(sqlite_backend.Error):
+        c.execute("INSERT INTO items (parent) VALUES (%s)", (99,))
+
+def test_transactions_roll_back(conn):
+    conn.start_transaction()
+    assert conn.in_transaction
+    conn.cursor().execute("INSERT INTO parents (name) VALUES (%s)", ("second",))
+    conn.rollback()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM parents")
+    assert c.fetchone() == (1,) and not conn.in_transaction
+
+def test_second_writer_waits_for_the_first(conn, path):
+    # BEGIN IMMEDIATE takes the write lock up front; the other writer keeps retrying
+    # for BUSY_TIMEOUT, then goes ahead once the first commits
+    other = connect({"path": path})
+    conn.start_transaction()
+    conn.cursor().execute("INSERT INTO parents (name) VALUES (%s)", ("held",))
+    began = threading.Event()
+
+    def second_writer():
+        other.start_transaction()
+        began.set()
+        other.cursor().execute("INSERT INTO parents (name) VALUES (%s)", ("waited",))
+        other.commit()
+
+    thread = threading.Thread(target=second_writer)
+    thread.start()
+    assert not began.wait(0.3)
+    conn.commit()
+    thread.join(5)
+    assert began.is_set()
+    c = other.cursor()
+    c.execute("SELECT name FROM parents ORDER BY id")
+    assert [row[0] for row in c.fetchall()] == ["first", "held", "waited"]
+    other.close()
+
+def test_writer_gives_up_after_the_busy_timeout(conn, path, monkeypatch):
+    monkeypatch.setattr(sqlite_backend, "BUSY_TIMEOUT", 0.2)
+    other = connect({"path": path})
+    conn.start_transaction()
+    started = time.monotonic()
+    with pytest.raises(sqlite_backend.Error, match="locked"):
+        other.start_transaction()
+    assert time.monotonic() - started >= 0.15
+    conn.rollback()
+    other.start_transaction()
+    other.rollback()
+    other.close()
+
+def test_readers_do_not_wait_for_the_writer(conn, path):
+    reader = connect({"path": path})
+    conn.start_transaction()
+    conn.cursor().execute("INSERT INTO parents (name) VALUES (%s)", ("uncommitted",))
+    c = reader.cursor()
+    c.execute("SELECT COUNT(*) FROM parents")
+    assert c.fetchone() == (1,)
+    conn.commit()
+    reader.close()